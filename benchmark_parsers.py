@@ -0,0 +1,153 @@
+import os
+import re
+import time
+import random
+import argparse
+import resource
+from pathlib import Path
+from colorama import init, Fore, Style
+from gnmap_parser import open_ports, service_hosts
+
+# Initialize colorama
+init(autoreset=True)
+
+SERVICES = (
+    '22/open/tcp//ssh//OpenSSH 8.9p1/',
+    '80/open/tcp//http//nginx 1.18.0/',
+    '443/open/tcp//ssl|https//Apache httpd 2.4.52/',
+    '3306/closed/tcp//mysql///',
+    '8080/open/tcp//http-proxy///',
+    '8443/filtered/tcp//https-alt///',
+)
+
+
+def generate(path, size_mb):
+    """Write a synthetic .gnmap file of roughly size_mb megabytes"""
+    rng = random.Random(1)
+    target = size_mb * 1024 * 1024
+    written = 0
+    host = 0
+    with open(path, 'w') as f:
+        f.write("# Nmap 7.94 scan initiated as: nmap -sSCV -A -oG bench.gnmap 10.0.0.0/8\n")
+        while written < target:
+            ip = f"10.{(host >> 16) & 255}.{(host >> 8) & 255}.{host & 255}"
+            ports = ', '.join(rng.sample(SERVICES, rng.randint(1, len(SERVICES))))
+            block = (f"Host: {ip} ()\tStatus: Up\n"
+                     f"Host: {ip} ()\tPorts: {ports}\tIgnored State: closed (65529)\n")
+            f.write(block)
+            written += len(block)
+            host += 1
+        f.write("# Nmap done at Mon Jan  1 00:00:00 2024 -- 16777216 IP addresses scanned\n")
+    return host
+
+def legacy_open_ports(path):
+    """PortScraper.parse_gnmap_file before the mmap parser"""
+    with open(path, 'r') as f:
+        content = f.read()
+    ip_port_dict = {}
+    for entry in re.finditer(r'Host: (\d+\.\d+\.\d+\.\d+).*?Ports: (.*?)(?=\n|\Z)', content, re.DOTALL):
+        open_ports = []
+        for port_info in entry.group(2).split(','):
+            if 'open' in port_info:
+                try:
+                    open_ports.append(int(port_info.strip().split('/')[0]))
+                except ValueError:
+                    pass
+        if open_ports:
+            ip_port_dict[entry.group(1)] = sorted(open_ports)
+    return ip_port_dict
+
+def legacy_service_hosts(path):
+    """ServiceParser.parse_gnmap_file before the mmap parser"""
+    ssh_ips, http_ips, https_ips = set(), set(), set()
+    with open(path, 'r') as f:
+        for line in f:
+            if 'Host:' not in line:
+                continue
+            ip_match = re.search(r'Host: (\d+\.\d+\.\d+\.\d+)', line)
+            ports_section = re.search(r'Ports: (.*?)\t', line)
+            if not ip_match or not ports_section:
+                continue
+            ip = ip_match.group(1)
+            for port_info in ports_section.group(1).split(','):
+                if 'open' not in port_info:
+                    continue
+                service_info = port_info.lower()
+                if 'ssh' in service_info:
+                    ssh_ips.add(ip)
+                if any(s in service_info for s in ['http', 'apache', 'nginx', 'web']):
+                    if 'ssl' in service_info or 'https' in service_info:
+                        https_ips.add(ip)
+                    else:
+                        http_ips.add(ip)
+    return ssh_ips, http_ips, https_ips
+
+def peak_rss_mb():
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return usage / 1024
+
+def run(name, func, *args):
+    """Time one parser in a child process so peak memory is measured per parser"""
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        start = time.time()
+        result = func(*args)
+        elapsed = time.time() - start
+        if isinstance(result, tuple):
+            size = sum(len(r) for r in result)
+        else:
+            size = len(result)
+        os.write(write_fd, f"{elapsed} {peak_rss_mb()} {size}".encode())
+        os._exit(0)
+
+    os.close(write_fd)
+    output = os.read(read_fd, 1024).decode()
+    os.waitpid(pid, 0)
+    if not output:
+        # Most likely killed for running out of memory
+        return name, None, None, None
+    elapsed, rss, size = output.split()
+    return name, float(elapsed), float(rss), int(size)
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare text-mode and mmap .gnmap parsing")
+    parser.add_argument('--file', type=Path, default=Path("/tmp/bench.gnmap"),
+                        help="Input file, generated when it does not exist")
+    parser.add_argument('--size-mb', type=int, default=2048, help="Size of the generated file")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                        help="Processes for the parallel mmap run")
+    parser.add_argument('--keep', action='store_true', help="Keep a generated input file")
+    args = parser.parse_args()
+
+    generated = False
+    if not args.file.exists():
+        print(f"{Fore.BLUE}[*] Generating {args.size_mb} MB of .gnmap output in {args.file}{Style.RESET_ALL}")
+        hosts = generate(args.file, args.size_mb)
+        print(f"{Fore.BLUE}[*] {hosts} hosts{Style.RESET_ALL}")
+        generated = True
+
+    size_mb = args.file.stat().st_size / 1024 / 1024
+    runs = [
+        run("ports: text mode", legacy_open_ports, args.file),
+        run("ports: mmap", open_ports, args.file, 1),
+        run(f"ports: mmap x{args.workers}", open_ports, args.file, args.workers),
+        run("services: text mode", legacy_service_hosts, args.file),
+        run("services: mmap", service_hosts, args.file, 1),
+        run(f"services: mmap x{args.workers}", service_hosts, args.file, args.workers),
+    ]
+
+    print(f"\n{Fore.CYAN}{size_mb:.0f} MB input{Style.RESET_ALL}")
+    print(f"{'parser':<24} {'seconds':>9} {'MB/s':>8} {'peak RSS MB':>12} {'results':>9}")
+    for name, elapsed, rss, size in runs:
+        if elapsed is None:
+            print(f"{name:<24} {'failed':>9}")
+            continue
+        print(f"{name:<24} {elapsed:>9.2f} {size_mb / elapsed:>8.1f} {rss:>12.0f} {size:>9}")
+
+    if generated and not args.keep:
+        args.file.unlink()
+
+if __name__ == "__main__":
+    main()
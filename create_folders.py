@@ -2,6 +2,7 @@ import os
 from pathlib import Path
 import logging
 from colorama import init, Fore, Style
+from scan_logging import log_message
 
 # Initialize colorama
 init(autoreset=True)
@@ -10,14 +11,15 @@ class ProjectCreator:
     def __init__(self):
         self.base_dir = Path.home() / "Project"
 
+    # No project log exists yet, so these only go to the console
     def print_success(self, message):
-        print(f"{Fore.GREEN}[+] {message}{Style.RESET_ALL}")
+        log_message(None, '+', message)
 
     def print_error(self, message):
-        print(f"{Fore.RED}[-] {message}{Style.RESET_ALL}")
+        log_message(None, '-', message)
 
     def print_info(self, message):
-        print(f"{Fore.BLUE}[*] {message}{Style.RESET_ALL}")
+        log_message(None, '*', message)
 
     def create_project(self, project_name):
         """Create project folder structure"""
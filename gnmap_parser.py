@@ -0,0 +1,118 @@
+import os
+import re
+import mmap
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor
+from scan_archive import ArchiveMember
+
+# Files above this size are split into newline-aligned chunks parsed in parallel
+PARALLEL_THRESHOLD = 64 * 1024 * 1024
+
+HOST_PORTS = re.compile(rb'^Host: (\d+\.\d+\.\d+\.\d+)[^\n]*?\tPorts: ([^\t\n]*)', re.M)
+OPEN_PORT = re.compile(rb'(?:^|,\s)(\d+)/open')
+# Matched against the lowercased Ports: field; the state must be open, not
+# just the word "open" somewhere in the entry (e.g. OpenSSH on a closed port)
+SSH_OPEN = re.compile(rb'(?:^|, )\d+/open[^,]*ssh')
+WEB_OPEN = re.compile(rb'(?:^|, )\d+/open([^,]*(?:http|apache|nginx|web)[^,]*)')
+
+
+def line_chunks(data, parts):
+    """Split a buffer into `parts` (start, end) ranges that end on a newline"""
+    size = len(data)
+    bounds = [0]
+    for i in range(1, parts):
+        position = max(size * i // parts, bounds[-1])
+        newline = data.find(b'\n', position)
+        if newline == -1:
+            break
+        bounds.append(newline + 1)
+    bounds.append(size)
+    return [(start, end) for start, end in zip(bounds, bounds[1:]) if end > start]
+
+def map_file(path):
+    """Memory-map a file read-only; None for empty files, which mmap refuses
+
+    Archived artifacts are decompressed straight into memory instead.
+    """
+    if isinstance(path, ArchiveMember):
+        data = path.read_bytes()
+        return nullcontext(data) if data else None
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return None
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+def scan_open_ports(path, start=0, end=None):
+    """Open ports per IP in one byte range of a .gnmap file"""
+    data = map_file(path)
+    if data is None:
+        return {}
+    results = {}
+    with data as data:
+        for match in HOST_PORTS.finditer(data, start, len(data) if end is None else end):
+            ports = [int(port) for port in OPEN_PORT.findall(match.group(2))]
+            if ports:
+                ip = match.group(1).decode()
+                if ip in results:
+                    results[ip].extend(ports)
+                else:
+                    results[ip] = ports
+    return results
+
+def scan_services(path, start=0, end=None):
+    """SSH, HTTP and HTTPS hosts in one byte range of a .gnmap file"""
+    ssh_ips, http_ips, https_ips = set(), set(), set()
+    data = map_file(path)
+    if data is None:
+        return ssh_ips, http_ips, https_ips
+    with data as data:
+        for match in HOST_PORTS.finditer(data, start, len(data) if end is None else end):
+            ports = match.group(2).lower()
+            ip = None
+            if b'ssh' in ports and SSH_OPEN.search(ports):
+                ip = match.group(1).decode()
+                ssh_ips.add(ip)
+            for entry in WEB_OPEN.finditer(ports):
+                ip = ip or match.group(1).decode()
+                if b'ssl' in entry.group(1) or b'https' in entry.group(1):
+                    https_ips.add(ip)
+                else:
+                    http_ips.add(ip)
+    return ssh_ips, http_ips, https_ips
+
+def parse_chunks(func, path, workers=None):
+    """Run a scan_* function over a file, in parallel chunks when it is large"""
+    workers = workers or os.cpu_count() or 1
+    if isinstance(path, ArchiveMember) or os.path.getsize(path) < PARALLEL_THRESHOLD or workers == 1:
+        return [func(path)]
+
+    data = map_file(path)
+    with data:
+        chunks = line_chunks(data, workers)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(func, str(path), start, end) for start, end in chunks]
+        return [future.result() for future in futures]
+
+def open_ports(path, workers=None):
+    """Map every IP in a .gnmap file to its sorted open ports"""
+    chunks = parse_chunks(scan_open_ports, path, workers)
+    merged = chunks[0]
+    for results in chunks[1:]:
+        for ip, ports in results.items():
+            if ip in merged:
+                merged[ip].extend(ports)
+            else:
+                merged[ip] = ports
+    # Updated in place so a file with millions of hosts is not held twice
+    for ip, ports in merged.items():
+        merged[ip] = sorted(set(ports))
+    return merged
+
+def service_hosts(path, workers=None):
+    """Return the (ssh, http, https) host sets of a .gnmap file"""
+    ssh_ips, http_ips, https_ips = set(), set(), set()
+    for ssh, http, https in parse_chunks(scan_services, path, workers):
+        ssh_ips |= ssh
+        http_ips |= http
+        https_ips |= https
+    return ssh_ips, http_ips, https_ips
@@ -4,13 +4,23 @@ import subprocess
 import ipaddress
 import time
 from pathlib import Path
-import logging
 from colorama import init, Fore, Style
 from datetime import datetime
 import threading
 import queue
 import psutil
 import socket
+import argparse
+from scan_logging import get_logger, log_message, print_console, flush_logging
+from scan_metrics import ScanMetrics, LATENCY_BUCKETS
+from scan_status import StatusServer, port_results
+from scan_journal import ScanJournal, ScanHistory
+from scan_shard import parse_shard, in_shard, count_shard_hosts, shard_name
+from scan_scheduler import (ScanTimeout, RetryPolicy, RetryScheduler, ScanPriorityQueue, RateBudget,
+                            parse_scope_line, priority_of, output_complete, kill_pane_processes)
+from scan_timing import TimingProfiles, timing_args
+from scan_chunks import port_ranges, chunk_path, merge_chunk_outputs
+from scan_eta import DurationStore, EtaEstimator, port_count, nmap_progress, format_duration
 
 # Initialize colorama
 init(autoreset=True)
@@ -27,64 +37,90 @@ class NmapScanner:
         self.completed_scans = 0
         self.total_scans = 0
         self.lock = threading.Lock()
-        self.failed_scans = set()
+        self.failed_scans = {}
         self.scan_queue = queue.Queue()
         self.scan_complete = threading.Event()
+        self.interrupted = False
         self.display_lock = threading.Lock()
+        self.show_progress = True
+        self.completed_outputs = []
+        self.metrics = ScanMetrics("port_scan")
+        self.logger = None
+        self.metrics_port = None
+        self.metrics_file = None
+        self.status_port = None
+        self.status = None
+        self.shard = None
+        self.journal = None
+        self.scan_timeout = 7200
+        self.stall_timeout = 600
+        self.retry_policy = RetryPolicy()
+        self.retry_scheduler = None
+        self.attempts = {}
+        self.failure_reasons = {}
+        self.chunk_size = None
+        self.chunks = {}
+        self.scope_rules = []
+        self.history = ScanHistory()
+        self.max_rate = None
+        self.min_rate_fraction = 0
+        self.rate_budget = None
+        self.busy_workers = 0
+        self.adaptive_timing = False
+        self.timing = None
+        self.durations = None
+        self.eta = None
         
-    def print_success(self, message):
-        with self.lock:
-            print(f"{Fore.GREEN}[+] {message}{Style.RESET_ALL}")
-            if hasattr(self, 'logger'):
-                self.logger.info(message)
+    def print_success(self, message, **fields):
+        log_message(self.logger, '+', message, **fields)
 
-    def print_error(self, message):
-        with self.lock:
-            print(f"{Fore.RED}[-] {message}{Style.RESET_ALL}")
-            if hasattr(self, 'logger'):
-                self.logger.error(message)
+    def print_error(self, message, **fields):
+        log_message(self.logger, '-', message, **fields)
 
-    def print_info(self, message):
-        with self.lock:
-            print(f"{Fore.BLUE}[*] {message}{Style.RESET_ALL}")
-            if hasattr(self, 'logger'):
-                self.logger.info(message)
+    def print_info(self, message, **fields):
+        log_message(self.logger, '*', message, **fields)
 
     def update_progress(self):
         """Print current progress to console"""
+        if not self.show_progress:
+            return
         with self.display_lock:
-            print("\033[2J\033[H")  # Clear screen
-            print(f"{Fore.CYAN}Current Progress ({self.completed_scans}/{self.total_scans}):{Style.RESET_ALL}")
-            print("="*50)
+            lines = ["\033[2J\033[H"]  # Clear screen
+            lines.append(f"{Fore.CYAN}Current Progress ({self.completed_scans}/{self.total_scans}):{Style.RESET_ALL}")
+            if self.eta:
+                lines.append(f"ETA: {format_duration(self.estimate_eta())}")
+            lines.append("="*50)
             
             if self.active_scans:
-                print(f"\n{Fore.YELLOW}Active Scans:{Style.RESET_ALL}")
+                lines.append(f"\n{Fore.YELLOW}Active Scans:{Style.RESET_ALL}")
                 for ip, info in self.active_scans.items():
                     elapsed = time.time() - info['start_time']
-                    print(f"IP: {ip} | Progress: {info['progress']}% | Time: {int(elapsed)}s")
+                    rate = f" | Rate: {info['rate']} pps" if info.get('rate') else ""
+                    eta = f" | ETA: {format_duration(self.eta.remaining(info))}" if self.eta else ""
+                    lines.append(f"IP: {ip} | Progress: {info['progress']}% | Time: {int(elapsed)}s{eta}{rate}")
             
             if self.failed_scans:
-                print(f"\n{Fore.RED}Failed Scans:{Style.RESET_ALL}")
-                for ip in sorted(self.failed_scans):
-                    print(f"- {ip}")
+                lines.append(f"\n{Fore.RED}Failed Scans:{Style.RESET_ALL}")
+                for ip, reason in sorted(self.failed_scans.items()):
+                    lines.append(f"- {ip}: {reason}")
             
-            print(f"\n{Fore.BLUE}System Usage:{Style.RESET_ALL}")
-            print(f"CPU: {psutil.cpu_percent()}% | RAM: {psutil.virtual_memory().percent}%")
-            print("\n" + "="*50)
-            sys.stdout.flush()
+            lines.append(f"\n{Fore.BLUE}System Usage:{Style.RESET_ALL}")
+            lines.append(f"CPU: {psutil.cpu_percent()}% | RAM: {psutil.virtual_memory().percent}%")
+            lines.append("\n" + "="*50)
+            print_console("\n".join(lines))
+
+    def estimate_eta(self):
+        """Seconds until every target is scanned, from history, nmap's progress and the sessions"""
+        active = [dict(info) for info in list(self.active_scans.values())]
+        pending = max(self.total_scans - self.completed_scans, 0)
+        if self.chunk_size:
+            # Work is queued per chunk, so pending hosts count once per chunk
+            pending *= len(port_ranges(self.chunk_size))
+        return self.eta.overall(active, max(pending - len(active), 0))
 
     def setup_logging(self):
         """Setup logging configuration"""
-        log_file = self.nmap_dir / "nmap_scan.log"
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler(log_file),
-                logging.StreamHandler(sys.stdout)
-            ]
-        )
-        self.logger = logging
+        self.logger = get_logger("port_scan", self.nmap_dir / "nmap_scan.log")
 
     def select_project(self):
         """List and select available projects"""
@@ -92,7 +128,7 @@ class NmapScanner:
             self.print_error(f"Project directory not found: {self.base_dir}")
             sys.exit(1)
 
-        projects = [d for d in self.base_dir.iterdir() if d.is_dir()]
+        projects = [d for d in self.base_dir.iterdir() if d.is_dir() and not d.name.startswith('.')]
         
         if not projects:
             self.print_error("No projects found!")
@@ -107,19 +143,32 @@ class NmapScanner:
                 choice = input(f"\n{Fore.GREEN}Enter project number:{Style.RESET_ALL} ")
                 project_idx = int(choice) - 1
                 if 0 <= project_idx < len(projects):
-                    self.project_dir = projects[project_idx]
-                    self.nmap_dir = self.project_dir / "nmap"
-                    self.output_dir = self.nmap_dir / "output"
-                    self.output_dir.mkdir(exist_ok=True)
-                    self.scope_file = self.nmap_dir / "scope.txt"
-                    self.setup_logging()
-                    self.print_success(f"Selected project: {self.project_dir.name}")
+                    self.set_project(projects[project_idx])
                     break
                 else:
                     self.print_error("Invalid project number!")
             except ValueError:
                 self.print_error("Please enter a valid number!")
 
+    def set_project(self, project_dir):
+        """Point the scanner at a project directory"""
+        self.project_dir = Path(project_dir)
+        self.nmap_dir = self.project_dir / "nmap"
+        if self.shard:
+            # Shards keep their outputs apart until scan_shard.py merges them
+            shard_dir = self.nmap_dir / "shards" / shard_name(self.shard)
+            self.output_dir = shard_dir / "output"
+            self.journal = ScanJournal(shard_dir / "port_scan_journal.jsonl")
+        else:
+            self.output_dir = self.nmap_dir / "output"
+            self.journal = ScanJournal(self.nmap_dir / "port_scan_journal.jsonl")
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.scope_file = self.nmap_dir / "scope.txt"
+        self.setup_logging()
+        self.print_success(f"Selected project: {self.project_dir.name}")
+        if self.shard:
+            self.print_info(f"Running shard {self.shard[0]}/{self.shard[1]} into {self.output_dir}")
+
     def resolve_domain(self, domain):
         """Resolve domain to IP address"""
         try:
@@ -130,7 +179,10 @@ class NmapScanner:
     def validate_target(self, target):
         """Validate if target is IP, subnet or domain"""
         try:
-            ipaddress.ip_network(target, strict=False)
+            network = ipaddress.ip_network(target, strict=False)
+            if network.num_addresses == 1:
+                # A /32 or /128 is a single host and is scanned as one
+                return True, str(network.network_address)
             return True, target
         except ValueError:
             ip = self.resolve_domain(target)
@@ -149,7 +201,7 @@ class NmapScanner:
     def kill_session(self, session_name):
         """Safely kill a tmux session"""
         try:
-            subprocess.run(['tmux', 'kill-session', '-t', session_name], 
+            subprocess.run(['tmux', 'kill-session', '-t', f"={session_name}"], 
                          stdout=subprocess.DEVNULL, 
                          stderr=subprocess.DEVNULL)
         except:
@@ -157,14 +209,16 @@ class NmapScanner:
 
     def setup_tmux_session(self, ip):
         """Create new tmux session for scanning"""
-        safe_ip = ip.replace('.', '_').replace('/', '_')
+        safe_ip = ip.replace('.', '_').replace('/', '_').replace(':', '_')
         session_name = f"scan_{safe_ip}"
         
         try:
             self.kill_session(session_name)
+            spawn_start = time.time()
             result = subprocess.run(['tmux', 'new-session', '-d', '-s', session_name],
                                  stdout=subprocess.DEVNULL,
                                  stderr=subprocess.PIPE)
+            self.metrics.observe('session_spawn_seconds', time.time() - spawn_start, LATENCY_BUCKETS)
             
             if result.returncode != 0:
                 raise Exception(f"Failed to create session: {result.stderr.decode()}")
@@ -173,131 +227,511 @@ class NmapScanner:
             return session_name
 
         except Exception as e:
-            self.print_error(f"Error creating session for {ip}: {str(e)}")
+            self.print_error(f"Error creating session for {ip}: {str(e)}", target=ip)
             return None
 
-    def run_single_scan(self, ip, output_path):
-        """Execute a single nmap scan"""
-        session_name = self.setup_tmux_session(ip)
+    def acquire_rate(self, key):
+        """nmap rate options for a scan starting now, or '' without a budget"""
+        if not self.rate_budget:
+            return ""
+        rate = self.rate_budget.acquire(key, self.scan_queue.qsize(), self.busy_workers)
+        with self.lock:
+            if key in self.active_scans:
+                self.active_scans[key]['rate'] = rate
+        self.metrics.set_gauge('rate_allocated', self.rate_budget.allocated())
+        return self.rate_budget.nmap_args(rate) + " "
+
+    def release_rate(self, key):
+        if self.rate_budget:
+            self.rate_budget.release(key)
+            self.metrics.set_gauge('rate_allocated', self.rate_budget.allocated())
+
+    def choose_timing(self, ip, key):
+        """Adaptive nmap timing options for a scan, or '' when disabled"""
+        if not self.timing:
+            return ""
+        try:
+            timing = self.timing.choose(ip, self.scan_timeout)
+        except ValueError:
+            return ""
+        if timing:
+            with self.lock:
+                if key in self.active_scans:
+                    self.active_scans[key]['timing'] = timing
+            self.print_info(f"Timing for {key}: {timing_args(timing).strip()}", target=key, timing=timing)
+        return timing_args(timing)
+
+    def observe_timing(self, ip, xml_file):
+        """Fold a finished scan's RTT into its subnet profile without failing the scan"""
+        try:
+            self.timing.observe_xml(ip, xml_file)
+        except Exception as e:
+            self.print_error(f"Could not update timing profile for {ip}: {str(e)}", target=ip)
+
+    def run_single_scan(self, ip, output_path, ports=None):
+        """Execute a single nmap scan, optionally limited to a port range"""
+        # Chunks of the same host run side by side, so they are tracked by range
+        key = f"{ip}:{ports}" if ports else ip
+        session_name = self.setup_tmux_session(key)
         if not session_name:
             return False
 
         try:
+            start_time = time.time()
             with self.lock:
-                self.active_scans[ip] = {
+                self.active_scans[key] = {
                     'session': session_name,
-                    'start_time': time.time(),
+                    'start_time': start_time,
                     'progress': 0
                 }
-
-            cmd = f"nmap -p- -Pn {ip} -oA {output_path}"
-            subprocess.run(['tmux', 'send-keys', '-t', session_name, cmd, 'C-m'],
+                if self.eta:
+                    self.active_scans[key]['expected'] = self.eta.expected(ip, port_count(ports))
+                self.metrics.set_gauge('active_sessions', len(self.active_scans))
+
+            # --stats-every keeps the pane changing so a hung scan can be told apart
+            rate_args = self.acquire_rate(key)
+            rate_args += self.choose_timing(ip, key)
+            cmd = f"nmap -p{ports or '-'} -Pn {rate_args}--stats-every 30s {ip} -oA {output_path}"
+            subprocess.run(['tmux', 'send-keys', '-t', f"={session_name}:", cmd, 'C-m'],
                          stdout=subprocess.DEVNULL,
                          stderr=subprocess.DEVNULL)
 
+            last_output = None
+            last_change = start_time
             while True:
                 time.sleep(1)
-                result = subprocess.run(['tmux', 'capture-pane', '-pt', session_name],
+                result = subprocess.run(['tmux', 'capture-pane', '-pt', f"={session_name}:"],
                                      stdout=subprocess.PIPE,
                                      stderr=subprocess.PIPE,
                                      text=True)
                 
                 output = result.stdout
+                now = time.time()
+                if output != last_output:
+                    last_output = output
+                    last_change = now
 
                 if "Completed" in output:
                     try:
                         progress = int(output.split("Completed")[1].split("%")[0].strip())
                         with self.lock:
-                            if ip in self.active_scans:
-                                self.active_scans[ip]['progress'] = progress
+                            if key in self.active_scans:
+                                self.active_scans[key]['progress'] = progress
                                 self.update_progress()
                     except:
                         pass
+                percent, nmap_remaining = nmap_progress(output)
+                if percent is not None:
+                    with self.lock:
+                        if key in self.active_scans:
+                            self.active_scans[key]['percent'] = percent
+                            self.active_scans[key]['progress'] = int(percent)
+                            self.active_scans[key]['nmap_remaining'] = nmap_remaining
 
-                if "Nmap done" in output:
+                # The marker may have scrolled out of the pane, so also check the output file
+                if "Nmap done" in output or output_complete(f"{output_path}.gnmap", start_time):
                     with self.lock:
-                        if ip in self.active_scans:
-                            del self.active_scans[ip]
-                        self.completed_scans += 1
+                        if key in self.active_scans:
+                            duration = time.time() - self.active_scans[key]['start_time']
+                            self.metrics.observe('scan_duration_seconds', duration)
+                            if self.eta:
+                                self.eta.observe(ip, port_count(ports), duration)
+                            self.journal.record(key, 'done', duration, output=output_path,
+                                                rate=self.active_scans[key].get('rate'),
+                                                timing=self.active_scans[key].get('timing'))
+                            del self.active_scans[key]
+                        if not ports:
+                            # Chunked hosts are counted once all their chunks are merged
+                            self.completed_scans += 1
+                            self.metrics.inc('scans_completed_total')
+                            self.completed_outputs.append(Path(f"{output_path}.gnmap"))
                         self.update_progress()
+                    self.record_metrics()
                     self.kill_session(session_name)
-                    self.print_success(f"Scan completed for {ip}")
+                    if self.timing:
+                        self.observe_timing(ip, f"{output_path}.xml")
+                    self.print_success(f"Scan completed for {key}", target=key,
+                                       duration=round(time.time() - start_time, 3),
+                                       eta=round(self.estimate_eta()) if self.eta else None)
                     return True
 
+                if "QUITTING!" in output:
+                    raise Exception("nmap exited with an error")
+                if self.scan_timeout and now - start_time > self.scan_timeout:
+                    self.metrics.inc('scan_timeouts_total')
+                    raise ScanTimeout(f"deadline of {self.scan_timeout}s exceeded")
+                if self.stall_timeout and now - last_change > self.stall_timeout:
+                    self.metrics.inc('scan_stalls_total')
+                    raise ScanTimeout(f"no progress for {self.stall_timeout}s")
+
         except Exception as e:
-            self.print_error(f"Error scanning {ip}: {str(e)}")
+            self.print_error(f"Error scanning {key}: {str(e)}", target=key,
+                             duration=round(time.time() - start_time, 3))
+            kill_pane_processes(session_name)
             with self.lock:
-                self.failed_scans.add(ip)
-                if ip in self.active_scans:
-                    del self.active_scans[ip]
-                self.completed_scans += 1
+                self.failure_reasons[key] = str(e)
+                if key in self.active_scans:
+                    del self.active_scans[key]
                 self.update_progress()
             self.kill_session(session_name)
             return False
 
+        finally:
+            self.release_rate(key)
+
+    def handle_failure(self, target, ip):
+        """Schedule a failed target for retry, or record it as failed for good"""
+        with self.lock:
+            reason = self.failure_reasons.pop(ip, "scan failed")
+            attempt = self.attempts.get(ip, 0) + 1
+            self.attempts[ip] = attempt
+
+        if self.retry_scheduler and self.retry_policy.allow_retry(attempt):
+            delay = self.retry_policy.delay(attempt)
+            self.metrics.inc('scan_retries_total')
+            self.journal.record(ip, 'retry', attempt=attempt, error=reason)
+            self.print_error(f"Retrying {ip} in {int(delay)}s ({reason}, attempt {attempt})",
+                             target=ip, attempt=attempt)
+            self.retry_scheduler.schedule(target, delay)
+            return
+
+        if self.is_chunk(target):
+            self.journal.record(ip, 'failed', attempt=attempt, error=reason)
+            self.chunk_done(target, reason)
+            return
+
+        with self.lock:
+            self.failed_scans[ip] = reason
+            self.completed_scans += 1
+            self.metrics.inc('scans_failed_total')
+            self.journal.record(ip, 'failed', attempt=attempt, error=reason)
+            self.update_progress()
+        self.record_metrics()
+
+    def record_metrics(self):
+        """Refresh gauges and rewrite the Prometheus textfile"""
+        self.metrics.set_gauge('queue_depth', self.scan_queue.qsize())
+        self.metrics.set_gauge('active_sessions', len(self.active_scans))
+        if self.metrics_file is None and self.nmap_dir:
+            self.metrics_file = self.nmap_dir / "metrics" / "port_scan.prom"
+        try:
+            self.metrics.write_textfile(self.metrics_file)
+        except Exception as e:
+            self.print_error(f"Error writing metrics: {str(e)}")
+
+    def print_eta_summary(self):
+        """Compare the run time with the first estimate, or say what is left after an interrupt"""
+        if not self.eta:
+            return
+        self.print_info(f"Elapsed: {format_duration(time.time() - self.eta.started)}")
+        if self.completed_scans < self.total_scans:
+            self.print_info(f"Estimated time remaining: {format_duration(self.estimate_eta())}")
+        elif self.eta.first_estimate:
+            self.print_info(f"Estimated at start: {format_duration(self.eta.first_estimate)}")
+
+    def write_metrics_summary(self):
+        """Write the final metrics textfile and JSON run summary"""
+        self.record_metrics()
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        summary_file = self.nmap_dir / "metrics" / f"port_scan_summary_{timestamp}.json"
+        try:
+            self.metrics.write_summary(summary_file)
+            self.print_info(f"Metrics summary written to: {summary_file}")
+        except Exception as e:
+            self.print_error(f"Error writing metrics summary: {str(e)}")
+
+    def is_chunk(self, target):
+        return isinstance(target, tuple) and len(target) == 3
+
+    def chunk_done(self, target, error=None):
+        """Account for one finished chunk and merge the host's outputs after the last"""
+        ip, output_path, ports = target
+        with self.lock:
+            state = self.chunks[str(output_path)]
+            state['remaining'] -= 1
+            if error:
+                state['errors'].append(f"ports {ports}: {error}")
+            if state['remaining']:
+                return
+            del self.chunks[str(output_path)]
+
+        # Whatever the failed chunks missed, the open ports found by the rest are kept
+        parts = [chunk_path(output_path, r) for r in state['ranges']]
+        try:
+            if not merge_chunk_outputs(parts, output_path):
+                self.print_error(f"Could not merge XML chunks for {ip}, kept them in {parts[0].parent}")
+        except Exception as e:
+            state['errors'].append(f"merge failed: {str(e)}")
+
+        duration = time.time() - (state['started'] or time.time())
+        with self.lock:
+            self.completed_scans += 1
+            if state['errors']:
+                reason = '; '.join(state['errors'])
+                self.failed_scans[ip] = reason
+                self.metrics.inc('scans_failed_total')
+                self.journal.record(ip, 'failed', duration, output=output_path, error=reason)
+            else:
+                self.metrics.inc('scans_completed_total')
+                self.journal.record(ip, 'done', duration, output=output_path,
+                                    chunks=len(state['ranges']))
+            self.completed_outputs.append(Path(f"{output_path}.gnmap"))
+            self.update_progress()
+        self.record_metrics()
+        if not state['errors']:
+            self.print_success(f"Merged {len(state['ranges'])} chunks for {ip}", target=ip,
+                               duration=round(duration, 3))
+
+    def target_output_path(self, target):
+        """Return the IP and nmap -oA base path for a queued target"""
+        if self.is_chunk(target):
+            ip, output_path, ports = target
+            return ip, chunk_path(output_path, ports)
+        if isinstance(target, tuple):
+            ip, subnet_dir = target
+            return ip, subnet_dir / ip
+        return target, self.output_dir / target
+
+    def scan_priority(self, target):
+        """Operator priority and estimated scan seconds for a queued target"""
+        ip, _ = self.target_output_path(target)
+        priority = priority_of(ip, self.scope_rules)
+        if ip in self.history.active:
+            # Hosts known to have open ports come before unknown ones of the same priority
+            priority += 0.5
+        cost = self.history.durations.get(ip, self.history.median_duration(self.scan_timeout / 4))
+        if self.is_chunk(target):
+            chunk_cost = self.history.durations.get(f"{ip}:{target[2]}")
+            cost = chunk_cost if chunk_cost is not None else cost / len(port_ranges(self.chunk_size))
+        return priority, cost
+
     def scan_worker(self):
         """Worker function to process scan queue"""
         while not self.scan_complete.is_set() or not self.scan_queue.empty():
             try:
                 target = self.scan_queue.get(timeout=1)
-                if isinstance(target, tuple):
-                    ip, subnet_dir = target
-                    output_path = subnet_dir / ip
-                else:
-                    ip = target
-                    output_path = self.output_dir / ip
-
-                self.run_single_scan(ip, output_path)
-                self.scan_queue.task_done()
             except queue.Empty:
                 continue
-            except Exception as e:
-                self.print_error(f"Worker error: {str(e)}")
-                continue
 
-    def process_targets(self):
-        """Process and scan targets"""
-        if not self.scope_file.exists():
-            self.print_error(f"Scope file not found: {self.scope_file}")
-            return
-
-        while True:
+            with self.lock:
+                self.busy_workers += 1
             try:
-                self.max_sessions = int(input(f"{Fore.GREEN}Enter number of concurrent sessions: {Style.RESET_ALL}"))
-                if self.max_sessions > 0:
-                    break
-                self.print_error("Please enter a positive number")
-            except ValueError:
-                self.print_error("Please enter a valid number")
+                self.metrics.set_gauge('queue_depth', self.scan_queue.qsize())
+                ip, output_path = self.target_output_path(target)
+                if self.is_chunk(target):
+                    ports = target[2]
+                    with self.lock:
+                        state = self.chunks[str(target[1])]
+                        state['started'] = state['started'] or time.time()
+                    if self.run_single_scan(ip, output_path, ports):
+                        self.chunk_done(target)
+                    else:
+                        self.handle_failure(target, f"{ip}:{ports}")
+                elif not self.run_single_scan(ip, output_path):
+                    # Scheduled before task_done so the queue never looks finished early
+                    self.handle_failure(target, ip)
+            except Exception as e:
+                self.print_error(f"Worker error: {str(e)}")
+                if self.is_chunk(target):
+                    # Otherwise the host's chunks are never merged or counted
+                    try:
+                        self.chunk_done(target, f"worker error: {str(e)}")
+                    except Exception as chunk_error:
+                        self.print_error(f"Could not account for chunk {target[2]} of {target[0]}: "
+                                         f"{str(chunk_error)}")
+            finally:
+                with self.lock:
+                    self.busy_workers -= 1
+                self.scan_queue.task_done()
 
-        targets = []
+    def load_scope(self):
+        """Resolve scope file entries, leaving subnets unexpanded"""
+        entries = []
+        self.scope_rules = []
         with open(self.scope_file, 'r') as f:
             for line in f:
-                target = line.strip()
+                target, priority = parse_scope_line(line)
                 if not target:
                     continue
                 
                 valid, resolved_target = self.validate_target(target)
+                if valid and self.shard and not self.is_subnet(resolved_target):
+                    try:
+                        in_shard(resolved_target, self.shard)
+                    except ValueError as e:
+                        # Rejected here so counting and feeding never meet it
+                        self.print_error(f"Skipping target {target}: {str(e)}")
+                        continue
                 if valid:
-                    if self.is_subnet(resolved_target):
-                        subnet_dir = self.output_dir / resolved_target.replace('/', '_')
-                        subnet_dir.mkdir(exist_ok=True)
-                        network = ipaddress.ip_network(resolved_target, strict=False)
-                        targets.extend((str(ip), subnet_dir) for ip in network.hosts())
-                    else:
-                        targets.append(resolved_target)
+                    entries.append((priority, resolved_target))
+                    if priority:
+                        self.scope_rules.append((ipaddress.ip_network(resolved_target, strict=False), priority))
                 else:
                     self.print_error(f"Could not resolve target: {target}")
 
-        if not targets:
+        # Highest priority first, then single hosts before small and large subnets
+        entries.sort(key=lambda e: (-e[0], ipaddress.ip_network(e[1], strict=False).num_addresses))
+        return [resolved_target for _, resolved_target in entries]
+
+    def scope_networks(self, entries):
+        """Yield each entry with its network and the earlier entries it overlaps
+
+        A host listed on its own and again inside a subnet, or inside two
+        overlapping subnets, is only scanned for the first entry covering it.
+        """
+        earlier = []
+        for resolved_target in entries:
+            network = ipaddress.ip_network(resolved_target, strict=False)
+            overlaps = [n for n in earlier if n.version == network.version and n.overlaps(network)]
+            earlier.append(network)
+            yield resolved_target, network, overlaps
+
+    def covered(self, ip, overlaps):
+        return any(self.in_network(ip, network) for network in overlaps)
+
+    def iter_targets(self, entries=None):
+        """Yield this shard's scan targets, expanding subnets lazily"""
+        if entries is None:
+            entries = self.load_scope()
+        for resolved_target, network, overlaps in self.scope_networks(entries):
+            if self.is_subnet(resolved_target):
+                subnet_dir = self.output_dir / resolved_target.replace('/', '_')
+                subnet_dir.mkdir(exist_ok=True)
+                # Hosts with known open ports are scanned before the rest of their subnet
+                known = sorted((ip for ip in self.history.active
+                                if self.in_network(ip, network) and in_shard(ip, self.shard)
+                                and not self.covered(ip, overlaps)),
+                               key=ipaddress.ip_address)
+                for ip in known:
+                    yield (ip, subnet_dir)
+                known = set(known)
+                for ip in network.hosts():
+                    if str(ip) not in known and in_shard(str(ip), self.shard) and \
+                            not (overlaps and self.covered(str(ip), overlaps)):
+                        yield (str(ip), subnet_dir)
+            elif in_shard(resolved_target, self.shard) and not self.covered(resolved_target, overlaps):
+                yield resolved_target
+
+    def in_network(self, ip, network):
+        """Check whether ip is one of the addresses network.hosts() would yield"""
+        try:
+            address = ipaddress.ip_address(ip)
+        except ValueError:
+            return False
+        if address not in network:
+            return False
+        return network.prefixlen >= network.max_prefixlen - 1 or \
+            address not in (network.network_address, network.broadcast_address)
+
+    def count_targets(self, entries):
+        """Count this shard's targets without expanding them into a list"""
+        total = 0
+        for resolved_target, network, overlaps in self.scope_networks(entries):
+            if self.is_subnet(resolved_target):
+                if not overlaps:
+                    total += count_shard_hosts(network, self.shard)
+                    continue
+                total += sum(1 for ip in network.hosts()
+                             if in_shard(str(ip), self.shard) and not self.covered(str(ip), overlaps))
+            elif in_shard(resolved_target, self.shard) and not self.covered(resolved_target, overlaps):
+                total += 1
+        return total
+
+    def feed_queue(self, entries):
+        """Stream targets into the bounded scan queue"""
+        try:
+            for target in self.iter_targets(entries):
+                if self.scan_complete.is_set():
+                    break
+                if self.chunk_size:
+                    self.queue_chunks(target)
+                else:
+                    self.scan_queue.put(target)
+        except Exception as e:
+            self.print_error(f"Error expanding scope: {str(e)}")
+
+    def queue_chunks(self, target):
+        """Split a host's full port range into separately scheduled chunks"""
+        ip, output_path = self.target_output_path(target)
+        ranges = port_ranges(self.chunk_size)
+        chunk_path(output_path, ranges[0]).parent.mkdir(parents=True, exist_ok=True)
+        with self.lock:
+            self.chunks[str(output_path)] = {'remaining': len(ranges), 'ranges': ranges,
+                                             'errors': [], 'started': None}
+        for ports in ranges:
+            self.scan_queue.put((ip, output_path, ports))
+
+    def process_targets(self, max_sessions=None):
+        """Process and scan targets, returning the .gnmap files written"""
+        if not self.scope_file.exists():
+            self.print_error(f"Scope file not found: {self.scope_file}")
+            return []
+
+        while not max_sessions:
+            # The prompt is only shown once every queued line is on screen
+            flush_logging()
+            try:
+                max_sessions = int(input(f"{Fore.GREEN}Enter number of concurrent sessions: {Style.RESET_ALL}"))
+                if max_sessions > 0:
+                    break
+                self.print_error("Please enter a positive number")
+                max_sessions = None
+            except ValueError:
+                self.print_error("Please enter a valid number")
+        self.max_sessions = max_sessions
+        self.metrics.restart_clock()
+
+        self.history = ScanHistory([self.journal.path], self.project_dir / "findings")
+        self.durations = DurationStore(self.nmap_dir / "durations.json")
+        entries = self.load_scope()
+        self.total_scans = self.count_targets(entries)
+        if not self.total_scans:
             self.print_error("No valid targets found")
-            return
+            return []
 
-        self.total_scans = len(targets)
         self.print_info(f"Starting scan of {self.total_scans} targets")
-
-        for target in targets:
-            self.scan_queue.put(target)
+        self.eta = EtaEstimator(self.durations, "port_scan", self.max_sessions,
+                                self.history.median_duration(self.scan_timeout / 4))
+        self.print_info(f"Estimated duration: {format_duration(self.estimate_eta())}")
+        if self.max_rate:
+            self.rate_budget = RateBudget(self.max_rate, self.max_sessions, self.min_rate_fraction)
+            self.print_info(f"Sharing {self.max_rate} packets/sec across {self.max_sessions} sessions")
+        if self.adaptive_timing:
+            self.timing = TimingProfiles(self.nmap_dir / "timing_profiles.json")
+            if not self.timing.profiles:
+                # Seed the profiles from the RTTs nmap measured in earlier runs
+                for xml_file in self.output_dir.glob("**/*.xml"):
+                    try:
+                        self.timing.observe_xml(xml_file.stem, xml_file)
+                    except ValueError:
+                        continue
+        if self.chunk_size:
+            self.print_info(f"Splitting each host into {len(port_ranges(self.chunk_size))} "
+                            f"chunks of {self.chunk_size} ports")
+
+        # Only a few targets are buffered at a time so large subnets are never
+        # expanded into memory up front
+        self.scan_queue = ScanPriorityQueue(self.max_sessions * 2, key=self.scan_priority)
+        self.retry_scheduler = RetryScheduler(self.scan_queue)
+        producer = threading.Thread(target=self.feed_queue, args=(entries,))
+        producer.daemon = True
+        producer.start()
+
+        self.metrics.set_gauge('scans_scheduled', self.total_scans)
+        self.record_metrics()
+        if self.metrics_port:
+            try:
+                self.metrics.start_server(self.metrics_port)
+                self.print_info(f"Serving metrics on http://127.0.0.1:{self.metrics_port}/metrics")
+            except OSError as e:
+                self.print_error(f"Could not start metrics server: {str(e)}")
+        if self.status_port:
+            try:
+                self.status = StatusServer(self, port_results)
+                self.status.start(self.status_port)
+                self.print_info(f"Serving scan status on http://127.0.0.1:{self.status_port}/status")
+            except OSError as e:
+                self.print_error(f"Could not start status server: {str(e)}")
 
         workers = []
         for _ in range(self.max_sessions):
@@ -307,7 +741,13 @@ class NmapScanner:
             workers.append(worker)
 
         try:
-            self.scan_queue.join()
+            while producer.is_alive():
+                producer.join(timeout=1)
+            while True:
+                self.scan_queue.join()
+                if not self.retry_scheduler.pending():
+                    break
+                time.sleep(1)
             self.scan_complete.set()
             
             for worker in workers:
@@ -315,23 +755,84 @@ class NmapScanner:
 
         except KeyboardInterrupt:
             self.print_info("\nStopping scans gracefully...")
+            self.interrupted = True
             self.scan_complete.set()
             
             # Kill remaining tmux sessions
-            for ip, info in self.active_scans.items():
+            for ip, info in list(self.active_scans.items()):
+                kill_pane_processes(info['session'])
                 self.kill_session(info['session'])
         
         finally:
             self.print_info("\nScan Summary:")
             self.print_info(f"Total targets: {self.total_scans}")
             self.print_info(f"Completed: {self.completed_scans}")
+            self.print_eta_summary()
+            self.retry_scheduler.stop()
+            self.print_info(f"Retries: {self.retry_policy.retries_used}")
             if self.failed_scans:
                 self.print_error(f"Failed scans: {len(self.failed_scans)}")
-                for ip in sorted(self.failed_scans):
-                    self.print_error(f"- {ip}")
+                for ip, reason in sorted(self.failed_scans.items()):
+                    self.print_error(f"- {ip}: {reason}")
+            self.write_metrics_summary()
+            self.metrics.stop_server()
+            if self.status:
+                self.status.stop()
+            if self.timing:
+                self.timing.save()
+            try:
+                self.durations.save()
+            except OSError as e:
+                self.print_error(f"Could not save scan durations: {str(e)}")
+            flush_logging()
+
+        return self.completed_outputs
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Full port scan of the project scope")
+    parser.add_argument('--metrics-port', type=int,
+                        help="Serve Prometheus metrics on this local port")
+    parser.add_argument('--status-port', type=int,
+                        help="Serve a read-only JSON status and results API on this local port")
+    parser.add_argument('--metrics-textfile', type=Path,
+                        help="Prometheus textfile path (default: nmap/metrics/port_scan.prom)")
+    parser.add_argument('--shard', type=parse_shard, metavar='i/N',
+                        help="Only scan shard i of N of the scope (merge with scan_shard.py)")
+    parser.add_argument('--scan-timeout', type=int, default=7200,
+                        help="Wall-clock limit per target in seconds, 0 to disable (default: 7200)")
+    parser.add_argument('--stall-timeout', type=int, default=600,
+                        help="Kill a scan whose output has not changed for this many seconds (default: 600)")
+    parser.add_argument('--max-retries', type=int, default=2,
+                        help="Retries per failed target (default: 2)")
+    parser.add_argument('--retry-delay', type=int, default=30,
+                        help="Initial retry backoff in seconds, doubled per attempt (default: 30)")
+    parser.add_argument('--retry-budget', type=int,
+                        help="Maximum retries across the whole run")
+    parser.add_argument('--chunk-ports', type=int,
+                        help="Split each host's 1-65535 range into chunks of this many ports")
+    parser.add_argument('--adaptive-timing', action='store_true',
+                        help="Pick -T, retries and RTT timeouts per subnet from measured RTT and loss")
+    parser.add_argument('--max-rate', type=int,
+                        help="Packets per second for the whole run, split across sessions")
+    parser.add_argument('--min-rate-fraction', type=float, default=0,
+                        help="Also pass --min-rate at this fraction of each session's share")
+    return parser.parse_args()
 
 def main():
+    args = parse_args()
     scanner = NmapScanner()
+    scanner.metrics_port = args.metrics_port
+    scanner.status_port = args.status_port
+    scanner.metrics_file = args.metrics_textfile
+    scanner.shard = args.shard
+    scanner.max_rate = args.max_rate
+    scanner.adaptive_timing = args.adaptive_timing
+    scanner.min_rate_fraction = args.min_rate_fraction
+    scanner.chunk_size = args.chunk_ports
+    scanner.scan_timeout = args.scan_timeout
+    scanner.stall_timeout = args.stall_timeout
+    scanner.retry_policy = RetryPolicy(args.max_retries, args.retry_delay,
+                                       retry_budget=args.retry_budget)
     scanner.select_project()
     scanner.process_targets()
 
@@ -0,0 +1,263 @@
+import sys
+import json
+import time
+import shutil
+import argparse
+from pathlib import Path
+from colorama import init, Fore, Style
+from scan_logging import get_logger, log_message, flush_logging
+from create_folders import ProjectCreator
+from nmap_scanner import NmapScanner
+from port_scraper import PortScraper
+from service_scanner import ServiceScanner
+from service_parser import ServiceParser
+from scan_shard import parse_shard
+from scan_scheduler import RetryPolicy
+from scan_archive import ProjectArchiver
+from scan_followup import FollowupDispatcher
+from scan_compact import ServiceCompactor
+
+# Initialize colorama
+init(autoreset=True)
+
+STAGES = ('discovery', 'ports', 'services', 'parse')
+
+DEFAULTS = {
+    'project': None,
+    'create': False,
+    'scope': None,
+    'targets': [],
+    'sessions': 4,
+    'service_sessions': None,
+    'stages': list(STAGES),
+    'shard': None,
+    'metrics_port': None,
+    'status_port': None,
+    'scan_timeout': None,
+    'stall_timeout': None,
+    'max_retries': 2,
+    'chunk_ports': None,
+    'max_rate': None,
+    'adaptive_timing': False,
+    'archive': False,
+    'followup': False,
+    'compact': False,
+}
+
+
+class ScanPipeline:
+    """Run every scanning stage in one process without prompts"""
+
+    def __init__(self, config):
+        self.config = config
+        self.base_dir = Path.home() / "Project"
+        self.project_dir = None
+        self.stage_times = {}
+        self.failed = 0
+        self.interrupted = False
+        self.logger = None
+
+    def print_success(self, message, **fields):
+        log_message(self.logger, '+', message, **fields)
+
+    def print_error(self, message, **fields):
+        log_message(self.logger, '-', message, **fields)
+
+    def print_info(self, message, **fields):
+        log_message(self.logger, '*', message, **fields)
+
+    def prepare_project(self):
+        """Create the project if asked to and install the scope"""
+        creator = ProjectCreator()
+        self.project_dir = creator.base_dir / self.config['project']
+
+        if not self.project_dir.exists():
+            if not self.config['create']:
+                self.print_error(f"Project not found: {self.project_dir} (use --create)")
+                return False
+            if not creator.create_project(self.config['project']):
+                return False
+
+        self.logger = get_logger("pipeline", self.project_dir / "nmap" / "pipeline.log")
+        scope_file = self.project_dir / "nmap" / "scope.txt"
+        if self.config['scope']:
+            shutil.copyfile(self.config['scope'], scope_file)
+            self.print_info(f"Copied scope from {self.config['scope']}")
+        if self.config['targets']:
+            # Only new targets, so running the same config again does not grow the scope
+            existing = set()
+            if scope_file.exists():
+                with open(scope_file, 'r') as f:
+                    existing = {line.strip() for line in f}
+            added = [t for t in dict.fromkeys(self.config['targets']) if t not in existing]
+            with open(scope_file, 'a') as f:
+                for target in added:
+                    f.write(f"{target}\n")
+            self.print_info(f"Added {len(added)} targets to scope")
+        return True
+
+    def run_stage(self, name, func, *args):
+        """Time one stage and return its in-memory result"""
+        self.print_info(f"Starting stage: {name}", stage_name=name)
+        start = time.time()
+        result = func(*args)
+        self.stage_times[name] = round(time.time() - start, 3)
+        self.print_success(f"Finished stage: {name} in {self.stage_times[name]}s", stage_name=name,
+                           duration=self.stage_times[name])
+        return result
+
+    def configure_scanner(self, scanner):
+        """Apply the shared shard, deadline and retry options to a scanner"""
+        scanner.shard = self.config['shard']
+        scanner.show_progress = False
+        if self.config['scan_timeout'] is not None:
+            scanner.scan_timeout = self.config['scan_timeout']
+        if self.config['stall_timeout'] is not None:
+            scanner.stall_timeout = self.config['stall_timeout']
+        scanner.retry_policy = RetryPolicy(self.config['max_retries'])
+        scanner.max_rate = self.config['max_rate']
+        scanner.adaptive_timing = self.config['adaptive_timing']
+        scanner.status_port = self.config['status_port']
+
+    def discovery(self):
+        scanner = NmapScanner()
+        self.configure_scanner(scanner)
+        scanner.metrics_port = self.config['metrics_port']
+        scanner.chunk_size = self.config['chunk_ports']
+        scanner.set_project(self.project_dir)
+        gnmap_files = scanner.process_targets(self.config['sessions'])
+        # Targets never accounted for, such as chunks that were never merged, count as failed
+        self.failed += len(scanner.failed_scans) + max(scanner.total_scans - scanner.completed_scans, 0)
+        self.interrupted = scanner.interrupted
+        return gnmap_files, scanner.output_dir
+
+    def ports(self, gnmap_files, output_dir):
+        scraper = PortScraper()
+        scraper.set_project(self.project_dir)
+        return scraper.process_files(gnmap_files, output_dir)
+
+    def services(self, port_results):
+        scanner = ServiceScanner()
+        self.configure_scanner(scanner)
+        scanner.set_project(self.project_dir)
+        targets = None
+        if port_results is not None:
+            targets = [(ip, ','.join(map(str, ports)), subnet)
+                       for subnet, hosts in sorted(port_results.items(), key=lambda r: r[0] or '')
+                       for ip, ports in sorted(hosts.items())]
+            if not targets:
+                self.print_info("No open ports found, skipping service scan")
+                return [], scanner.service_scan_dir
+        sessions = self.config['service_sessions'] or self.config['sessions']
+        gnmap_files = scanner.process_targets(sessions, targets)
+        self.failed += len(scanner.failed_scans)
+        self.interrupted = scanner.interrupted
+        return gnmap_files, scanner.service_scan_dir
+
+    def parse(self, gnmap_files, service_scan_dir):
+        parser = ServiceParser()
+        parser.set_project(self.project_dir)
+        return parser.process_scans(gnmap_files, service_scan_dir)
+
+    def run(self):
+        """Run the configured stages, handing results between them in memory"""
+        if not self.prepare_project():
+            return 1
+
+        stages = self.config['stages']
+        discovered = port_results = scanned = None
+
+        if 'discovery' in stages:
+            discovered = self.run_stage('discovery', self.discovery)
+        # An interrupted scan stage stops the pipeline instead of handing on partial results
+        if 'ports' in stages and not self.interrupted:
+            # Without a discovery stage the scraper walks nmap/output itself
+            port_results = self.run_stage('ports', self.ports, *(discovered or (None, None)))
+        if 'services' in stages and not self.interrupted:
+            scanned = self.run_stage('services', self.services, port_results)
+        if 'parse' in stages and not self.interrupted:
+            self.run_stage('parse', self.parse, *(scanned or (None, None)))
+        if self.config['compact'] and not self.interrupted:
+            self.run_stage('compact', ServiceCompactor(self.project_dir).compact, True)
+        if self.config['followup'] and not self.interrupted:
+            self.failed += self.run_stage('followup', FollowupDispatcher(self.project_dir).run)
+        if self.config['archive'] and not self.interrupted:
+            self.run_stage('archive', ProjectArchiver(self.project_dir).pack)
+
+        summary_file = self.project_dir / "nmap" / "metrics" / "pipeline_summary.json"
+        summary_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(summary_file, 'w') as f:
+            json.dump({'stages': self.stage_times, 'failed_scans': self.failed,
+                       'interrupted': self.interrupted}, f, indent=2)
+
+        self.print_info("\nPipeline Summary:")
+        for name, seconds in self.stage_times.items():
+            self.print_info(f"{name}: {seconds}s")
+        if self.failed:
+            self.print_error(f"Failed scans: {self.failed}")
+        if self.interrupted:
+            self.print_error("Pipeline interrupted, remaining stages skipped")
+            flush_logging()
+            return 130
+        flush_logging()
+        return 1 if self.failed else 0
+
+
+def load_config(args):
+    """Merge defaults, an optional JSON config file and command-line flags"""
+    config = dict(DEFAULTS)
+    if args.config:
+        with open(args.config, 'r') as f:
+            config.update(json.load(f))
+    for key, value in vars(args).items():
+        if key != 'config' and value is not None and value is not False and value != []:
+            config[key] = value
+
+    if isinstance(config['stages'], str):
+        config['stages'] = [s.strip() for s in config['stages'].split(',') if s.strip()]
+    if isinstance(config['shard'], str):
+        config['shard'] = parse_shard(config['shard'])
+    unknown = set(config['stages']) - set(STAGES)
+    if unknown:
+        raise ValueError(f"Unknown stages: {', '.join(sorted(unknown))}")
+    if not config['project']:
+        raise ValueError("A project name is required")
+    return config
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Run discovery, port scraping, service scanning and parsing without prompts")
+    parser.add_argument('--config', type=Path, help="JSON file with any of the options below")
+    parser.add_argument('--project', help="Project name under ~/Project")
+    parser.add_argument('--create', action='store_true', help="Create the project if it does not exist")
+    parser.add_argument('--scope', type=Path, help="Scope file to copy into nmap/scope.txt")
+    parser.add_argument('--target', dest='targets', action='append', default=[],
+                        help="Target to append to the scope (repeatable)")
+    parser.add_argument('--sessions', type=int, help="Concurrent port scan sessions")
+    parser.add_argument('--service-sessions', type=int, help="Concurrent service scan sessions")
+    parser.add_argument('--stages', help=f"Comma separated stages to run (default: {','.join(STAGES)})")
+    parser.add_argument('--shard', type=parse_shard, metavar='i/N', help="Only scan shard i of N")
+    parser.add_argument('--metrics-port', type=int, help="Serve discovery metrics on this local port")
+    parser.add_argument('--status-port', type=int, help="Serve the JSON status API of the running scan stage on this port")
+    parser.add_argument('--scan-timeout', type=int, help="Wall-clock limit per target in seconds")
+    parser.add_argument('--stall-timeout', type=int, help="Kill scans whose output stops changing for this long")
+    parser.add_argument('--max-retries', type=int, help="Retries per failed target (default: 2)")
+    parser.add_argument('--max-rate', type=int, help="Packets per second shared by all sessions of a stage")
+    parser.add_argument('--archive', action='store_true', help="Pack finished raw outputs into per-subnet archives")
+    parser.add_argument('--compact', action='store_true', help="Pack superseded service scan outputs away after parsing")
+    parser.add_argument('--followup', action='store_true', help="Run sslyze, testssl and gobuster against the web hosts found")
+    parser.add_argument('--adaptive-timing', action='store_true', help="Pick nmap timing per subnet from RTT and loss")
+    parser.add_argument('--chunk-ports', type=int, help="Split port scans into chunks of this many ports")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    try:
+        config = load_config(args)
+    except (ValueError, OSError, argparse.ArgumentTypeError) as e:
+        print(f"{Fore.RED}[-] {e}{Style.RESET_ALL}")
+        sys.exit(2)
+    sys.exit(ScanPipeline(config).run())
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,13 @@
 import os
-import re
 import sys
 from pathlib import Path
-import logging
+import time
 from colorama import init, Fore, Style
+from datetime import datetime
+from scan_logging import get_logger, log_message, flush_logging
+from scan_metrics import ScanMetrics
+from gnmap_parser import open_ports
+from scan_archive import iter_artifacts, as_artifact
 
 # Initialize colorama
 init(autoreset=True)
@@ -14,34 +18,21 @@ class PortScraper:
         self.project_dir = None
         self.nmap_dir = None
         self.findings_dir = None
+        self.metrics = ScanMetrics("port_scrape")
+        self.logger = None
 
-    def print_success(self, message):
-        print(f"{Fore.GREEN}[+] {message}{Style.RESET_ALL}")
-        if hasattr(self, 'logger'):
-            self.logger.info(message)
+    def print_success(self, message, **fields):
+        log_message(self.logger, '+', message, **fields)
 
-    def print_error(self, message):
-        print(f"{Fore.RED}[-] {message}{Style.RESET_ALL}")
-        if hasattr(self, 'logger'):
-            self.logger.error(message)
+    def print_error(self, message, **fields):
+        log_message(self.logger, '-', message, **fields)
 
-    def print_info(self, message):
-        print(f"{Fore.BLUE}[*] {message}{Style.RESET_ALL}")
-        if hasattr(self, 'logger'):
-            self.logger.info(message)
+    def print_info(self, message, **fields):
+        log_message(self.logger, '*', message, **fields)
 
     def setup_logging(self):
         """Setup logging configuration"""
-        log_file = self.nmap_dir / "port_scraper.log"
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler(log_file),
-                logging.StreamHandler(sys.stdout)
-            ]
-        )
-        self.logger = logging
+        self.logger = get_logger("port_scrape", self.nmap_dir / "port_scraper.log")
 
     def select_project(self):
         """List and select available projects"""
@@ -49,7 +40,7 @@ class PortScraper:
             self.print_error(f"Project directory not found: {self.base_dir}")
             sys.exit(1)
 
-        projects = [d for d in self.base_dir.iterdir() if d.is_dir()]
+        projects = [d for d in self.base_dir.iterdir() if d.is_dir() and not d.name.startswith('.')]
         
         if not projects:
             self.print_error("No projects found!")
@@ -64,55 +55,41 @@ class PortScraper:
                 choice = input(f"\n{Fore.GREEN}Enter project number:{Style.RESET_ALL} ")
                 project_idx = int(choice) - 1
                 if 0 <= project_idx < len(projects):
-                    self.project_dir = projects[project_idx]
-                    self.nmap_dir = self.project_dir / "nmap"
-                    self.findings_dir = self.project_dir / "findings"
-                    self.setup_logging()
-                    self.print_success(f"Selected project: {self.project_dir.name}")
+                    self.set_project(projects[project_idx])
                     break
                 else:
                     self.print_error("Invalid project number!")
             except ValueError:
                 self.print_error("Please enter a valid number!")
 
+    def set_project(self, project_dir):
+        """Point the scraper at a project directory"""
+        self.project_dir = Path(project_dir)
+        self.nmap_dir = self.project_dir / "nmap"
+        self.findings_dir = self.project_dir / "findings"
+        self.setup_logging()
+        self.print_success(f"Selected project: {self.project_dir.name}")
+
     def parse_gnmap_file(self, gnmap_file):
         """Parse .gnmap file and extract IP and open ports"""
         try:
-            with open(gnmap_file, 'r') as f:
-                content = f.read()
-                if not content.strip():
-                    self.print_error(f"Empty file: {gnmap_file}")
-                    return None
-
-            # Find all host entries with open ports
-            ip_port_dict = {}
-            host_entries = re.finditer(r'Host: (\d+\.\d+\.\d+\.\d+).*?Ports: (.*?)(?=\n|\Z)', content, re.DOTALL)
-            
-            for entry in host_entries:
-                ip = entry.group(1)
-                ports_info = entry.group(2)
-                
-                # Extract open ports
-                open_ports = []
-                for port_info in ports_info.split(','):
-                    if 'open' in port_info:
-                        port = port_info.strip().split('/')[0]
-                        try:
-                            open_ports.append(int(port))
-                        except ValueError:
-                            self.print_error(f"Invalid port number in {gnmap_file}")
-                
-                if open_ports:  # Only include IPs with open ports
-                    ip_port_dict[ip] = sorted(open_ports)
-            
-            return ip_port_dict
+            size = gnmap_file.stat().st_size
+            self.metrics.inc('files_parsed_total')
+            self.metrics.inc('bytes_parsed_total', size)
+            if not size:
+                self.print_error(f"Empty file: {gnmap_file}")
+                return None
+
+            # The file is memory-mapped and matched as bytes; only IPs with open ports are decoded
+            return open_ports(gnmap_file)
 
         except Exception as e:
             self.print_error(f"Error processing {gnmap_file}: {str(e)}")
+            self.metrics.inc('parse_errors_total')
             return None
 
-    def write_results(self, results, output_file):
-        """Write results to output file"""
+    def write_results(self, results, output_file, echo=True):
+        """Write results to output file, echoing each line unless told not to"""
         output_file.parent.mkdir(parents=True, exist_ok=True)
         
         with open(output_file, 'w') as f:
@@ -120,48 +97,94 @@ class PortScraper:
                 ports_str = ','.join(map(str, ports))
                 line = f"{ip}:{ports_str}\n"
                 f.write(line)
-                print(f"{Fore.CYAN}{line.strip()}{Style.RESET_ALL}")
-
-    def process_files(self):
-        """Process all .gnmap files in the project"""
-        nmap_output_dir = self.nmap_dir / "output"
+                if echo:
+                    # Through the log queue so it stays in order with the other messages
+                    log_message(self.logger, None, line.strip())
+
+    def read_results(self, output_file):
+        """Load an existing ip_port_list.txt back into IP to ports"""
+        results = {}
+        if output_file.exists():
+            with open(output_file, 'r') as f:
+                for line in f:
+                    ip, _, ports = line.strip().rpartition(':')
+                    if ip and ports:
+                        results[ip] = [int(port) for port in ports.split(',')]
+        return results
+
+    def find_gnmap_files(self, nmap_output_dir):
+        """Yield .gnmap files in the output directory and its subnet directories"""
+        yield from iter_artifacts(nmap_output_dir, ".gnmap")
+        for subnet_dir in nmap_output_dir.iterdir():
+            # Hidden directories hold unmerged port-range chunks
+            if subnet_dir.is_dir() and not subnet_dir.name.startswith('.'):
+                self.print_info(f"Processing subnet directory: {subnet_dir.name}")
+                yield from iter_artifacts(subnet_dir, ".gnmap")
+
+    def process_files(self, gnmap_files=None, nmap_output_dir=None):
+        """Process .gnmap files and write ip_port_list.txt per subnet
+
+        Walks nmap/output when no files are given. Given files are merged into
+        the existing lists so hosts from earlier runs are kept. Returns this
+        run's results keyed by subnet directory name (None for the main
+        output directory).
+        """
+        self.metrics.restart_clock()
+        nmap_output_dir = Path(nmap_output_dir or self.nmap_dir / "output")
+        merge = gnmap_files is not None
         
-        if not nmap_output_dir.exists():
-            self.print_error(f"Nmap output directory not found: {nmap_output_dir}")
-            return
-
-        # Process files in main output directory
-        main_results = {}
-        for gnmap_file in nmap_output_dir.glob("*.gnmap"):
+        if gnmap_files is None:
+            if not nmap_output_dir.exists():
+                self.print_error(f"Nmap output directory not found: {nmap_output_dir}")
+                return {}
+            gnmap_files = self.find_gnmap_files(nmap_output_dir)
+
+        results = {}
+        for gnmap_file in gnmap_files:
+            gnmap_file = as_artifact(gnmap_file)
+            subnet = gnmap_file.parent.name if gnmap_file.parent != nmap_output_dir else None
             self.print_info(f"Processing file: {gnmap_file.name}")
             result = self.parse_gnmap_file(gnmap_file)
             if result:
-                main_results.update(result)
+                results.setdefault(subnet, {}).update(result)
 
         # Write main results if any
-        if main_results:
+        if results.get(None):
             output_file = self.findings_dir / "ip_port_list.txt"
             self.print_info(f"Writing main results to: {output_file}")
-            self.write_results(main_results, output_file)
-
-        # Process subnet directories
-        for subnet_dir in nmap_output_dir.iterdir():
-            if subnet_dir.is_dir():
-                subnet_results = {}
-                self.print_info(f"Processing subnet directory: {subnet_dir.name}")
-                
-                for gnmap_file in subnet_dir.glob("*.gnmap"):
-                    self.print_info(f"Processing file: {gnmap_file.name}")
-                    result = self.parse_gnmap_file(gnmap_file)
-                    if result:
-                        subnet_results.update(result)
-
-                # Write subnet results if any
-                if subnet_results:
-                    subnet_output_dir = self.findings_dir / subnet_dir.name
-                    output_file = subnet_output_dir / "ip_port_list.txt"
-                    self.print_info(f"Writing subnet results to: {output_file}")
-                    self.write_results(subnet_results, output_file)
+            self.write_results(self.merged(results[None], output_file, merge), output_file)
+
+        # Write subnet results if any
+        for subnet, subnet_results in sorted((s, r) for s, r in results.items() if s):
+            output_file = self.findings_dir / subnet / "ip_port_list.txt"
+            self.print_info(f"Writing subnet results to: {output_file}")
+            self.write_results(self.merged(subnet_results, output_file, merge), output_file)
+
+        self.write_metrics()
+        return results
+
+    def merged(self, results, output_file, merge):
+        """Overlay results on the list already written when merging"""
+        if not merge:
+            return results
+        existing = self.read_results(output_file)
+        existing.update(results)
+        return existing
+
+    def write_metrics(self):
+        """Write parse throughput as a Prometheus textfile and JSON summary"""
+        elapsed = time.time() - self.metrics.started
+        files = self.metrics.counters.get('files_parsed_total', 0)
+        self.metrics.set_gauge('files_per_second', round(files / elapsed, 3) if elapsed else 0)
+        metrics_dir = self.nmap_dir / "metrics"
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        try:
+            self.metrics.write_textfile(metrics_dir / "port_scrape.prom")
+            self.metrics.write_summary(metrics_dir / f"port_scrape_summary_{timestamp}.json")
+        except Exception as e:
+            self.print_error(f"Error writing metrics: {str(e)}")
+        # Last step of a run, so everything logged is on screen before the caller goes on
+        flush_logging()
 
 def main():
     scraper = PortScraper()
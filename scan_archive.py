@@ -0,0 +1,233 @@
+import os
+import sys
+import gzip
+import json
+import argparse
+import threading
+from types import SimpleNamespace
+from pathlib import Path
+from colorama import init, Fore, Style
+from scan_scheduler import output_complete
+from scan_logging import get_logger, log_message
+
+# Initialize colorama
+init(autoreset=True)
+
+ARCHIVE_DIR = ".archive"
+SEGMENT_BYTES = 256 * 1024 * 1024
+ARTIFACT_SUFFIXES = ('.gnmap', '.nmap', '.xml')
+
+
+class ArchiveMember:
+    """A packed artifact that parsers can use in place of a Path"""
+
+    def __init__(self, archive, entry):
+        self.archive = archive
+        self.entry = entry
+        self.name = entry['name']
+        self.parent = archive.directory
+        self.suffix = Path(self.name).suffix
+        self.stem = Path(self.name).stem
+
+    def stat(self):
+        return SimpleNamespace(st_size=self.entry['size'], st_mtime=self.entry['mtime'])
+
+    def read_bytes(self):
+        return self.archive.read(self.entry)
+
+    def __str__(self):
+        return f"{self.parent / self.name} (archived)"
+
+    def __repr__(self):
+        return f"ArchiveMember({str(self)!r})"
+
+
+class ArtifactArchive:
+    """Gzip segments and a JSON lines index holding the packed artifacts of one directory
+
+    Every artifact is stored as its own gzip member, so a segment is still a
+    valid .gz file (zcat works) and any artifact can be read with one seek.
+    """
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.archive_dir = self.directory / ARCHIVE_DIR
+        self.index_file = self.archive_dir / "index.jsonl"
+        self.entries = None
+        self.lock = threading.Lock()
+
+    def load(self):
+        """Read the index; later entries for the same name win"""
+        if self.entries is not None:
+            return self.entries
+        self.entries = {}
+        if self.index_file.exists():
+            with open(self.index_file, 'r') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    self.entries[entry['name']] = entry
+        return self.entries
+
+    def members(self, suffix=None):
+        return [ArchiveMember(self, entry) for name, entry in sorted(self.load().items())
+                if suffix is None or name.endswith(suffix)]
+
+    def read(self, entry):
+        with open(self.archive_dir / entry['segment'], 'rb') as f:
+            f.seek(entry['offset'])
+            return gzip.decompress(f.read(entry['length']))
+
+    def current_segment(self):
+        segments = sorted(self.archive_dir.glob("segment_*.gz"))
+        if segments and segments[-1].stat().st_size < SEGMENT_BYTES:
+            return segments[-1]
+        return self.archive_dir / f"segment_{len(segments) + 1:04d}.gz"
+
+    def pack(self, paths):
+        """Append files to the archive and remove them once the index is durable"""
+        if not paths:
+            return 0
+        with self.lock:
+            self.load()
+            self.archive_dir.mkdir(parents=True, exist_ok=True)
+            segment = self.current_segment()
+            new_entries = []
+            with open(segment, 'ab') as f:
+                for path in paths:
+                    stat = path.stat()
+                    blob = gzip.compress(path.read_bytes(), mtime=int(stat.st_mtime))
+                    new_entries.append({
+                        'name': path.name,
+                        'segment': segment.name,
+                        'offset': f.tell(),
+                        'length': len(blob),
+                        'size': stat.st_size,
+                        'mtime': stat.st_mtime,
+                    })
+                    f.write(blob)
+                f.flush()
+                os.fsync(f.fileno())
+
+            with open(self.index_file, 'a') as f:
+                for entry in new_entries:
+                    f.write(json.dumps(entry) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+            for entry in new_entries:
+                self.entries[entry['name']] = entry
+            for path in paths:
+                path.unlink()
+            return len(paths)
+
+
+def iter_artifacts(directory, suffix):
+    """Yield loose files and archived members with a suffix; a loose file shadows its archived copy"""
+    directory = Path(directory)
+    loose = sorted(directory.glob(f"*{suffix}"))
+    yield from loose
+    archive = ArtifactArchive(directory)
+    if archive.index_file.exists():
+        names = {path.name for path in loose}
+        for member in archive.members(suffix):
+            if member.name not in names:
+                yield member
+
+def as_artifact(source):
+    """Leave archive members alone and turn everything else into a Path"""
+    return source if isinstance(source, ArchiveMember) else Path(source)
+
+def completed_artifacts(directory):
+    """Artifacts of every finished scan in a directory, grouped by scan"""
+    for gnmap_file in sorted(Path(directory).glob("*.gnmap")):
+        if not output_complete(gnmap_file):
+            # Still being written by a running scan
+            continue
+        yield [gnmap_file.with_suffix(suffix) for suffix in ARTIFACT_SUFFIXES
+               if gnmap_file.with_suffix(suffix).exists()]
+
+def scan_directories(root):
+    """A directory and its subnet directories, skipping hidden ones"""
+    root = Path(root)
+    if not root.exists():
+        return []
+    return [root] + sorted(d for d in root.iterdir() if d.is_dir() and not d.name.startswith('.'))
+
+
+class ProjectArchiver:
+    """Pack the finished raw outputs of a project into per-subnet archives"""
+
+    def __init__(self, project_dir):
+        self.project_dir = Path(project_dir)
+        self.nmap_dir = self.project_dir / "nmap"
+        self.logger = get_logger("archive", self.nmap_dir / "archive.log")
+
+    def print_success(self, message, **fields):
+        log_message(self.logger, '+', message, **fields)
+
+    def print_error(self, message, **fields):
+        log_message(self.logger, '-', message, **fields)
+
+    def print_info(self, message, **fields):
+        log_message(self.logger, '*', message, **fields)
+
+    def pack_directory(self, directory):
+        files = [path for group in completed_artifacts(directory) for path in group]
+        if not files:
+            return 0, 0
+        size = sum(path.stat().st_size for path in files)
+        return ArtifactArchive(directory).pack(files), size
+
+    def pack(self):
+        """Pack nmap/output and nmap/service_scan, returning the number of files packed"""
+        total = 0
+        for root in (self.nmap_dir / "output", self.nmap_dir / "service_scan"):
+            for directory in scan_directories(root):
+                try:
+                    packed, size = self.pack_directory(directory)
+                except OSError as e:
+                    self.print_error(f"Could not pack {directory}: {str(e)}", directory=directory)
+                    continue
+                if packed:
+                    self.print_info(f"Packed {packed} files ({size / 1024 / 1024:.1f} MB) in {directory}",
+                                    directory=directory, files=packed, bytes=size)
+                    total += packed
+        self.print_success(f"Packed {total} files")
+        return total
+
+    def list(self):
+        for root in (self.nmap_dir / "output", self.nmap_dir / "service_scan"):
+            for directory in scan_directories(root):
+                archive = ArtifactArchive(directory)
+                members = archive.members()
+                if not members:
+                    continue
+                size = sum(member.entry['size'] for member in members)
+                packed = sum(segment.stat().st_size for segment in archive.archive_dir.glob("segment_*.gz"))
+                self.print_info(f"{directory}: {len(members)} files, "
+                                f"{size / 1024 / 1024:.1f} MB in {packed / 1024 / 1024:.1f} MB")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Pack finished scan outputs into compressed per-subnet archives")
+    parser.add_argument('--project', required=True, help="Project name under ~/Project")
+    parser.add_argument('--list', action='store_true', help="Show archive sizes instead of packing")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    project_dir = Path.home() / "Project" / args.project
+    if not project_dir.exists():
+        print(f"{Fore.RED}[-] Project not found: {project_dir}{Style.RESET_ALL}")
+        sys.exit(1)
+    archiver = ProjectArchiver(project_dir)
+    if args.list:
+        archiver.list()
+    else:
+        archiver.pack()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+import re
+from pathlib import Path
+import xml.etree.ElementTree as ET
+
+MAX_PORT = 65535
+CHUNK_DIR = ".chunks"
+
+
+def port_ranges(chunk_size):
+    """Split 1-65535 into ranges of chunk_size ports, as nmap -p strings"""
+    return [f"{start}-{min(start + chunk_size - 1, MAX_PORT)}"
+            for start in range(1, MAX_PORT + 1, chunk_size)]
+
+def chunk_path(output_path, ports):
+    """-oA base path for one port-range chunk of a host scan"""
+    output_path = Path(output_path)
+    return output_path.parent / CHUNK_DIR / f"{output_path.name}.p{ports}"
+
+def chunk_start(part):
+    match = re.search(r'\.p(\d+)-\d+$', str(part))
+    return int(match.group(1)) if match else 0
+
+
+def merge_gnmap(parts, target):
+    """Combine per-chunk .gnmap files into one host line PortScraper understands"""
+    header = None
+    footer = None
+    status_line = None
+    host = None
+    ports = []
+    ignored = {}
+
+    for part in parts:
+        gnmap_file = Path(f"{part}.gnmap")
+        if not gnmap_file.exists():
+            continue
+        with open(gnmap_file, 'r') as f:
+            for line in f:
+                line = line.rstrip('\n')
+                if line.startswith('# Nmap done'):
+                    footer = line
+                elif line.startswith('#'):
+                    header = header or line
+                elif 'Status:' in line:
+                    status_line = status_line or line
+                elif 'Ports:' in line:
+                    fields = line.split('\t')
+                    host = host or fields[0]
+                    for field in fields[1:]:
+                        if field.startswith('Ports: '):
+                            ports.extend(p.strip() for p in field[len('Ports: '):].split(','))
+                        elif field.startswith('Ignored State: '):
+                            match = re.match(r'Ignored State: (\S+) \((\d+)\)', field)
+                            if match:
+                                state = match.group(1)
+                                ignored[state] = ignored.get(state, 0) + int(match.group(2))
+
+    ports = list(dict.fromkeys(ports))
+    ports.sort(key=lambda p: int(p.split('/')[0]) if p.split('/')[0].isdigit() else 0)
+    with open(target, 'w') as f:
+        if header:
+            f.write(f"{header}\n")
+        f.write(f"# Merged from {len(parts)} port-range chunks\n")
+        if status_line:
+            f.write(f"{status_line}\n")
+        if host and ports:
+            line = f"{host}\tPorts: {', '.join(ports)}"
+            if len(ignored) == 1:
+                state, count = next(iter(ignored.items()))
+                line += f"\tIgnored State: {state} ({count})"
+            f.write(f"{line}\n")
+        if footer:
+            f.write(f"{footer}\n")
+
+def merge_nmap(parts, target):
+    """Concatenate the normal-format output of every chunk"""
+    with open(target, 'w') as out:
+        for part in parts:
+            nmap_file = Path(f"{part}.nmap")
+            if nmap_file.exists():
+                out.write(f"# Port range {Path(part).suffix[2:]}\n")
+                with open(nmap_file, 'r') as f:
+                    out.write(f.read())
+
+def merge_xml(parts, target):
+    """Fold the <port> elements of every chunk into the first chunk's host"""
+    base_tree = None
+    base_ports = None
+    for part in parts:
+        xml_file = Path(f"{part}.xml")
+        if not xml_file.exists():
+            continue
+        tree = ET.parse(xml_file)
+        host_ports = tree.getroot().find('host/ports')
+        if base_tree is None:
+            base_tree = tree
+            base_ports = host_ports
+            continue
+        if host_ports is None:
+            continue
+        if base_ports is None:
+            base_tree = tree
+            base_ports = host_ports
+            continue
+        for element in host_ports:
+            if element.tag == 'extraports':
+                existing = base_ports.find(f"extraports[@state='{element.get('state')}']")
+                if existing is not None:
+                    existing.set('count', str(int(existing.get('count', 0)) + int(element.get('count', 0))))
+                    continue
+            base_ports.append(element)
+
+    if base_tree is not None:
+        base_tree.write(target, encoding='unicode', xml_declaration=True)
+
+def merge_chunk_outputs(parts, output_path):
+    """Write merged .gnmap/.nmap/.xml files for a host and remove the chunk files"""
+    parts = sorted(parts, key=chunk_start)
+    merge_gnmap(parts, f"{output_path}.gnmap")
+    merge_nmap(parts, f"{output_path}.nmap")
+    try:
+        merge_xml(parts, f"{output_path}.xml")
+    except ET.ParseError:
+        # Keep the chunk XML around rather than losing it
+        return False
+
+    for part in parts:
+        for ext in ('gnmap', 'nmap', 'xml'):
+            Path(f"{part}.{ext}").unlink(missing_ok=True)
+    return True
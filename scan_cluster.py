@@ -0,0 +1,481 @@
+import os
+import sys
+import json
+import time
+import uuid
+import socket
+import argparse
+import threading
+import urllib.request
+import urllib.error
+from collections import deque
+from pathlib import Path
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from colorama import init, Fore, Style
+from nmap_scanner import NmapScanner
+
+# Initialize colorama
+init(autoreset=True)
+
+RESULT_EXTENSIONS = ('nmap', 'gnmap', 'xml')
+
+
+class ScanCoordinator:
+    """Own the project scope and results, leasing batches of targets to workers"""
+
+    def __init__(self, project_dir, lease_ttl=300, batch_size=1, max_attempts=3):
+        self.scanner = NmapScanner()
+        self.scanner.set_project(project_dir)
+        self.lease_ttl = lease_ttl
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.targets = None
+        self.exhausted = False
+        self.next_id = 0
+        self.records = {}
+        self.pending = deque()
+        self.leases = {}
+        self.done_ids = set()
+        self.failed = {}
+        self.workers = {}
+        # Every session of a worker polls on its own, so each must see "done"
+        self.sessions = set()
+        self.notified = set()
+        self.lock = threading.Lock()
+        self.finished = threading.Event()
+        self.server = None
+
+    def fill_pending(self, count):
+        """Pull targets from the scope iterator until count are pending"""
+        while len(self.pending) < count and not self.exhausted:
+            try:
+                target = next(self.targets)
+            except StopIteration:
+                self.exhausted = True
+                break
+            if isinstance(target, tuple):
+                ip, subnet_dir = target
+                subnet = subnet_dir.name
+            else:
+                ip, subnet = target, None
+            target_id = self.next_id
+            self.next_id += 1
+            self.records[target_id] = {'ip': ip, 'subnet': subnet, 'attempts': 0}
+            self.pending.append(target_id)
+            self.scanner.total_scans += 1
+
+    def requeue(self, target_id, reason):
+        """Send a target back for another attempt or mark it failed"""
+        if target_id in self.done_ids or target_id in self.failed:
+            return
+        record = self.records[target_id]
+        record['attempts'] += 1
+        if record['attempts'] < self.max_attempts:
+            self.pending.appendleft(target_id)
+            self.scanner.metrics.inc('scan_retries_total')
+        else:
+            self.failed[target_id] = reason
+            self.scanner.failed_scans[record['ip']] = reason
+            self.scanner.journal.record(record['ip'], 'failed', error=reason)
+            self.scanner.completed_scans += 1
+            self.scanner.metrics.inc('scans_failed_total')
+
+    def reap_leases(self):
+        """Re-dispatch targets whose lease expired without a result"""
+        now = time.time()
+        with self.lock:
+            expired = [lid for lid, lease in self.leases.items() if lease['expires'] < now]
+            for lease_id in expired:
+                lease = self.leases.pop(lease_id)
+                # A late result may already have settled a target held by this lease
+                lease['ids'] -= self.done_ids | self.failed.keys()
+                for target_id in lease['ids']:
+                    self.requeue(target_id, f"lease expired on {lease['worker']}")
+                if lease['ids']:
+                    self.scanner.print_error(
+                        f"Lease {lease_id[:8]} from {lease['worker']} expired, "
+                        f"re-dispatching {len(lease['ids'])} targets")
+            self.check_finished()
+            if expired:
+                self.publish_metrics()
+
+    def check_finished(self):
+        if self.exhausted and not self.pending and not self.leases:
+            self.finished.set()
+
+    def lease(self, worker, count, session=None):
+        """Hand out up to count targets under a new lease"""
+        count = max(1, min(count or self.batch_size, self.batch_size))
+        requester = f"{worker}/{session}" if session else worker
+        with self.lock:
+            self.workers[worker] = time.time()
+            self.sessions.add(requester)
+            self.fill_pending(count)
+            ids = []
+            while self.pending and len(ids) < count:
+                ids.append(self.pending.popleft())
+            if not ids:
+                self.check_finished()
+                if self.finished.is_set():
+                    self.notified.add(requester)
+                return {'targets': [], 'done': self.finished.is_set(),
+                        'retry_after': min(5, self.lease_ttl)}
+
+            lease_id = uuid.uuid4().hex
+            self.leases[lease_id] = {
+                'worker': worker,
+                'ids': set(ids),
+                'expires': time.time() + self.lease_ttl
+            }
+            self.publish_metrics()
+
+        self.scanner.print_info(f"Leased {len(ids)} targets to {worker}")
+        return {
+            'lease_id': lease_id,
+            'ttl': self.lease_ttl,
+            'targets': [{'id': i, 'ip': self.records[i]['ip']} for i in ids],
+            'done': False
+        }
+
+    def renew(self, worker, lease_id):
+        """Extend a lease while its worker is still scanning"""
+        with self.lock:
+            self.workers[worker] = time.time()
+            lease = self.leases.get(lease_id)
+            if not lease or lease['worker'] != worker:
+                return {'ok': False}
+            lease['expires'] = time.time() + self.lease_ttl
+            return {'ok': True, 'ttl': self.lease_ttl}
+
+    def result(self, worker, lease_id, target_id, status, files=None, error=None, duration=None):
+        """Store the result of one target reported by a worker"""
+        with self.lock:
+            self.workers[worker] = time.time()
+            record = self.records.get(target_id)
+            if record is None:
+                return {'ok': False, 'error': 'unknown target'}
+
+            lease = self.leases.get(lease_id)
+            held = bool(lease and lease['worker'] == worker and target_id in lease['ids'])
+            if held:
+                lease['ids'].discard(target_id)
+                if not lease['ids']:
+                    del self.leases[lease_id]
+
+            if target_id in self.done_ids or target_id in self.failed:
+                return {'ok': True, 'duplicate': True}
+
+            if status == 'done':
+                # A late result from an expired lease still counts if it arrives first
+                if target_id in self.pending:
+                    self.pending.remove(target_id)
+                for other_id, other in list(self.leases.items()):
+                    other['ids'].discard(target_id)
+                    if not other['ids']:
+                        del self.leases[other_id]
+                self.write_result(record, files or {})
+                self.done_ids.add(target_id)
+                self.scanner.completed_scans += 1
+                self.scanner.metrics.inc('scans_completed_total')
+                if duration is not None:
+                    self.scanner.metrics.observe('scan_duration_seconds', duration)
+                self.scanner.journal.record(record['ip'], 'done', duration, worker=worker)
+            elif held:
+                self.requeue(target_id, error or f"scan failed on {worker}")
+
+            self.check_finished()
+            self.publish_metrics()
+
+        if status == 'done':
+            self.scanner.print_success(f"Scan completed for {record['ip']} by {worker}")
+        else:
+            self.scanner.print_error(f"Scan failed for {record['ip']} on {worker}: {error}")
+        return {'ok': True}
+
+    def publish_metrics(self):
+        """Refresh lease gauges and rewrite the Prometheus textfile"""
+        metrics = self.scanner.metrics
+        metrics.set_gauge('queue_depth', len(self.pending))
+        metrics.set_gauge('active_sessions', sum(len(l['ids']) for l in self.leases.values()))
+        metrics.set_gauge('scans_scheduled', self.scanner.total_scans)
+        try:
+            metrics.write_textfile(self.scanner.nmap_dir / "metrics" / "port_scan.prom")
+        except Exception as e:
+            self.scanner.print_error(f"Error writing metrics: {str(e)}")
+
+    def write_result(self, record, files):
+        """Write the nmap outputs streamed back by a worker into the project layout"""
+        if record['subnet']:
+            output_dir = self.scanner.output_dir / record['subnet']
+        else:
+            output_dir = self.scanner.output_dir
+        output_dir.mkdir(parents=True, exist_ok=True)
+        for ext, content in files.items():
+            if ext not in RESULT_EXTENSIONS:
+                continue
+            with open(output_dir / f"{record['ip']}.{ext}", 'w') as f:
+                f.write(content)
+
+    def status(self):
+        with self.lock:
+            return {
+                'pending': len(self.pending),
+                'leased': sum(len(l['ids']) for l in self.leases.values()),
+                'completed': len(self.done_ids),
+                'failed': {self.records[i]['ip']: reason for i, reason in self.failed.items()},
+                'scope_exhausted': self.exhausted,
+                'workers': {w: round(time.time() - seen, 1) for w, seen in self.workers.items()},
+                'done': self.finished.is_set()
+            }
+
+    def start_server(self, host, port):
+        """Serve the lease protocol over HTTP+JSON"""
+        coordinator = self
+
+        class CoordinatorHandler(BaseHTTPRequestHandler):
+            def send_json(self, payload, code=200):
+                body = json.dumps(payload).encode()
+                self.send_response(code)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path == '/status':
+                    self.send_json(coordinator.status())
+                else:
+                    self.send_error(404)
+
+            def do_POST(self):
+                try:
+                    length = int(self.headers.get('Content-Length', 0))
+                    request = json.loads(self.rfile.read(length) or b'{}')
+                    worker = str(request.get('worker', self.client_address[0]))
+                    if self.path == '/lease':
+                        self.send_json(coordinator.lease(worker, int(request.get('count', 1)),
+                                                         request.get('session')))
+                    elif self.path == '/renew':
+                        self.send_json(coordinator.renew(worker, request.get('lease_id')))
+                    elif self.path == '/result':
+                        self.send_json(coordinator.result(
+                            worker, request.get('lease_id'), int(request['target_id']),
+                            request.get('status'), request.get('files'),
+                            request.get('error'), request.get('duration')))
+                    else:
+                        self.send_error(404)
+                except (ValueError, KeyError) as e:
+                    self.send_json({'ok': False, 'error': str(e)}, 400)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), CoordinatorHandler)
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        self.scanner.print_info(f"Coordinator listening on http://{host}:{port}")
+
+    def run(self, host="127.0.0.1", port=8765):
+        """Serve leases until every target is done or failed"""
+        if not self.scanner.scope_file.exists():
+            self.scanner.print_error(f"Scope file not found: {self.scanner.scope_file}")
+            return
+        self.targets = self.scanner.iter_targets()
+        self.start_server(host, port)
+
+        try:
+            while not self.finished.wait(timeout=1):
+                self.reap_leases()
+        except KeyboardInterrupt:
+            self.scanner.print_info("\nStopping coordinator...")
+        finally:
+            # Give every session polling for leases a chance to see that the run is done
+            deadline = time.time() + 10
+            while time.time() < deadline and self.sessions - self.notified:
+                time.sleep(0.5)
+            self.server.shutdown()
+            self.server.server_close()
+            self.scanner.print_info("\nScan Summary:")
+            self.scanner.print_info(f"Total targets: {self.scanner.total_scans}")
+            self.scanner.print_info(f"Completed: {len(self.done_ids)}")
+            if self.failed:
+                self.scanner.print_error(f"Failed scans: {len(self.failed)}")
+                for target_id, reason in sorted(self.failed.items()):
+                    self.scanner.print_error(f"- {self.records[target_id]['ip']}: {reason}")
+            self.scanner.write_metrics_summary()
+
+
+class ScanWorker:
+    """Lease targets from a coordinator, scan them locally and stream results back"""
+
+    def __init__(self, coordinator_url, workdir, sessions=1, batch_size=1, worker_id=None):
+        self.coordinator_url = coordinator_url.rstrip('/')
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.sessions = sessions
+        self.batch_size = batch_size
+        self.scanner = NmapScanner()
+        self.scanner.set_project(workdir)
+        self.active_leases = {}
+        self.max_failures = 12
+        self.lock = threading.Lock()
+        self.stop = threading.Event()
+        self.done = threading.Event()
+
+    def request(self, path, payload, retries=3):
+        """POST a JSON request to the coordinator"""
+        payload['worker'] = self.worker_id
+        data = json.dumps(payload).encode()
+        for attempt in range(retries):
+            try:
+                req = urllib.request.Request(f"{self.coordinator_url}{path}", data=data,
+                                             headers={'Content-Type': 'application/json'})
+                with urllib.request.urlopen(req, timeout=30) as resp:
+                    return json.loads(resp.read())
+            except (urllib.error.URLError, OSError):
+                if attempt == retries - 1:
+                    raise
+                time.sleep(2 ** attempt)
+
+    def heartbeat(self):
+        """Renew every lease this worker holds before it expires"""
+        while not self.stop.is_set():
+            with self.lock:
+                leases = dict(self.active_leases)
+            for lease_id, ttl in leases.items():
+                try:
+                    self.request('/renew', {'lease_id': lease_id}, retries=1)
+                except Exception as e:
+                    self.scanner.print_error(f"Lease renewal failed: {str(e)}")
+            interval = min(leases.values()) / 3 if leases else 5
+            self.stop.wait(timeout=max(1, interval))
+
+    def scan_target(self, lease_id, target):
+        """Scan one leased target and report its outputs"""
+        ip = target['ip']
+        output_path = self.scanner.output_dir / ip
+        start = time.time()
+        ok = self.scanner.run_single_scan(ip, output_path)
+
+        files = {}
+        for ext in RESULT_EXTENSIONS:
+            result_file = Path(f"{output_path}.{ext}")
+            if result_file.exists():
+                with open(result_file, 'r', errors='replace') as f:
+                    files[ext] = f.read()
+                result_file.unlink()
+
+        payload = {
+            'lease_id': lease_id,
+            'target_id': target['id'],
+            'status': 'done' if ok and 'gnmap' in files else 'failed',
+            'files': files,
+            'duration': round(time.time() - start, 3)
+        }
+        if payload['status'] == 'failed':
+            payload['error'] = self.scanner.failure_reasons.pop(ip, "nmap did not complete")
+        try:
+            self.request('/result', payload)
+        except Exception as e:
+            self.scanner.print_error(f"Could not report result for {ip}: {str(e)}")
+
+    def session_loop(self, session):
+        """Lease and scan batches until the coordinator reports the run is done"""
+        failures = 0
+        while not self.stop.is_set():
+            try:
+                lease = self.request('/lease', {'count': self.batch_size, 'session': session})
+                failures = 0
+            except Exception as e:
+                if self.done.is_set():
+                    # Another session saw the run finish before the coordinator went away
+                    break
+                failures += 1
+                self.scanner.print_error(f"Coordinator unreachable: {str(e)}")
+                if failures >= self.max_failures:
+                    break
+                self.stop.wait(timeout=5)
+                continue
+
+            if lease.get('done'):
+                self.done.set()
+                break
+            if not lease.get('targets'):
+                self.stop.wait(timeout=lease.get('retry_after', 5))
+                continue
+
+            lease_id = lease['lease_id']
+            with self.lock:
+                self.active_leases[lease_id] = lease['ttl']
+            try:
+                for target in lease['targets']:
+                    self.scan_target(lease_id, target)
+            finally:
+                with self.lock:
+                    del self.active_leases[lease_id]
+
+    def run(self):
+        self.scanner.print_info(f"Worker {self.worker_id} connecting to {self.coordinator_url}")
+        heartbeat = threading.Thread(target=self.heartbeat)
+        heartbeat.daemon = True
+        heartbeat.start()
+
+        sessions = []
+        for index in range(self.sessions):
+            session = threading.Thread(target=self.session_loop, args=(str(index + 1),))
+            session.daemon = True
+            session.start()
+            sessions.append(session)
+
+        try:
+            for session in sessions:
+                while session.is_alive():
+                    session.join(timeout=1)
+        except KeyboardInterrupt:
+            self.scanner.print_info("\nStopping worker...")
+            for ip, info in list(self.scanner.active_scans.items()):
+                self.scanner.kill_session(info['session'])
+        finally:
+            self.stop.set()
+            self.scanner.print_info(f"Worker {self.worker_id} finished")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Distribute full port scans across several scan boxes")
+    subparsers = parser.add_subparsers(dest='mode', required=True)
+
+    coordinator = subparsers.add_parser('coordinator', help="Own the scope and collect results")
+    coordinator.add_argument('--project', required=True, help="Project name under ~/Project")
+    coordinator.add_argument('--bind', default='127.0.0.1', help="Address to listen on")
+    coordinator.add_argument('--port', type=int, default=8765)
+    coordinator.add_argument('--lease-ttl', type=int, default=300,
+                             help="Seconds before an unrenewed lease is re-dispatched")
+    coordinator.add_argument('--batch-size', type=int, default=1, help="Targets per lease")
+    coordinator.add_argument('--max-attempts', type=int, default=3,
+                             help="Dispatch attempts per target before it is marked failed")
+
+    worker = subparsers.add_parser('worker', help="Lease targets and scan them locally")
+    worker.add_argument('--coordinator', required=True, help="Coordinator URL, e.g. http://10.0.0.5:8765")
+    worker.add_argument('--workdir', type=Path, default=Path.home() / ".scan_worker",
+                        help="Local scratch project for in-flight scans")
+    worker.add_argument('--sessions', type=int, default=1, help="Concurrent scans on this worker")
+    worker.add_argument('--batch-size', type=int, default=1, help="Targets to request per lease")
+    worker.add_argument('--worker-id', help="Name reported to the coordinator")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    if args.mode == 'coordinator':
+        project_dir = Path.home() / "Project" / args.project
+        if not project_dir.exists():
+            print(f"{Fore.RED}[-] Project not found: {project_dir}{Style.RESET_ALL}")
+            sys.exit(1)
+        coordinator = ScanCoordinator(project_dir, args.lease_ttl, args.batch_size, args.max_attempts)
+        coordinator.run(args.bind, args.port)
+    else:
+        worker = ScanWorker(args.coordinator, args.workdir, args.sessions,
+                            args.batch_size, args.worker_id)
+        worker.run()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+import os
+import re
+import sys
+import json
+import argparse
+from pathlib import Path
+from colorama import init, Fore, Style
+from scan_scheduler import output_complete
+from gnmap_parser import service_hosts
+from scan_logging import get_logger, log_message
+from scan_archive import ArtifactArchive, ArchiveMember, iter_artifacts, scan_directories, ARTIFACT_SUFFIXES
+
+# Initialize colorama
+init(autoreset=True)
+
+LATEST_INDEX = ".latest.json"
+SUPERSEDED_DIR = "superseded"
+SERVICES = ('ssh', 'http', 'https')
+
+# Service scans are written as <ip>_<YYYYmmdd_HHMMSS>.gnmap
+OUTPUT_NAME = re.compile(r'^(.+)_(\d{8}_\d{6})$')
+
+
+def output_host(stem):
+    """Split an output stem into (host, timestamp); other names are their own host"""
+    match = OUTPUT_NAME.match(stem)
+    if match:
+        return match.group(1), match.group(2)
+    return stem, ''
+
+
+class LatestIndex:
+    """Per-host pointer to the newest finished service scan of a directory
+
+    The parsed (ssh, http, https) result is stored with each entry, so a
+    file is only parsed when it becomes a host's latest result; older
+    outputs of the same host are reported as superseded.
+    """
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.index_file = self.directory / LATEST_INDEX
+        self.entries = {}
+        self.superseded = []
+        if self.index_file.exists():
+            try:
+                with open(self.index_file, 'r') as f:
+                    self.entries = json.load(f)
+            except ValueError:
+                # A damaged index is rebuilt from the outputs
+                self.entries = {}
+
+    def update(self, parse):
+        """Point each host at its newest finished output, parsing only new ones
+
+        `parse` is called with a .gnmap path or archive member and returns
+        the (ssh, http, https) IP sets. Returns the number of files parsed.
+        """
+        candidates = {}
+        for gnmap_file in iter_artifacts(self.directory, ".gnmap"):
+            host, timestamp = output_host(gnmap_file.stem)
+            candidates.setdefault(host, []).append((timestamp, gnmap_file))
+
+        latest = {}
+        older = []
+        for host, outputs in candidates.items():
+            outputs.sort(key=lambda output: output[0], reverse=True)
+            # Newest first, so older outputs are only read while the newer ones are unfinished
+            for position, (timestamp, gnmap_file) in enumerate(outputs):
+                if self.finished(gnmap_file, self.entries.get(host)):
+                    latest[host] = gnmap_file
+                    older.extend(path for _, path in outputs[position + 1:])
+                    break
+
+        parsed = 0
+        entries = {}
+        for host, gnmap_file in latest.items():
+            mtime = gnmap_file.stat().st_mtime
+            entry = self.entries.get(host)
+            if not entry or entry['file'] != gnmap_file.name or entry['mtime'] != mtime:
+                found = parse(gnmap_file)
+                entry = {'file': gnmap_file.name, 'mtime': mtime}
+                entry.update({service: sorted(ips) for service, ips in zip(SERVICES, found)})
+                parsed += 1
+            entries[host] = entry
+
+        self.entries = entries
+        # Only loose files can be moved out of the directory
+        self.superseded = [path for path in older if not isinstance(path, ArchiveMember)]
+        return parsed
+
+    def finished(self, gnmap_file, entry):
+        """Whether an output is complete, trusting the index for files it already holds"""
+        if isinstance(gnmap_file, ArchiveMember):
+            return True
+        if entry and entry['file'] == gnmap_file.name and entry['mtime'] == gnmap_file.stat().st_mtime:
+            return True
+        # Otherwise still running, or left behind by a failed scan
+        return output_complete(gnmap_file)
+
+    def hosts(self):
+        """The (ssh, http, https) IP sets across every host's latest result"""
+        found = tuple(set() for _ in SERVICES)
+        for entry in self.entries.values():
+            for ips, service in zip(found, SERVICES):
+                ips.update(entry.get(service, ()))
+        return found
+
+    def save(self):
+        tmp_path = self.index_file.with_name(f"{self.index_file.name}.tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump(self.entries, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.index_file)
+
+
+class ServiceCompactor:
+    """Bring the latest-result indexes of a project up to date
+
+    Superseded outputs can be packed into nmap/superseded/, outside the
+    tree the parsers walk, so reruns stop adding to every later parse.
+    """
+
+    def __init__(self, project_dir, parse=None):
+        self.project_dir = Path(project_dir)
+        self.service_scan_dir = self.project_dir / "nmap" / "service_scan"
+        self.superseded_dir = self.project_dir / "nmap" / SUPERSEDED_DIR
+        self.parse = parse or service_hosts
+        self.logger = get_logger("compact", self.project_dir / "nmap" / "compact.log")
+
+    def print_success(self, message, **fields):
+        log_message(self.logger, '+', message, **fields)
+
+    def print_error(self, message, **fields):
+        log_message(self.logger, '-', message, **fields)
+
+    def print_info(self, message, **fields):
+        log_message(self.logger, '*', message, **fields)
+
+    def archive_superseded(self, directory, superseded):
+        """Pack superseded outputs, with their .nmap siblings, into the superseded archive"""
+        files = [path.with_suffix(suffix) for path in superseded for suffix in ARTIFACT_SUFFIXES
+                 if path.with_suffix(suffix).exists()]
+        relative = directory.relative_to(self.service_scan_dir)
+        return ArtifactArchive(self.superseded_dir / "service_scan" / relative).pack(files)
+
+    def compact(self, archive=False):
+        """Update every index and return the number of superseded files left or packed"""
+        total = 0
+        for directory in scan_directories(self.service_scan_dir):
+            index = LatestIndex(directory)
+            try:
+                parsed = index.update(self.parse)
+                index.save()
+            except OSError as e:
+                self.print_error(f"Could not index {directory}: {str(e)}")
+                continue
+            superseded = len(index.superseded)
+            self.print_info(f"{directory.name}: {len(index.entries)} hosts, {parsed} parsed, "
+                            f"{superseded} superseded outputs", directory=directory,
+                            hosts=len(index.entries), parsed=parsed, superseded=superseded)
+            if archive and superseded:
+                try:
+                    packed = self.archive_superseded(directory, index.superseded)
+                    self.print_info(f"Packed {packed} superseded files from {directory.name}")
+                except OSError as e:
+                    self.print_error(f"Could not pack superseded outputs of {directory}: {str(e)}")
+            total += superseded
+        self.print_success(f"Compacted service scans ({total} superseded outputs)")
+        return total
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Index the latest service scan of every host")
+    parser.add_argument('--project', required=True, help="Project name under ~/Project")
+    parser.add_argument('--archive', action='store_true',
+                        help="Move superseded outputs into a compressed archive under nmap/superseded")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    project_dir = Path.home() / "Project" / args.project
+    if not project_dir.exists():
+        print(f"{Fore.RED}[-] Project not found: {project_dir}{Style.RESET_ALL}")
+        sys.exit(1)
+    ServiceCompactor(project_dir).compact(args.archive)
+
+if __name__ == "__main__":
+    main()
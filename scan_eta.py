@@ -0,0 +1,176 @@
+import os
+import re
+import json
+import time
+import threading
+from pathlib import Path
+from scan_timing import subnet_key
+
+ALL_PORTS = 65535
+# Estimates from fewer runs than this lean on broader history
+MIN_SAMPLES = 3
+
+# "SYN Stealth Scan Timing: About 42.10% done; ETC: 14:02 (0:03:11 remaining)"
+NMAP_STATS = re.compile(r'About (\d+(?:\.\d+)?)% done(?:; ETC: [\d:]+ \((\d+):(\d+):(\d+) remaining\))?')
+
+
+def port_count(ports):
+    """Number of ports in an nmap -p value: None for all, "1-8192" or "22,80,443" """
+    if not ports:
+        return ALL_PORTS
+    count = 0
+    for part in str(ports).split(','):
+        start, _, end = part.partition('-')
+        count += int(end) - int(start) + 1 if end else 1
+    return count
+
+def nmap_progress(output):
+    """(percent done, seconds remaining) from the last --stats-every line, or (None, None)"""
+    matches = NMAP_STATS.findall(output)
+    if not matches:
+        return None, None
+    percent, hours, minutes, seconds = matches[-1]
+    remaining = int(hours) * 3600 + int(minutes) * 60 + int(seconds) if hours else None
+    return float(percent), remaining
+
+def format_duration(seconds):
+    if seconds is None:
+        return "unknown"
+    seconds = int(seconds)
+    if seconds < 60:
+        return f"{seconds}s"
+    if seconds < 3600:
+        return f"{seconds // 60}m {seconds % 60:02d}s"
+    return f"{seconds // 3600}h {seconds % 3600 // 60:02d}m"
+
+
+class DurationStore:
+    """Per-project scan durations keyed by scan type, subnet and port count
+
+    Each key keeps a count and a running mean; a wildcard subnet key per
+    type and port count, and a seconds-per-port figure per type, are kept
+    alongside so new subnets and port counts still get an estimate.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.stats = {}
+        self.lock = threading.Lock()
+        if self.path.exists():
+            try:
+                with open(self.path, 'r') as f:
+                    self.stats = json.load(f)
+            except ValueError:
+                self.stats = {}
+
+    def update(self, key, value):
+        entry = self.stats.setdefault(key, {'n': 0, 'mean': 0.0})
+        entry['n'] += 1
+        entry['mean'] += (value - entry['mean']) / entry['n']
+
+    def record(self, scan_type, ip, ports, duration):
+        """Add a finished target; `ip` None only updates the per-type figures"""
+        with self.lock:
+            if ip is not None:
+                self.update(f"{scan_type}|{subnet_key(ip)}|{ports}", duration)
+            self.update(f"{scan_type}|*|{ports}", duration)
+            self.update(f"{scan_type}|*|per_port", duration / max(ports, 1))
+
+    def estimate(self, scan_type, ip, ports):
+        """Expected seconds for one target, or None without any history for the type"""
+        subnet = subnet_key(ip) if ip is not None else '*'
+        with self.lock:
+            for key in (f"{scan_type}|{subnet}|{ports}", f"{scan_type}|*|{ports}"):
+                entry = self.stats.get(key)
+                if entry and entry['n'] >= MIN_SAMPLES:
+                    return entry['mean']
+            per_port = self.stats.get(f"{scan_type}|*|per_port")
+            if per_port:
+                return per_port['mean'] * ports
+            # A single earlier run of this exact target is still better than nothing
+            entry = self.stats.get(f"{scan_type}|{subnet}|{ports}")
+            return entry['mean'] if entry else None
+
+    def save(self):
+        with self.lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_name(f".{self.path.name}.tmp")
+            with open(tmp_path, 'w') as f:
+                json.dump(self.stats, f, indent=1, sort_keys=True)
+            os.replace(tmp_path, self.path)
+
+
+class EtaEstimator:
+    """Per-target and overall ETAs for one scan run
+
+    A running target's remaining time blends the historical estimate with
+    nmap's own, trusting nmap more as its percentage grows. Targets not yet
+    started are costed at the mean duration seen so far in this run, or the
+    history before any have finished, and spread over the sessions.
+    """
+
+    def __init__(self, store, scan_type, sessions, default):
+        self.store = store
+        self.scan_type = scan_type
+        self.sessions = max(sessions, 1)
+        self.default = default
+        self.started = time.time()
+        self.first_estimate = None
+        self.run_count = 0
+        self.run_total = 0.0
+        self.expected_total = 0.0
+        self.expected_count = 0
+
+    def expected(self, ip, ports, default=None):
+        """Expected duration of a target about to start; `default` is used without history"""
+        try:
+            estimate = self.store.estimate(self.scan_type, ip, ports)
+        except ValueError:
+            # Not a single address, so only the per-type history applies
+            estimate = self.store.estimate(self.scan_type, None, ports)
+        if estimate is None:
+            estimate = default
+        if estimate is None:
+            estimate = self.run_total / self.run_count if self.run_count else self.default
+        self.expected_total += estimate
+        self.expected_count += 1
+        return estimate
+
+    def observe(self, ip, ports, duration):
+        """Record a finished target so the next estimates use it"""
+        try:
+            self.store.record(self.scan_type, ip, ports, duration)
+        except ValueError:
+            self.store.record(self.scan_type, None, ports, duration)
+        self.run_count += 1
+        self.run_total += duration
+
+    def remaining(self, info, now=None):
+        """Seconds left for one running target, from an active_scans entry"""
+        elapsed = (now or time.time()) - info['start_time']
+        history = max(info.get('expected', self.default) - elapsed, 0)
+        percent = info.get('percent')
+        if not percent:
+            return history
+        nmap = info.get('nmap_remaining')
+        if nmap is None:
+            nmap = elapsed * (100 - percent) / percent
+        weight = percent / 100
+        return weight * nmap + (1 - weight) * history
+
+    def typical(self):
+        if self.run_count:
+            return self.run_total / self.run_count
+        if self.expected_count:
+            return self.expected_total / self.expected_count
+        return self.default
+
+    def overall(self, active, pending):
+        """Seconds until the whole run is done, given the running targets and the count not started"""
+        now = time.time()
+        remaining = [self.remaining(info, now) for info in active]
+        work = sum(remaining) + pending * self.typical()
+        eta = max(max(remaining, default=0), work / self.sessions)
+        if self.first_estimate is None and (active or pending):
+            self.first_estimate = eta + now - self.started
+        return eta
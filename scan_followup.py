@@ -0,0 +1,314 @@
+import os
+import sys
+import json
+import time
+import shlex
+import signal
+import shutil
+import string
+import argparse
+import subprocess
+from pathlib import Path
+from collections import deque
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from colorama import init, Fore, Style
+from scan_journal import ScanJournal
+from scan_logging import get_logger, log_message
+
+# Initialize colorama
+init(autoreset=True)
+
+# {host} is the IP, {url} its scheme://host/ and {output} the output path
+# without an extension; binaries and arguments can be overridden with --config
+TOOLS = {
+    'sslyze': {
+        'binary': 'sslyze',
+        'args': '--json_out={output}.json {host}',
+        'services': ['https'],
+        'limit': 4,
+        'timeout': 600,
+    },
+    'testssl': {
+        'binary': 'testssl.sh',
+        'args': '--quiet --warnings batch --jsonfile {output}.json {host}',
+        'services': ['https'],
+        'limit': 2,
+        'timeout': 1800,
+    },
+    'dirbruteforce': {
+        'binary': 'gobuster',
+        'args': 'dir -q -u {url} -w /usr/share/wordlists/dirb/common.txt -o {output}.txt',
+        'services': ['http', 'https'],
+        'limit': 2,
+        'timeout': 3600,
+    },
+}
+
+KILL_GRACE = 10
+PLACEHOLDERS = ('host', 'url', 'output')
+
+
+def latest_host_list(directory, service):
+    """Hosts in the newest <service>_hosts_<timestamp>.txt of a findings directory"""
+    lists = sorted(directory.glob(f"{service}_hosts_*.txt"))
+    if not lists:
+        return []
+    with open(lists[-1], 'r') as f:
+        return [line.strip() for line in f if line.strip()]
+
+def stop_process(process):
+    """Terminate a tool and everything it started, then kill it if it lingers"""
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait(timeout=KILL_GRACE)
+    except subprocess.TimeoutExpired:
+        os.killpg(process.pid, signal.SIGKILL)
+        process.wait()
+    except ProcessLookupError:
+        pass
+
+
+class FollowupJob:
+    def __init__(self, tool, host, service, subnet):
+        self.tool = tool
+        self.host = host
+        self.service = service
+        self.subnet = subnet
+
+    @property
+    def key(self):
+        return f"{self.service}://{self.host}"
+
+
+class FollowupDispatcher:
+    """Run TLS and web follow-up tools against the discovered HTTP(S) hosts
+
+    Every tool shares one worker pool but never has more than its own
+    `limit` runs in flight, so a slow tool cannot take all the workers.
+    Finished runs are recorded in a journal per tool directory and are
+    skipped when the dispatcher is run again.
+    """
+
+    def __init__(self, project_dir, workers=4, tools=None):
+        self.project_dir = Path(project_dir)
+        self.findings_dir = self.project_dir / "findings"
+        self.workers = workers
+        self.tools = tools or TOOLS
+        self.timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.logger = get_logger("followup", self.project_dir / "nmap" / "followup.log")
+        self.results = {tool: {'done': 0, 'failed': 0, 'timeout': 0} for tool in self.tools}
+
+    def print_success(self, message, **fields):
+        log_message(self.logger, '+', message, **fields)
+
+    def print_error(self, message, **fields):
+        log_message(self.logger, '-', message, **fields)
+
+    def print_info(self, message, **fields):
+        log_message(self.logger, '*', message, **fields)
+
+    def journal(self, tool):
+        return ScanJournal(self.project_dir / tool / "followup_journal.jsonl")
+
+    def read_hosts(self):
+        """(host, service, subnet) for every host in the latest HTTP and HTTPS lists"""
+        hosts = []
+        # Subnet lists come first so a host found in both is filed under its subnet
+        directories = sorted(d for d in self.findings_dir.glob("*") if d.is_dir()) + [self.findings_dir]
+        for directory in directories:
+            subnet = directory.name if directory != self.findings_dir else None
+            for service in ('http', 'https'):
+                hosts.extend((host, service, subnet) for host in latest_host_list(directory, service))
+        return hosts
+
+    def build_jobs(self, hosts):
+        """One job per tool and host, leaving out runs that already finished"""
+        jobs = {}
+        for tool, config in self.tools.items():
+            if not shutil.which(config['binary']):
+                self.print_error(f"Skipping {tool}: {config['binary']} not found")
+                continue
+            done = {entry['target'] for entry in self.journal(tool).entries() if entry.get('status') == 'done'}
+            tool_jobs = [FollowupJob(tool, host, service, subnet) for host, service, subnet in hosts
+                         if service in config['services']]
+
+            # Hosts from the tool's own scope.txt are checked over HTTPS
+            scope_file = self.project_dir / tool / "scope.txt"
+            if scope_file.exists() and 'https' in config['services']:
+                with open(scope_file, 'r') as f:
+                    tool_jobs.extend(FollowupJob(tool, line.strip(), 'https', None)
+                                     for line in f if line.strip() and not line.startswith('#'))
+
+            unique = {}
+            for job in tool_jobs:
+                if job.key not in done:
+                    unique.setdefault(job.key, job)
+            skipped = len({job.key for job in tool_jobs}) - len(unique)
+            if skipped:
+                self.print_info(f"{tool}: {skipped} hosts already done")
+            jobs[tool] = deque(unique.values())
+        return jobs
+
+    def command(self, job, output):
+        config = self.tools[job.tool]
+        values = {'host': job.host, 'url': f"{job.service}://{job.host}/", 'output': output}
+        return [config['binary']] + [arg.format(**values) for arg in shlex.split(config['args'])]
+
+    def run_job(self, job):
+        """Run one tool against one host, returning (status, duration)"""
+        config = self.tools[job.tool]
+        output_dir = self.project_dir / job.tool / (job.subnet or '')
+        output_dir.mkdir(parents=True, exist_ok=True)
+        output = output_dir / f"{job.host}_{job.service}_{self.timestamp}"
+        cmd = self.command(job, output)
+
+        start = time.time()
+        with open(f"{output}.log", 'w') as log:
+            # A session of its own, so a timeout can kill the whole process group
+            process = subprocess.Popen(cmd, stdout=log, stderr=subprocess.STDOUT,
+                                       stdin=subprocess.DEVNULL, start_new_session=True)
+            try:
+                status = 'done' if process.wait(timeout=config['timeout']) == 0 else 'failed'
+            except subprocess.TimeoutExpired:
+                stop_process(process)
+                status = 'timeout'
+        duration = time.time() - start
+        self.journal(job.tool).record(job.key, status, duration, output=output,
+                                      returncode=process.returncode)
+        return status, duration
+
+    def dispatch(self, jobs):
+        """Feed the shared pool, keeping every tool under its own limit"""
+        running = {tool: 0 for tool in jobs}
+        futures = {}
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            while any(jobs.values()) or futures:
+                # Round-robin over tools so each gets its share of free workers
+                progress = True
+                while progress and len(futures) < self.workers:
+                    progress = False
+                    for tool, queued in jobs.items():
+                        if queued and running[tool] < self.tools[tool]['limit'] and len(futures) < self.workers:
+                            job = queued.popleft()
+                            futures[pool.submit(self.run_job, job)] = job
+                            running[tool] += 1
+                            progress = True
+
+                if not futures:
+                    # Nothing could be started, which only a tool without free slots causes
+                    self.print_error("No follow-up tool can take more jobs, stopping")
+                    break
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    job = futures.pop(future)
+                    running[job.tool] -= 1
+                    try:
+                        status, duration = future.result()
+                    except Exception as e:
+                        # One bad run is recorded and the rest carry on
+                        status, duration = 'failed', 0
+                        self.print_error(f"{job.tool} could not run for {job.key}: {str(e)}", target=job.key)
+                        try:
+                            self.journal(job.tool).record(job.key, status, error=str(e))
+                        except OSError:
+                            pass
+                    self.results[job.tool][status] += 1
+                    if status == 'done':
+                        self.print_success(f"{job.tool} finished {job.key}", target=job.key,
+                                           tool=job.tool, duration=round(duration, 3))
+                    else:
+                        self.print_error(f"{job.tool} {status} for {job.key}", target=job.key,
+                                         tool=job.tool, duration=round(duration, 3))
+
+    def run(self):
+        """Dispatch every pending follow-up run, returning the number that failed"""
+        hosts = self.read_hosts()
+        if not hosts:
+            self.print_error("No HTTP or HTTPS hosts found in findings")
+            return 0
+        jobs = self.build_jobs(hosts)
+        total = sum(len(queued) for queued in jobs.values())
+        self.print_info(f"Dispatching {total} follow-up runs over {self.workers} workers")
+        self.dispatch(jobs)
+
+        failed = 0
+        for tool, counts in self.results.items():
+            self.print_info(f"{tool}: {counts['done']} done, {counts['failed']} failed, "
+                            f"{counts['timeout']} timed out")
+            failed += counts['failed'] + counts['timeout']
+        return failed
+
+
+def check_tool(name, config):
+    """Raise ValueError for settings the dispatcher cannot run with"""
+    for key in ('binary', 'args', 'services', 'limit', 'timeout'):
+        if key not in config:
+            raise ValueError(f"Tool {name} has no {key}")
+    try:
+        fields = {field for _, field, _, _ in string.Formatter().parse(config['args']) if field is not None}
+    except ValueError as e:
+        raise ValueError(f"Tool {name} has invalid args: {str(e)}")
+    unknown = fields - set(PLACEHOLDERS)
+    if unknown:
+        raise ValueError(f"Tool {name} uses unknown placeholders "
+                         f"{', '.join('{' + field + '}' for field in sorted(unknown))} "
+                         f"(known: {', '.join('{' + field + '}' for field in PLACEHOLDERS)})")
+    if not isinstance(config['limit'], int) or config['limit'] < 1:
+        raise ValueError(f"Tool {name} needs a limit of at least 1")
+    if not isinstance(config['timeout'], (int, float)) or config['timeout'] <= 0:
+        raise ValueError(f"Tool {name} needs a positive timeout")
+    if not set(config['services']) <= {'http', 'https'}:
+        raise ValueError(f"Tool {name} services must be http and/or https")
+
+def load_tools(config_file=None, overrides=()):
+    """Default tool settings, updated from a JSON file and name=binary overrides"""
+    tools = {name: dict(config) for name, config in TOOLS.items()}
+    if config_file:
+        with open(config_file, 'r') as f:
+            for name, config in json.load(f).items():
+                tools.setdefault(name, {'services': ['https'], 'limit': 1, 'timeout': 600, 'args': '{host}'})
+                tools[name].update(config)
+    for override in overrides:
+        name, _, binary = override.partition('=')
+        if name not in tools or not binary:
+            raise ValueError(f"Invalid tool override: {override}")
+        tools[name]['binary'] = binary
+    for name, config in tools.items():
+        check_tool(name, config)
+    return tools
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run sslyze, testssl and directory brute forcing against discovered web hosts")
+    parser.add_argument('--project', required=True, help="Project name under ~/Project")
+    parser.add_argument('--workers', type=int, default=4, help="Shared worker pool size (default: 4)")
+    parser.add_argument('--tools', help=f"Comma separated tools to run (default: {','.join(TOOLS)})")
+    parser.add_argument('--tool', dest='overrides', action='append', default=[], metavar='NAME=BINARY',
+                        help="Use another binary for a tool, e.g. testssl=/opt/testssl.sh/testssl.sh")
+    parser.add_argument('--config', type=Path,
+                        help="JSON file with binary, args, services, limit and timeout per tool")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    project_dir = Path.home() / "Project" / args.project
+    if not project_dir.exists():
+        print(f"{Fore.RED}[-] Project not found: {project_dir}{Style.RESET_ALL}")
+        sys.exit(1)
+    try:
+        tools = load_tools(args.config, args.overrides)
+    except (ValueError, OSError) as e:
+        print(f"{Fore.RED}[-] {e}{Style.RESET_ALL}")
+        sys.exit(2)
+    if args.tools:
+        selected = [t.strip() for t in args.tools.split(',') if t.strip()]
+        unknown = set(selected) - set(tools)
+        if unknown:
+            print(f"{Fore.RED}[-] Unknown tools: {', '.join(sorted(unknown))}{Style.RESET_ALL}")
+            sys.exit(2)
+        tools = {name: tools[name] for name in selected}
+    failed = FollowupDispatcher(project_dir, args.workers, tools).run()
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
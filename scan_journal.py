@@ -0,0 +1,77 @@
+import json
+import threading
+import statistics
+from pathlib import Path
+from datetime import datetime
+
+
+class ScanJournal:
+    """Append-only JSON lines record of every finished scan"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.lock = threading.Lock()
+
+    def record(self, target, status, duration=None, **details):
+        """Append one scan result to the journal"""
+        entry = {
+            'time': datetime.now().isoformat(timespec='seconds'),
+            'target': target,
+            'status': status,
+        }
+        if duration is not None:
+            entry['duration'] = round(duration, 3)
+        entry.update({k: str(v) if isinstance(v, Path) else v for k, v in details.items()})
+
+        with self.lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, 'a') as f:
+                f.write(json.dumps(entry) + "\n")
+
+    def entries(self):
+        """Yield every entry recorded so far, skipping torn lines"""
+        if not self.path.exists():
+            return
+        with open(self.path, 'r') as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+
+class ScanHistory:
+    """Durations and known-live hosts gathered from earlier runs of a project"""
+
+    def __init__(self, journal_paths=(), findings_dir=None):
+        self.durations = {}
+        self.port_rates = []
+        self.active = set()
+
+        for path in journal_paths:
+            for entry in ScanJournal(path).entries():
+                if entry.get('status') != 'done' or 'duration' not in entry:
+                    continue
+                # Later runs overwrite earlier ones
+                self.durations[entry['target']] = entry['duration']
+                ports = entry.get('ports')
+                if ports:
+                    self.port_rates.append(entry['duration'] / len(str(ports).split(',')))
+
+        if findings_dir and Path(findings_dir).exists():
+            for port_list in Path(findings_dir).glob("**/ip_port_list.txt"):
+                with open(port_list, 'r') as f:
+                    for line in f:
+                        if ':' in line:
+                            self.active.add(line.split(':')[0].strip())
+
+    def median_duration(self, default):
+        """Typical scan duration, used for targets never scanned before"""
+        if not self.durations:
+            return default
+        return statistics.median(self.durations.values())
+
+    def seconds_per_port(self, default):
+        if not self.port_rates:
+            return default
+        return statistics.median(self.port_rates)
@@ -0,0 +1,144 @@
+import sys
+import json
+import queue
+import atexit
+import logging
+import threading
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from colorama import Fore, Style
+
+MAX_LOG_BYTES = 10 * 1024 * 1024
+LOG_BACKUPS = 5
+
+COLORS = {'+': Fore.GREEN, '-': Fore.RED, '*': Fore.BLUE}
+
+_queue = queue.SimpleQueue()
+_listener = None
+# stage -> (log file path, RotatingFileHandler)
+_files = {}
+_lock = threading.Lock()
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line with the stage and any target/duration fields"""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'stage': record.name.split('.')[-1],
+            'message': record.getMessage(),
+        }
+        entry.update(getattr(record, 'fields', None) or {})
+        return json.dumps(entry, default=str)
+
+
+class ConsoleFormatter(logging.Formatter):
+    """The coloured [+]/[-]/[*] lines the scripts have always printed"""
+
+    def format(self, record):
+        if getattr(record, 'raw', False):
+            return record.getMessage()
+        marker = getattr(record, 'marker', '-' if record.levelno >= logging.ERROR else '*')
+        if marker is None:
+            # Result lines are printed as they are
+            return f"{Fore.CYAN}{record.getMessage()}{Style.RESET_ALL}"
+        return f"{COLORS.get(marker, '')}[{marker}] {record.getMessage()}{Style.RESET_ALL}"
+
+
+class StageFileHandler(logging.Handler):
+    """Write each record to its stage's log file; stages without one only reach the console"""
+
+    def emit(self, record):
+        entry = _files.get(record.name.split('.')[-1])
+        if entry:
+            entry[1].handle(record)
+
+
+def queue_logger(name):
+    logger = logging.getLogger(f"netscan.{name}")
+    if not logger.handlers:
+        logger.handlers = [QueueHandler(_queue)]
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+    return logger
+
+def start_listener():
+    """Start the one writer thread of the process; called with _lock held"""
+    global _listener
+    if _listener is None:
+        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler.setFormatter(ConsoleFormatter())
+        _listener = QueueListener(_queue, StageFileHandler(), console_handler)
+        _listener.start()
+
+def get_logger(stage, log_file):
+    """Return a stage logger whose records are written by a background thread
+
+    Callers only put records on an in-memory queue. A single QueueListener per
+    process formats them, writes JSON lines to the stage's size-rotated log
+    file and prints the coloured console line, so scan workers never wait on
+    disk or terminal I/O and lines from every stage reach the console in the
+    order they were logged.
+    """
+    logger = queue_logger(stage)
+    with _lock:
+        start_listener()
+        current = _files.get(stage)
+        if current and current[0] == str(log_file):
+            return logger
+        file_handler = RotatingFileHandler(log_file, maxBytes=MAX_LOG_BYTES, backupCount=LOG_BACKUPS)
+        file_handler.setFormatter(JsonFormatter())
+        if current:
+            # Records already queued for the old file are written there first
+            drain()
+            current[1].close()
+        _files[stage] = (str(log_file), file_handler)
+    return logger
+
+def log_message(logger, marker, message, **fields):
+    """Log a print_* message; before a project is selected it only goes to the console"""
+    if logger is None:
+        if _listener is not None:
+            queue_logger("console").info(message, extra={'marker': marker, 'fields': fields})
+        elif marker is None:
+            print(f"{Fore.CYAN}{message}{Style.RESET_ALL}")
+        else:
+            print(f"{COLORS[marker]}[{marker}] {message}{Style.RESET_ALL}")
+        return
+    level = logging.ERROR if marker == '-' else logging.INFO
+    logger.log(level, message, extra={'marker': marker, 'fields': fields})
+
+def print_console(text):
+    """Print text as is, such as a progress view, in order with the log lines but not to any file"""
+    if _listener is None:
+        print(text)
+        sys.stdout.flush()
+        return
+    queue_logger("console").info(text, extra={'raw': True})
+
+def drain():
+    """Write out every queued record; called with _lock held"""
+    if _listener is not None:
+        # stop() returns once everything queued before it is handled
+        _listener.stop()
+        _listener.start()
+
+def flush_logging():
+    """Wait until every record logged so far is on the console and in its file"""
+    with _lock:
+        drain()
+
+def stop_logging():
+    """Flush every queued record, stop the writer thread and close the log files"""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+        for _, file_handler in _files.values():
+            file_handler.close()
+        _files.clear()
+
+atexit.register(stop_logging)
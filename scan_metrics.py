@@ -0,0 +1,169 @@
+import os
+import json
+import time
+import threading
+from pathlib import Path
+from datetime import datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+DURATION_BUCKETS = (1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600, 7200)
+LATENCY_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+METRIC_HELP = {
+    'queue_depth': ('gauge', 'Targets waiting in the scan queue'),
+    'active_sessions': ('gauge', 'Scans currently running'),
+    'rate_allocated': ('gauge', 'Packets per second handed out to running scans'),
+    'scans_scheduled': ('gauge', 'Targets scheduled for this run'),
+    'scans_completed_total': ('counter', 'Scans finished successfully'),
+    'scans_failed_total': ('counter', 'Scans that failed'),
+    'scan_retries_total': ('counter', 'Scans re-queued after a failure'),
+    'scan_timeouts_total': ('counter', 'Scans killed for exceeding their deadline'),
+    'scan_stalls_total': ('counter', 'Scans killed after their output stopped changing'),
+    'scan_duration_seconds': ('histogram', 'Wall-clock duration of a single target scan'),
+    'session_spawn_seconds': ('histogram', 'Time taken to create a tmux session'),
+    'files_parsed_total': ('counter', 'Scan output files parsed'),
+    'bytes_parsed_total': ('counter', 'Bytes of scan output parsed'),
+    'parse_errors_total': ('counter', 'Scan output files that could not be parsed'),
+    'files_per_second': ('gauge', 'Parse throughput over the run'),
+}
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for idx, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[idx] += 1
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 6),
+            'avg': round(self.sum / self.count, 6) if self.count else 0,
+            'buckets': {str(b): c for b, c in zip(self.buckets, self.counts)},
+        }
+
+
+class ScanMetrics:
+    """Thread-safe counters, gauges and histograms for one scan stage"""
+
+    def __init__(self, stage, prefix="netscan"):
+        self.stage = stage
+        self.prefix = prefix
+        self.started = time.time()
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+        self.lock = threading.Lock()
+        self.server = None
+
+    def restart_clock(self):
+        """Measure the run from now, leaving out time spent at interactive prompts"""
+        self.started = time.time()
+
+    def inc(self, name, value=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def set_gauge(self, name, value):
+        with self.lock:
+            self.gauges[name] = value
+
+    def observe(self, name, value, buckets=DURATION_BUCKETS):
+        with self.lock:
+            if name not in self.histograms:
+                self.histograms[name] = Histogram(buckets)
+            self.histograms[name].observe(value)
+
+    def render_prometheus(self):
+        """Render all metrics in the Prometheus text exposition format"""
+        label = f'stage="{self.stage}"'
+        lines = []
+        with self.lock:
+            samples = [(n, v) for n, v in self.counters.items()] + \
+                      [(n, v) for n, v in self.gauges.items()]
+            for name, value in sorted(samples):
+                full_name = f"{self.prefix}_{name}"
+                kind, help_text = METRIC_HELP.get(name, ('gauge', name))
+                lines.append(f"# HELP {full_name} {help_text}")
+                lines.append(f"# TYPE {full_name} {kind}")
+                lines.append(f"{full_name}{{{label}}} {value}")
+
+            for name, hist in sorted(self.histograms.items()):
+                full_name = f"{self.prefix}_{name}"
+                _, help_text = METRIC_HELP.get(name, ('histogram', name))
+                lines.append(f"# HELP {full_name} {help_text}")
+                lines.append(f"# TYPE {full_name} histogram")
+                for bound, count in zip(hist.buckets, hist.counts):
+                    lines.append(f'{full_name}_bucket{{{label},le="{bound}"}} {count}')
+                lines.append(f'{full_name}_bucket{{{label},le="+Inf"}} {hist.count}')
+                lines.append(f"{full_name}_sum{{{label}}} {hist.sum}")
+                lines.append(f"{full_name}_count{{{label}}} {hist.count}")
+
+        return "\n".join(lines) + "\n"
+
+    def summary(self):
+        """Return a JSON-serialisable summary of the run"""
+        with self.lock:
+            return {
+                'stage': self.stage,
+                'started': datetime.fromtimestamp(self.started).isoformat(),
+                'elapsed_seconds': round(time.time() - self.started, 3),
+                'counters': dict(self.counters),
+                'gauges': dict(self.gauges),
+                'histograms': {n: h.to_dict() for n, h in self.histograms.items()},
+            }
+
+    def write_textfile(self, path):
+        """Atomically write metrics for the node_exporter textfile collector"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        with open(tmp_path, 'w') as f:
+            f.write(self.render_prometheus())
+        os.replace(tmp_path, path)
+
+    def write_summary(self, path):
+        """Write the end-of-run JSON summary"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(self.summary(), f, indent=2)
+
+    def start_server(self, port, host="127.0.0.1"):
+        """Serve /metrics over HTTP from a daemon thread"""
+        metrics = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = metrics.render_prometheus().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), MetricsHandler)
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        return self.server
+
+    def stop_server(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
@@ -0,0 +1,260 @@
+import sys
+import json
+import time
+import socket
+import argparse
+from pathlib import Path
+from datetime import datetime
+import numpy as np
+from colorama import init, Fore, Style
+from scan_logging import get_logger, log_message
+
+# Initialize colorama
+init(autoreset=True)
+
+SERVICES = ("ssh_hosts", "http_hosts", "https_hosts")
+# Upper bounds of the ports-per-host histogram buckets
+PORTS_PER_HOST_BINS = (1, 2, 5, 10, 20, 100, 1000, 65535)
+OCTET_WEIGHTS = np.array([1 << 24, 1 << 16, 1 << 8, 1], dtype=np.uint32)
+SEPARATORS = bytes.maketrans(b':,.\n', b'    ')
+
+
+def parse_port_list(data):
+    """Parse ip_port_list.txt content into (ips uint32, ports uint16), one entry per open port
+
+    Every separator is turned into a space so NumPy can read all numbers in
+    one pass; each line then holds four octets followed by its ports, and
+    the number of ports per line comes from the commas before each newline.
+    """
+    if not data.endswith(b'\n'):
+        data += b'\n'
+    if data.count(b':') != data.count(b'\n') or b'\n\n' in data or data.startswith(b'\n'):
+        # Blank or stray lines; rare enough that a Python pass is fine
+        data = b''.join(line for line in data.splitlines(keepends=True) if b':' in line)
+    if not data:
+        return np.empty(0, dtype=np.uint32), np.empty(0, dtype=np.uint16)
+
+    raw = np.frombuffer(data, dtype=np.uint8)
+    line_ends = np.flatnonzero(raw == ord('\n'))
+    line_starts = np.concatenate(([0], line_ends[:-1] + 1))
+    ports_per_line = np.add.reduceat((raw == ord(',')).view(np.uint8), line_starts, dtype=np.int64) + 1
+
+    numbers = np.fromstring(data.translate(SEPARATORS), dtype=np.int64, sep=' ')
+    starts = np.concatenate(([0], np.cumsum(ports_per_line + 4)[:-1]))
+    if len(numbers) != int(ports_per_line.sum()) + 4 * len(line_ends):
+        raise ValueError("malformed ip_port_list.txt")
+
+    octet_idx = starts[:, None] + np.arange(4)
+    line_ips = numbers[octet_idx].astype(np.uint32) @ OCTET_WEIGHTS
+    is_port = np.ones(len(numbers), dtype=bool)
+    is_port[octet_idx.ravel()] = False
+    return np.repeat(line_ips, ports_per_line), numbers[is_port].astype(np.uint16)
+
+def sorted_unique(values, return_counts=False):
+    """np.unique by sorting, which beats the hash-based np.unique of NumPy 2 on large integer arrays"""
+    values = np.sort(values)
+    first = np.empty(len(values), dtype=bool)
+    first[:1] = True
+    np.not_equal(values[1:], values[:-1], out=first[1:])
+    if not return_counts:
+        return values[first]
+    starts = np.flatnonzero(first)
+    return values[starts], np.diff(np.append(starts, len(values)))
+
+def ip_string(value):
+    return socket.inet_ntoa(int(value).to_bytes(4, 'big'))
+
+def service_name(port):
+    try:
+        return socket.getservbyport(int(port), 'tcp')
+    except OSError:
+        return ''
+
+
+class FindingsReport:
+    """Port and service statistics across every findings list of a project"""
+
+    def __init__(self, project_dir, top=20):
+        self.project_dir = Path(project_dir)
+        self.findings_dir = self.project_dir / "findings"
+        self.top = top
+        self.ips = np.empty(0, dtype=np.uint32)
+        self.ports = np.empty(0, dtype=np.uint16)
+        self.services = {}
+        self.logger = get_logger("report", self.project_dir / "nmap" / "report.log")
+
+    def print_success(self, message, **fields):
+        log_message(self.logger, '+', message, **fields)
+
+    def print_error(self, message, **fields):
+        log_message(self.logger, '-', message, **fields)
+
+    def print_info(self, message, **fields):
+        log_message(self.logger, '*', message, **fields)
+
+    def findings_dirs(self):
+        return [self.findings_dir] + sorted(d for d in self.findings_dir.glob("*") if d.is_dir())
+
+    def load(self):
+        """Read every ip_port_list.txt and the latest service host lists"""
+        ips, ports = [], []
+        for directory in self.findings_dirs():
+            port_list = directory / "ip_port_list.txt"
+            if port_list.exists():
+                try:
+                    file_ips, file_ports = parse_port_list(port_list.read_bytes())
+                except ValueError as e:
+                    self.print_error(f"Skipping {port_list}: {str(e)}")
+                    continue
+                ips.append(file_ips)
+                ports.append(file_ports)
+
+            for service in SERVICES:
+                lists = sorted(directory.glob(f"{service}_*.txt"))
+                if lists:
+                    with open(lists[-1], 'r') as f:
+                        self.services.setdefault(service, set()).update(line.strip() for line in f if line.strip())
+
+        if ips:
+            # The main list and the subnet lists can overlap, so pairs are deduplicated
+            pairs = sorted_unique((np.concatenate(ips).astype(np.uint64) << 16) | np.concatenate(ports))
+            self.ips = (pairs >> 16).astype(np.uint32)
+            self.ports = (pairs & 0xFFFF).astype(np.uint16)
+        return len(self.ports)
+
+    def top_ports(self):
+        counts = np.bincount(self.ports, minlength=65536)
+        order = np.argsort(counts)[::-1][:self.top]
+        return [{'port': int(p), 'service': service_name(p), 'hosts': int(counts[p])}
+                for p in order if counts[p]]
+
+    def ports_per_host(self):
+        _, per_host = sorted_unique(self.ips, return_counts=True)
+        bins = np.searchsorted(PORTS_PER_HOST_BINS, per_host)
+        histogram = np.bincount(bins, minlength=len(PORTS_PER_HOST_BINS))
+        lower = (1,) + tuple(b + 1 for b in PORTS_PER_HOST_BINS[:-1])
+        return {
+            'hosts': int(len(per_host)),
+            'mean': round(float(per_host.mean()), 2),
+            'median': float(np.median(per_host)),
+            'p95': float(np.percentile(per_host, 95)),
+            'max': int(per_host.max()),
+            'histogram': {(f"{lo}" if lo == hi else f"{lo}-{hi}"): int(count)
+                          for lo, hi, count in zip(lower, PORTS_PER_HOST_BINS, histogram)},
+        }
+
+    def subnet_heatmap(self, top_ports):
+        """Hosts with each of the top ports open, per /24, for the most exposed subnets"""
+        subnets = self.ips >> 8
+        exposure = sorted_unique(subnets, return_counts=True)
+        order = np.argsort(exposure[1])[::-1][:self.top]
+        top_subnets = exposure[0][order]
+        columns = np.array([p['port'] for p in top_ports], dtype=np.uint16)
+
+        # Count (subnet, port) pairs once, then pick out the rows and columns shown
+        keys, counts = sorted_unique((subnets.astype(np.uint64) << 16) | self.ports, return_counts=True)
+        key_subnets, key_ports = keys >> 16, keys & 0xFFFF
+        valid = np.isin(key_subnets, top_subnets) & np.isin(key_ports, columns)
+        row_order, col_order = np.argsort(top_subnets), np.argsort(columns)
+        rows = row_order[np.searchsorted(top_subnets, key_subnets[valid], sorter=row_order)]
+        cols = col_order[np.searchsorted(columns, key_ports[valid], sorter=col_order)]
+        grid = np.zeros((len(top_subnets), len(columns)), dtype=np.int64)
+        grid[rows, cols] = counts[valid]
+        return {
+            'ports': [int(p) for p in columns],
+            'subnets': [f"{ip_string(s << 8)}/24" for s in top_subnets],
+            'open_ports': [int(c) for c in exposure[1][order]],
+            'hosts': grid.tolist(),
+        }
+
+    def build(self):
+        """Compute every aggregate; returns a JSON-serialisable dict"""
+        if not len(self.ports):
+            return {'project': self.project_dir.name, 'open_ports': 0}
+        top_ports = self.top_ports()
+        return {
+            'project': self.project_dir.name,
+            'generated': datetime.now().isoformat(timespec='seconds'),
+            'open_ports': int(len(self.ports)),
+            'unique_ports': int(np.count_nonzero(np.bincount(self.ports))),
+            'top_ports': top_ports,
+            'ports_per_host': self.ports_per_host(),
+            'subnets': self.subnet_heatmap(top_ports[:10]),
+            'services': {service.split('_')[0]: len(hosts) for service, hosts in sorted(self.services.items())},
+        }
+
+    def markdown(self, report):
+        lines = [f"# Findings report: {report['project']}", ""]
+        if not report['open_ports']:
+            return "\n".join(lines + ["No open ports found.", ""])
+        per_host = report['ports_per_host']
+        lines += [
+            f"Generated {report['generated']}: {per_host['hosts']} hosts, "
+            f"{report['open_ports']} open ports, {report['unique_ports']} distinct ports",
+            "",
+            "## Top open ports", "",
+            "| Port | Service | Hosts |", "|---:|---|---:|",
+        ]
+        lines += [f"| {p['port']} | {p['service']} | {p['hosts']} |" for p in report['top_ports']]
+
+        lines += ["", "## Open ports per host", "",
+                  f"Mean {per_host['mean']}, median {per_host['median']}, "
+                  f"p95 {per_host['p95']}, max {per_host['max']}", "",
+                  "| Ports | Hosts |", "|---|---:|"]
+        lines += [f"| {bucket} | {count} |" for bucket, count in per_host['histogram'].items()]
+
+        subnets = report['subnets']
+        lines += ["", "## Most exposed subnets", "",
+                  "| Subnet | Open ports | " + " | ".join(str(p) for p in subnets['ports']) + " |",
+                  "|---|---:|" + "---:|" * len(subnets['ports'])]
+        for subnet, total, row in zip(subnets['subnets'], subnets['open_ports'], subnets['hosts']):
+            lines.append(f"| {subnet} | {total} | " + " | ".join(str(c) for c in row) + " |")
+
+        if report['services']:
+            lines += ["", "## Services", "", "| Service | Hosts |", "|---|---:|"]
+            lines += [f"| {service} | {count} |" for service, count in report['services'].items()]
+        return "\n".join(lines) + "\n"
+
+    def write(self, formats=('md', 'json')):
+        """Load, aggregate and write the report next to the findings"""
+        start = time.time()
+        rows = self.load()
+        self.print_info(f"Loaded {rows} open ports in {time.time() - start:.2f}s", open_ports=rows,
+                        duration=round(time.time() - start, 3))
+        report = self.build()
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        written = []
+        if 'json' in formats:
+            path = self.findings_dir / f"report_{timestamp}.json"
+            with open(path, 'w') as f:
+                json.dump(report, f, indent=2)
+            written.append(path)
+        if 'md' in formats:
+            path = self.findings_dir / f"report_{timestamp}.md"
+            with open(path, 'w') as f:
+                f.write(self.markdown(report))
+            written.append(path)
+        for path in written:
+            self.print_success(f"Wrote {path}")
+        self.print_info(f"Report built in {time.time() - start:.2f}s", duration=round(time.time() - start, 3))
+        return report
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Summarise open ports and services across a project's findings")
+    parser.add_argument('--project', required=True, help="Project name under ~/Project")
+    parser.add_argument('--top', type=int, default=20, help="Ports and subnets to list (default: 20)")
+    parser.add_argument('--format', choices=('md', 'json', 'both'), default='both', help="Report format (default: both)")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    project_dir = Path.home() / "Project" / args.project
+    if not project_dir.exists():
+        print(f"{Fore.RED}[-] Project not found: {project_dir}{Style.RESET_ALL}")
+        sys.exit(1)
+    formats = ('md', 'json') if args.format == 'both' else (args.format,)
+    FindingsReport(project_dir, args.top).write(formats)
+
+if __name__ == "__main__":
+    main()
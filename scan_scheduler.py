@@ -0,0 +1,272 @@
+import os
+import heapq
+import queue
+import random
+import signal
+import itertools
+import ipaddress
+import threading
+import subprocess
+import time
+import psutil
+
+# One level of operator priority is worth this many seconds of estimated scan time
+PRIORITY_STEP = 3600
+
+
+class ScanTimeout(Exception):
+    """A scan overran its deadline or stopped making progress"""
+
+
+class RetryPolicy:
+    """Exponential backoff with a per-target limit and a shared retry budget"""
+
+    def __init__(self, max_retries=2, base_delay=30, max_delay=600, retry_budget=None):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_budget = retry_budget
+        self.retries_used = 0
+        self.lock = threading.Lock()
+
+    def allow_retry(self, attempt):
+        """Check whether a target that failed attempt number `attempt` may run again"""
+        with self.lock:
+            if attempt > self.max_retries:
+                return False
+            if self.retry_budget is not None and self.retries_used >= self.retry_budget:
+                return False
+            self.retries_used += 1
+            return True
+
+    def delay(self, attempt):
+        """Backoff before the next attempt, with jitter so retries do not line up"""
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return delay * random.uniform(0.8, 1.2)
+
+
+class ScanPriorityQueue(queue.Queue):
+    """Bounded queue that hands out the most important, shortest scan first
+
+    `key` maps a queued target to (priority, estimated seconds). Higher
+    priorities go first, then shorter jobs. Every second spent waiting counts
+    as `aging` seconds off the estimate, so low-priority work is never
+    starved; because all targets age at the same rate the order can be fixed
+    at insertion time.
+    """
+
+    def __init__(self, maxsize=0, key=None, aging=1.0):
+        self.key = key or (lambda item: (0, 0))
+        self.aging = aging
+        super().__init__(maxsize)
+
+    def _init(self, maxsize):
+        self.heap = []
+        self.counter = itertools.count()
+
+    def _qsize(self):
+        return len(self.heap)
+
+    def _put(self, item):
+        try:
+            priority, cost = self.key(item)
+        except Exception:
+            priority, cost = 0, 0
+        score = cost - priority * PRIORITY_STEP + self.aging * time.time()
+        heapq.heappush(self.heap, (score, next(self.counter), item))
+
+    def _get(self):
+        return heapq.heappop(self.heap)[2]
+
+
+def parse_scope_line(line):
+    """Split a scope line into its target and optional priority=N"""
+    fields = line.split()
+    if not fields:
+        return None, 0
+    priority = 0
+    for field in fields[1:]:
+        if field.startswith('priority='):
+            try:
+                priority = int(field.split('=', 1)[1])
+            except ValueError:
+                pass
+    return fields[0], priority
+
+def priority_of(ip, rules):
+    """Priority of the most specific scope entry containing ip"""
+    best = None
+    try:
+        address = ipaddress.ip_address(ip)
+    except ValueError:
+        return 0
+    for network, priority in rules:
+        if address in network and (best is None or network.prefixlen > best[0].prefixlen):
+            best = (network, priority)
+    return best[1] if best else 0
+
+def load_scope_priorities(scope_file):
+    """Read (network, priority) rules for every prioritised IP or subnet line"""
+    rules = []
+    try:
+        with open(scope_file, 'r') as f:
+            for line in f:
+                target, priority = parse_scope_line(line)
+                if not target or not priority:
+                    continue
+                try:
+                    rules.append((ipaddress.ip_network(target, strict=False), priority))
+                except ValueError:
+                    continue
+    except OSError:
+        pass
+    return rules
+
+
+class RateBudget:
+    """Split a packets/sec budget for the whole run across concurrent nmap sessions
+
+    A running nmap cannot have its rate changed, so every session keeps the
+    share it started with. Each new session gets an even split of the budget
+    that is free at that moment among the sessions that can still start, so
+    the total never exceeds the budget and the tail of a run speeds up as
+    sessions finish.
+    """
+
+    def __init__(self, total_rate, sessions, min_fraction=0):
+        self.total_rate = total_rate
+        self.sessions = sessions
+        self.min_fraction = min_fraction
+        self.leases = {}
+        self.lock = threading.Lock()
+
+    def acquire(self, key, queued=0, busy=1):
+        """Reserve a rate for a scan that is about to start
+
+        `queued` is the number of jobs waiting in the queue and `busy` the
+        number of workers holding a job, this one included.
+        """
+        with self.lock:
+            free = self.total_rate - sum(self.leases.values())
+            idle = max(1, self.sessions - len(self.leases))
+            starting = max(1, busy - len(self.leases))
+            share = min(idle, starting + queued)
+            # Keep a small floor for idle sessions, e.g. for retries arriving later
+            floor = self.total_rate / (4 * self.sessions)
+            rate = min(free / share, free - floor * (idle - share))
+            rate = max(1, int(rate))
+            self.leases[key] = rate
+            return rate
+
+    def release(self, key):
+        with self.lock:
+            self.leases.pop(key, None)
+
+    def allocated(self):
+        with self.lock:
+            return sum(self.leases.values())
+
+    def nmap_args(self, rate):
+        args = f"--max-rate {rate}"
+        if self.min_fraction:
+            args += f" --min-rate {max(1, int(rate * self.min_fraction))}"
+        return args
+
+
+class RetryScheduler:
+    """Hold failed targets until their backoff expires, then put them back on the queue"""
+
+    def __init__(self, scan_queue):
+        self.scan_queue = scan_queue
+        self.heap = []
+        self.counter = 0
+        self.in_flight = 0
+        self.lock = threading.Lock()
+        self.wakeup = threading.Condition(self.lock)
+        self.stopped = False
+        self.thread = threading.Thread(target=self.run)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def schedule(self, item, delay):
+        with self.wakeup:
+            self.counter += 1
+            self.in_flight += 1
+            heapq.heappush(self.heap, (time.time() + delay, self.counter, item))
+            self.wakeup.notify()
+
+    def pending(self):
+        """Number of targets waiting for their retry"""
+        with self.lock:
+            return self.in_flight
+
+    def run(self):
+        while True:
+            with self.wakeup:
+                while not self.stopped and (not self.heap or self.heap[0][0] > time.time()):
+                    timeout = self.heap[0][0] - time.time() if self.heap else None
+                    self.wakeup.wait(timeout=timeout)
+                if self.stopped:
+                    return
+                _, _, item = heapq.heappop(self.heap)
+
+            # Put before decrementing so the queue never looks idle while a retry is pending
+            self.scan_queue.put(item)
+            with self.lock:
+                self.in_flight -= 1
+
+    def stop(self):
+        with self.wakeup:
+            self.stopped = True
+            self.wakeup.notify()
+
+
+def output_complete(gnmap_file, since=None):
+    """Check the tail of a .gnmap file for nmap's completion marker
+
+    Files last written before `since` are left over from an earlier run and
+    do not count.
+    """
+    try:
+        if since and os.path.getmtime(gnmap_file) < since:
+            return False
+        with open(gnmap_file, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            f.seek(max(0, f.tell() - 4096))
+            return b"# Nmap done" in f.read()
+    except OSError:
+        return False
+
+def kill_pane_processes(session_name, grace=5):
+    """Terminate every process group running under a tmux session's pane"""
+    result = subprocess.run(['tmux', 'display-message', '-p', '-t', f"={session_name}:", '#{pane_pid}'],
+                            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    try:
+        shell = psutil.Process(int(result.stdout.strip()))
+        children = shell.children(recursive=True)
+    except (ValueError, psutil.Error):
+        return
+
+    groups = set()
+    for child in children:
+        try:
+            groups.add(os.getpgid(child.pid))
+        except OSError:
+            continue
+    try:
+        # Never signal the pane's own shell or the group we are running in
+        groups.discard(os.getpgid(shell.pid))
+    except OSError:
+        pass
+    groups.discard(os.getpgid(0))
+
+    for sig in (signal.SIGTERM, signal.SIGKILL):
+        for pgid in groups:
+            try:
+                os.killpg(pgid, sig)
+            except OSError:
+                pass
+        if sig == signal.SIGTERM:
+            _, alive = psutil.wait_procs(children, timeout=grace)
+            if not alive:
+                break
@@ -0,0 +1,146 @@
+import sys
+import shutil
+import zlib
+import argparse
+import ipaddress
+from pathlib import Path
+from colorama import init, Fore, Style
+from scan_logging import get_logger, log_message
+from port_scraper import PortScraper
+from service_parser import ServiceParser
+
+# Initialize colorama
+init(autoreset=True)
+
+
+def parse_shard(value):
+    """Parse an --shard argument of the form i/N (1 <= i <= N)"""
+    try:
+        index, count = (int(part) for part in value.split('/'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid shard '{value}', expected i/N")
+    if count < 1 or not 1 <= index <= count:
+        raise argparse.ArgumentTypeError(f"Invalid shard '{value}', need 1 <= i <= N")
+    return index, count
+
+def shard_of(ip, count):
+    """Return the 1-based shard an IP belongs to, stable across hosts and runs"""
+    try:
+        address = ipaddress.ip_address(ip)
+    except ValueError:
+        # A /32 or /128 written as a network is still a single host
+        network = ipaddress.ip_network(ip, strict=False)
+        if network.num_addresses != 1:
+            raise ValueError(f"{ip} is a network, not a single address")
+        address = network.network_address
+    return zlib.crc32(address.packed) % count + 1
+
+def in_shard(ip, shard):
+    """Check whether an IP belongs to the given (i, N) shard"""
+    if not shard:
+        return True
+    index, count = shard
+    try:
+        return shard_of(ip, count) == index
+    except ValueError as e:
+        raise ValueError(f"Cannot assign '{ip}' to a shard: {str(e)}")
+
+def count_shard_hosts(network, shard):
+    """Count the hosts of a network that fall in a shard without building a list"""
+    if not shard:
+        if network.version == 4 and network.prefixlen < 31:
+            return network.num_addresses - 2
+        if network.version == 6 and network.prefixlen < 127:
+            return network.num_addresses - 1
+        return network.num_addresses
+    return sum(1 for ip in network.hosts() if in_shard(str(ip), shard))
+
+def shard_name(shard):
+    index, count = shard
+    return f"shard_{index}_of_{count}"
+
+
+class ShardMerger:
+    """Combine shard outputs into the normal nmap/ and findings/ layout"""
+
+    def __init__(self, project_dir):
+        self.project_dir = Path(project_dir)
+        self.nmap_dir = self.project_dir / "nmap"
+        self.shards_dir = self.nmap_dir / "shards"
+        self.logger = get_logger("shard_merge", self.nmap_dir / "shard_merge.log")
+
+    def print_success(self, message, **fields):
+        log_message(self.logger, '+', message, **fields)
+
+    def print_error(self, message, **fields):
+        log_message(self.logger, '-', message, **fields)
+
+    def print_info(self, message, **fields):
+        log_message(self.logger, '*', message, **fields)
+
+    def move_tree(self, source_dir, target_dir):
+        """Move every file under source_dir into target_dir, keeping subnet folders"""
+        moved = 0
+        for source in source_dir.rglob("*"):
+            if not source.is_file():
+                continue
+            target = target_dir / source.relative_to(source_dir)
+            target.parent.mkdir(parents=True, exist_ok=True)
+            if target.exists():
+                self.print_error(f"Overwriting {target} with shard copy")
+            shutil.move(str(source), str(target))
+            moved += 1
+        return moved
+
+    def merge_journals(self, shard_dir, stage):
+        journal = shard_dir / f"{stage}_journal.jsonl"
+        if journal.exists():
+            with open(journal, 'r') as src, open(self.nmap_dir / f"{stage}_journal.jsonl", 'a') as dst:
+                shutil.copyfileobj(src, dst)
+            journal.unlink()
+
+    def merge(self):
+        """Merge all shard directories and rebuild findings"""
+        if not self.shards_dir.exists():
+            self.print_error(f"No shard outputs found in {self.shards_dir}")
+            return False
+
+        port_files = service_files = 0
+        for shard_dir in sorted(d for d in self.shards_dir.iterdir() if d.is_dir()):
+            self.print_info(f"Merging {shard_dir.name}")
+            if (shard_dir / "output").exists():
+                port_files += self.move_tree(shard_dir / "output", self.nmap_dir / "output")
+            if (shard_dir / "service_scan").exists():
+                service_files += self.move_tree(shard_dir / "service_scan", self.nmap_dir / "service_scan")
+            for stage in ('port_scan', 'service_scan'):
+                self.merge_journals(shard_dir, stage)
+            shutil.rmtree(shard_dir)
+
+        self.print_success(f"Merged {port_files} port scan and {service_files} service scan files")
+
+        if port_files:
+            scraper = PortScraper()
+            scraper.set_project(self.project_dir)
+            scraper.process_files()
+        if service_files:
+            parser = ServiceParser()
+            parser.set_project(self.project_dir)
+            parser.process_scans()
+        return True
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Merge --shard outputs back into the project layout")
+    parser.add_argument('--project', required=True, help="Project name under ~/Project")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    project_dir = Path.home() / "Project" / args.project
+    if not project_dir.exists():
+        print(f"{Fore.RED}[-] Project not found: {project_dir}{Style.RESET_ALL}")
+        sys.exit(1)
+    ShardMerger(project_dir).merge()
+
+if __name__ == "__main__":
+    main()
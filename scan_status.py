@@ -0,0 +1,179 @@
+import json
+import time
+import threading
+from pathlib import Path
+from datetime import datetime
+from functools import lru_cache
+from urllib.parse import urlsplit, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from gnmap_parser import open_ports, service_hosts
+
+# Pollers within this window share one snapshot
+SNAPSHOT_TTL = 1.0
+DEFAULT_PAGE = 100
+MAX_PAGE = 1000
+
+
+@lru_cache(maxsize=4096)
+def port_results(path):
+    """Open ports per IP of a finished port scan"""
+    return open_ports(Path(path), 1)
+
+@lru_cache(maxsize=4096)
+def service_results(path):
+    """SSH, HTTP and HTTPS hosts of a finished service scan"""
+    ssh_ips, http_ips, https_ips = service_hosts(Path(path), 1)
+    return {'ssh': sorted(ssh_ips), 'http': sorted(http_ips), 'https': sorted(https_ips)}
+
+def page_args(query):
+    """offset and limit from a query string, clamped to sane values"""
+    try:
+        offset = max(int(query.get('offset', ['0'])[0]), 0)
+        limit = min(max(int(query.get('limit', [str(DEFAULT_PAGE)])[0]), 1), MAX_PAGE)
+    except ValueError:
+        raise ValueError("offset and limit must be integers")
+    return offset, limit
+
+
+class StatusServer:
+    """Read-only JSON view of a running scanner
+
+    Handlers never take the scanner's lock: they copy the shared dicts and
+    lists (a single C-level operation under the GIL) and cache the result
+    for SNAPSHOT_TTL seconds, so polling costs the workers nothing. Result
+    files are parsed on request, in the handler thread, only for the page
+    being served.
+    """
+
+    def __init__(self, scanner, parse_result):
+        self.scanner = scanner
+        self.parse_result = parse_result
+        self.started = time.time()
+        self.server = None
+        self.cached = None
+        self.cached_at = 0
+
+    def snapshot(self):
+        now = time.time()
+        cached = self.cached
+        if cached is not None and now - self.cached_at < SNAPSHOT_TTL:
+            return cached
+
+        scanner = self.scanner
+        active = dict(scanner.active_scans)
+        completed = scanner.completed_scans
+        failed = len(scanner.failed_scans)
+        elapsed = now - self.started
+        throughput = completed / elapsed * 60 if elapsed else 0
+        remaining = max(scanner.total_scans - completed, 0)
+
+        snapshot = {
+            'stage': scanner.metrics.stage,
+            'project': scanner.project_dir.name if scanner.project_dir else None,
+            'started': datetime.fromtimestamp(self.started).isoformat(timespec='seconds'),
+            'elapsed_seconds': round(elapsed, 1),
+            'total': scanner.total_scans,
+            'completed': completed,
+            'failed': failed,
+            'queued': scanner.scan_queue.qsize(),
+            'retries': scanner.retry_policy.retries_used,
+            'sessions': scanner.max_sessions,
+            'throughput_per_minute': round(throughput, 2),
+            'eta_seconds': self.eta(remaining, throughput),
+            'active': [self.describe(target, dict(info), now) for target, info in sorted(active.items())],
+        }
+        self.cached = snapshot
+        self.cached_at = now
+        return snapshot
+
+    def eta(self, remaining, throughput):
+        """The scanner's history-based ETA, or the run's throughput so far"""
+        if getattr(self.scanner, 'eta', None):
+            return round(self.scanner.estimate_eta())
+        return round(remaining / throughput * 60) if throughput else None
+
+    def describe(self, target, info, now):
+        eta = getattr(self.scanner, 'eta', None)
+        return {
+            'target': target,
+            'progress': info.get('progress', 0),
+            'elapsed_seconds': round(now - info['start_time'], 1),
+            'eta_seconds': round(eta.remaining(info, now)) if eta else None,
+            'rate': info.get('rate'),
+            'timing': info.get('timing'),
+        }
+
+    def failures(self, offset, limit):
+        failed = sorted(dict(self.scanner.failed_scans).items())
+        return {
+            'total': len(failed),
+            'offset': offset,
+            'items': [{'target': t, 'reason': r} for t, r in failed[offset:offset + limit]],
+        }
+
+    def results(self, offset, limit):
+        # completed_outputs is append-only, so a slice is a stable page
+        outputs = self.scanner.completed_outputs
+        total = len(outputs)
+        items = []
+        for path in outputs[offset:min(offset + limit, total)]:
+            try:
+                found = self.parse_result(str(path))
+            except OSError:
+                found = None
+            items.append({'target': Path(path).stem, 'file': str(path), 'results': found})
+        return {'total': total, 'offset': offset, 'items': items}
+
+    def route(self, url):
+        """Return the JSON document for a request path, or None for unknown paths"""
+        parts = urlsplit(url)
+        query = parse_qs(parts.query)
+        if parts.path in ('/', '/status'):
+            return self.snapshot()
+        if parts.path == '/scans':
+            return self.snapshot()['active']
+        if parts.path == '/failures':
+            return self.failures(*page_args(query))
+        if parts.path == '/results':
+            return self.results(*page_args(query))
+        return None
+
+    def start(self, port, host="127.0.0.1"):
+        """Serve the status API over HTTP from a daemon thread"""
+        status = self
+
+        class StatusHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                try:
+                    document = status.route(self.path)
+                except ValueError as e:
+                    self.send_json(400, {'error': str(e)})
+                    return
+                if document is None:
+                    self.send_json(404, {'error': f"unknown path {self.path}"})
+                    return
+                self.send_json(200, document)
+
+            def send_json(self, code, document):
+                body = json.dumps(document).encode()
+                self.send_response(code)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), StatusHandler)
+        self.server.daemon_threads = True
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        return self.server
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
@@ -0,0 +1,139 @@
+import re
+import json
+import threading
+import subprocess
+import ipaddress
+from pathlib import Path
+import xml.etree.ElementTree as ET
+
+# Weight of a new measurement in the running RTT average
+EWMA_WEIGHT = 0.3
+
+# (max srtt ms, max loss, -T level, --max-retries), checked in order
+TIMING_TIERS = (
+    (10, 0.01, 4, 2),     # LAN
+    (100, 0.05, 3, 4),    # regional links
+    (None, None, 3, 6),   # slow or lossy WAN
+)
+
+
+def subnet_key(ip):
+    """Profiles are kept per /24 (IPv4) or /64 (IPv6)"""
+    address = ipaddress.ip_address(ip)
+    prefix = 24 if address.version == 4 else 64
+    return str(ipaddress.ip_network(f"{ip}/{prefix}", strict=False))
+
+def read_xml_times(xml_file):
+    """Return nmap's smoothed RTT and variance for a host in milliseconds"""
+    try:
+        times = ET.parse(xml_file).getroot().find('host/times')
+    except (ET.ParseError, OSError):
+        return None
+    if times is None or not times.get('srtt'):
+        return None
+    return int(times.get('srtt')) / 1000, int(times.get('rttvar', 0)) / 1000
+
+def ping_probe(ip, count=5):
+    """Measure RTT and loss with ping; None when ICMP is unavailable or blocked"""
+    try:
+        result = subprocess.run(['ping', '-c', str(count), '-i', '0.2', '-W', '1', ip],
+                                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                text=True, timeout=count + 5)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+
+    loss = re.search(r'([\d.]+)% packet loss', result.stdout)
+    rtt = re.search(r'= [\d.]+/([\d.]+)/[\d.]+/([\d.]+) ms', result.stdout)
+    if not loss or not rtt:
+        # No replies at all usually means ICMP is filtered, not that the link is lossy
+        return None
+    return float(rtt.group(1)), float(rtt.group(2)), float(loss.group(1)) / 100
+
+
+class TimingProfiles:
+    """RTT and loss profile per subnet, persisted between runs of a project"""
+
+    def __init__(self, path, probe=True):
+        self.path = Path(path)
+        self.probe = probe
+        self.profiles = {}
+        self.probed = set()
+        self.lock = threading.Lock()
+        if self.path.exists():
+            try:
+                with open(self.path, 'r') as f:
+                    self.profiles = json.load(f)
+            except ValueError:
+                self.profiles = {}
+
+    def observe(self, ip, srtt, rttvar, loss=None):
+        """Fold one measurement into the subnet's running averages"""
+        key = subnet_key(ip)
+        with self.lock:
+            profile = self.profiles.get(key)
+            if profile is None:
+                profile = self.profiles[key] = {'srtt': srtt, 'rttvar': rttvar, 'loss': loss or 0, 'samples': 0}
+            else:
+                profile['srtt'] += EWMA_WEIGHT * (srtt - profile['srtt'])
+                profile['rttvar'] += EWMA_WEIGHT * (rttvar - profile['rttvar'])
+                if loss is not None:
+                    profile['loss'] += EWMA_WEIGHT * (loss - profile['loss'])
+            profile['samples'] += 1
+
+    def observe_xml(self, ip, xml_file):
+        times = read_xml_times(xml_file)
+        if times:
+            self.observe(ip, *times)
+
+    def profile(self, ip):
+        """Return the subnet's profile, probing once when nothing is known yet"""
+        key = subnet_key(ip)
+        with self.lock:
+            profile = self.profiles.get(key)
+            if profile or not self.probe or key in self.probed:
+                return profile
+            self.probed.add(key)
+
+        measured = ping_probe(ip)
+        if measured:
+            self.observe(ip, *measured)
+        with self.lock:
+            return self.profiles.get(key)
+
+    def save(self):
+        with self.lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.path.with_suffix('.tmp')
+            with open(tmp_file, 'w') as f:
+                json.dump(self.profiles, f, indent=2)
+            tmp_file.replace(self.path)
+
+    def choose(self, ip, scan_timeout=None):
+        """Pick nmap timing options for a host from its subnet's profile"""
+        profile = self.profile(ip)
+        if not profile:
+            return {}
+
+        for max_rtt, max_loss, level, retries in TIMING_TIERS:
+            if max_rtt is None or (profile['srtt'] <= max_rtt and profile['loss'] <= max_loss):
+                break
+        timing = {
+            'timing_level': level,
+            'max_retries': retries,
+            # nmap's own RTO formula, kept within sane bounds
+            'initial_rtt_timeout': int(min(3000, max(50, profile['srtt'] + 4 * profile['rttvar']))),
+        }
+        if scan_timeout:
+            # Give up slightly before our deadline so nmap still writes its output
+            timing['host_timeout'] = int(scan_timeout * 0.9)
+        return timing
+
+def timing_args(timing):
+    """Render chosen timing options as nmap arguments"""
+    if not timing:
+        return ""
+    args = (f"-T{timing['timing_level']} --max-retries {timing['max_retries']} "
+            f"--initial-rtt-timeout {timing['initial_rtt_timeout']}ms")
+    if 'host_timeout' in timing:
+        args += f" --host-timeout {timing['host_timeout']}s"
+    return args + " "
@@ -0,0 +1,372 @@
+import os
+import sys
+import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+import argparse
+from pathlib import Path
+from colorama import init, Fore, Style
+from scan_logging import get_logger, log_message
+from port_scraper import PortScraper
+from service_parser import ServiceParser
+from scan_scheduler import output_complete
+from scan_compact import LatestIndex
+
+# Initialize colorama
+init(autoreset=True)
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+
+EVENT = struct.Struct('iIII')
+SERVICES = ("ssh_hosts", "http_hosts", "https_hosts")
+
+
+def watched_dirs(root):
+    """A directory and its subnet directories, skipping hidden chunk and archive folders"""
+    if not root.exists():
+        return []
+    return [root] + [d for d in root.iterdir() if d.is_dir() and not d.name.startswith('.')]
+
+
+class InotifyWatcher:
+    """Report files closed or moved into the watched directories, via inotify"""
+
+    def __init__(self, roots):
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.libc = libc
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.roots = roots
+        self.dirs = {}
+        self.overflowed = False
+        for root in roots:
+            root.mkdir(parents=True, exist_ok=True)
+            for directory in watched_dirs(root):
+                self.add_watch(directory)
+
+    def add_watch(self, directory):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {directory}")
+        self.dirs[wd] = directory
+
+    def wait(self, timeout):
+        """Return the files that changed within `timeout` seconds"""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except OSError as e:
+            if e.errno == errno.EAGAIN:
+                return []
+            raise
+
+        changed = []
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = EVENT.unpack_from(data, offset)
+            name = data[offset + EVENT.size:offset + EVENT.size + length].rstrip(b'\0')
+            offset += EVENT.size + length
+            if mask & IN_Q_OVERFLOW:
+                self.overflowed = True
+                continue
+            directory = self.dirs.get(wd)
+            if directory is None or not name:
+                continue
+            path = directory / os.fsdecode(name)
+            if mask & IN_ISDIR:
+                # New subnet directory; files may already be in it
+                if mask & (IN_CREATE | IN_MOVED_TO) and directory in self.roots and not path.name.startswith('.'):
+                    self.add_watch(path)
+                    changed.extend(path.glob("*.gnmap"))
+            elif mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+                changed.append(path)
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """Fallback for systems without inotify
+
+    Directories are only listed again when their mtime changes, and only
+    files that were not complete yet are checked on every poll; everything
+    else is re-checked once every `full_every` polls to catch rewrites.
+    """
+
+    def __init__(self, roots, interval=2.0, full_every=15):
+        self.roots = roots
+        self.interval = interval
+        self.full_every = full_every
+        self.polls = 0
+        self.overflowed = False
+        self.dir_mtimes = {}
+        self.files = {}
+        self.pending = set()
+        self.scan_dirs()
+        for path in list(self.files):
+            if not output_complete(path):
+                self.pending.add(path)
+
+    def signature(self, path):
+        try:
+            stat = path.stat()
+            return stat.st_mtime, stat.st_size
+        except OSError:
+            return None
+
+    def scan_dirs(self):
+        new_files = []
+        for root in self.roots:
+            for directory in watched_dirs(root):
+                try:
+                    mtime = directory.stat().st_mtime
+                except OSError:
+                    continue
+                if self.dir_mtimes.get(directory) == mtime:
+                    continue
+                self.dir_mtimes[directory] = mtime
+                for path in directory.glob("*.gnmap"):
+                    if path not in self.files:
+                        self.files[path] = self.signature(path)
+                        new_files.append(path)
+        return new_files
+
+    def wait(self, timeout):
+        time.sleep(min(self.interval, timeout))
+        self.polls += 1
+        changed = self.scan_dirs()
+        self.pending.update(changed)
+
+        candidates = list(self.files) if self.polls % self.full_every == 0 else list(self.pending)
+        for path in candidates:
+            signature = self.signature(path)
+            if signature is None:
+                self.files.pop(path, None)
+                self.pending.discard(path)
+                continue
+            if signature != self.files.get(path) or path in changed:
+                self.files[path] = signature
+                if output_complete(path):
+                    self.pending.discard(path)
+                    changed.append(path)
+                else:
+                    self.pending.add(path)
+        return list(dict.fromkeys(changed))
+
+    def close(self):
+        pass
+
+
+class FindingsWatcher:
+    """Keep findings up to date as scans finish, parsing only newly completed outputs"""
+
+    def __init__(self, project_dir, debounce=2.0, max_delay=10.0, poll=False, interval=2.0):
+        self.project_dir = Path(project_dir)
+        self.findings_dir = self.project_dir / "findings"
+        self.output_dir = self.project_dir / "nmap" / "output"
+        self.service_scan_dir = self.project_dir / "nmap" / "service_scan"
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.poll = poll
+        self.interval = interval
+        self.scraper = PortScraper()
+        self.scraper.set_project(self.project_dir)
+        self.parser = ServiceParser()
+        self.parser.set_project(self.project_dir)
+        self.logger = get_logger("findings_watch", self.project_dir / "nmap" / "scan_watch.log")
+        self.port_results = self.load_port_lists()
+        self.service_results = self.load_service_lists()
+        self.processed = {}
+        self.dirty = set()
+
+    def print_success(self, message, **fields):
+        log_message(self.logger, '+', message, **fields)
+
+    def print_error(self, message, **fields):
+        log_message(self.logger, '-', message, **fields)
+
+    def print_info(self, message, **fields):
+        log_message(self.logger, '*', message, **fields)
+
+    def findings_for(self, subnet):
+        return self.findings_dir / subnet if subnet else self.findings_dir
+
+    def load_port_lists(self):
+        """Start from the ip_port_list.txt files already written instead of re-parsing the tree"""
+        results = {}
+        for port_list in [*self.findings_dir.glob("ip_port_list.txt"), *self.findings_dir.glob("*/ip_port_list.txt")]:
+            subnet = port_list.parent.name if port_list.parent != self.findings_dir else None
+            with open(port_list, 'r') as f:
+                for line in f:
+                    if ':' not in line:
+                        continue
+                    ip, ports = line.strip().split(':', 1)
+                    results.setdefault(subnet, {})[ip] = [int(p) for p in ports.split(',') if p]
+        return results
+
+    def load_service_lists(self):
+        """Start from the latest host list of each service in every findings directory"""
+        results = {}
+        for directory in [self.findings_dir] + [d for d in self.findings_dir.glob("*") if d.is_dir()]:
+            subnet = directory.name if directory != self.findings_dir else None
+            for idx, service in enumerate(SERVICES):
+                lists = sorted(directory.glob(f"{service}_*.txt"))
+                if not lists:
+                    continue
+                with open(lists[-1], 'r') as f:
+                    hosts = {line.strip() for line in f if line.strip()}
+                results.setdefault(subnet, [set(), set(), set()])[idx].update(hosts)
+        return results
+
+    def classify(self, path):
+        """Return ('ports' | 'services', subnet) for a watched .gnmap file"""
+        for kind, root in (('ports', self.output_dir), ('services', self.service_scan_dir)):
+            if path.parent == root:
+                return kind, None
+            if path.parent.parent == root and not path.parent.name.startswith('.'):
+                return kind, path.parent.name
+        return None, None
+
+    def handle(self, path):
+        """Parse one changed file if it is a finished scan we have not seen in this state"""
+        if path.suffix != '.gnmap' or not output_complete(path):
+            return
+        try:
+            mtime = path.stat().st_mtime
+        except OSError:
+            return
+        if self.processed.get(path) == mtime:
+            return
+        self.processed[path] = mtime
+
+        kind, subnet = self.classify(path)
+        self.print_info(f"Scan finished: {path.name}", target=subnet, kind=kind)
+        if kind == 'ports':
+            result = self.scraper.parse_gnmap_file(path)
+            if result:
+                self.port_results.setdefault(subnet, {}).update(result)
+                self.dirty.add((kind, subnet))
+        elif kind == 'services':
+            # Parsed on flush, through the subnet's latest-result index
+            self.dirty.add((kind, subnet))
+
+    def latest_services(self, subnet):
+        """The (ssh, http, https) sets from each host's newest service scan in a subnet"""
+        index = LatestIndex(self.service_scan_dir / subnet if subnet else self.service_scan_dir)
+        try:
+            index.update(self.parser.parse_gnmap_file)
+            index.save()
+        except OSError as e:
+            self.print_error(f"Could not update the index of {index.directory}: {str(e)}")
+        return list(index.hosts())
+
+    def write_services(self, subnet, directory):
+        """Rewrite the service lists of a subnet that changed; returns how many did"""
+        current = self.service_results.setdefault(subnet, [set(), set(), set()])
+        latest = self.latest_services(subnet)
+        updated = 0
+        for service, hosts, known in zip(SERVICES, latest, current):
+            if hosts == known:
+                continue
+            if hosts:
+                self.parser.write_service_file(hosts, service, directory)
+            else:
+                # An empty list, so the last non-empty one is not picked up again
+                directory.mkdir(parents=True, exist_ok=True)
+                (directory / f"{service}_{self.parser.timestamp}.txt").write_text("")
+            updated += 1
+        self.service_results[subnet] = latest
+        return updated
+
+    def flush(self):
+        """Rewrite the findings files touched since the last flush"""
+        updated = 0
+        for kind, subnet in sorted(self.dirty, key=lambda d: (d[0], d[1] or '')):
+            directory = self.findings_for(subnet)
+            if kind == 'ports':
+                self.scraper.write_results(self.port_results[subnet], directory / "ip_port_list.txt", echo=False)
+                updated += 1
+            else:
+                updated += self.write_services(subnet, directory)
+        if updated:
+            self.print_success(f"Updated {updated} findings lists",
+                               subnets=sorted(subnet or '' for _, subnet in self.dirty))
+        self.dirty.clear()
+
+    def make_watcher(self):
+        roots = [self.output_dir, self.service_scan_dir]
+        if not self.poll:
+            try:
+                return InotifyWatcher(roots)
+            except (OSError, AttributeError) as e:
+                self.print_error(f"inotify unavailable ({str(e)}), polling instead")
+        return PollingWatcher(roots, self.interval)
+
+    def run(self):
+        watcher = self.make_watcher()
+        self.print_info(f"Watching {self.output_dir} and {self.service_scan_dir} "
+                        f"({'inotify' if isinstance(watcher, InotifyWatcher) else 'polling'})")
+        pending = {}
+        first_event = last_event = None
+        try:
+            while True:
+                changed = watcher.wait(self.debounce)
+                now = time.time()
+                if watcher.overflowed:
+                    # Events were lost; pick up whatever finished in the meantime
+                    watcher.overflowed = False
+                    for root in (self.output_dir, self.service_scan_dir):
+                        for directory in watched_dirs(root):
+                            changed.extend(directory.glob("*.gnmap"))
+                for path in changed:
+                    pending[path] = now
+                if changed:
+                    first_event = first_event or now
+                    last_event = now
+
+                # Wait for a burst of completions to settle, but never longer than max_delay
+                if pending and (now - last_event >= self.debounce or now - first_event >= self.max_delay):
+                    for path in list(pending):
+                        self.handle(path)
+                    pending.clear()
+                    first_event = last_event = None
+                    self.flush()
+        except KeyboardInterrupt:
+            self.print_info("Stopping watch")
+        finally:
+            watcher.close()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Update findings as port and service scans finish")
+    parser.add_argument('--project', required=True, help="Project name under ~/Project")
+    parser.add_argument('--poll', action='store_true', help="Poll instead of using inotify")
+    parser.add_argument('--interval', type=float, default=2.0, help="Polling interval in seconds (default: 2)")
+    parser.add_argument('--debounce', type=float, default=2.0,
+                        help="Quiet period before findings are rewritten (default: 2)")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    project_dir = Path.home() / "Project" / args.project
+    if not project_dir.exists():
+        print(f"{Fore.RED}[-] Project not found: {project_dir}{Style.RESET_ALL}")
+        sys.exit(1)
+    FindingsWatcher(project_dir, args.debounce, poll=args.poll, interval=args.interval).run()
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,14 @@
 import os
-import re
 import sys
 from pathlib import Path
-import logging
+import time
 from colorama import init, Fore, Style
 from datetime import datetime
+from scan_logging import get_logger, log_message, flush_logging
+from scan_metrics import ScanMetrics
+from gnmap_parser import service_hosts
+from scan_archive import as_artifact
+from scan_compact import LatestIndex
 
 # Initialize colorama
 init(autoreset=True)
@@ -17,34 +21,21 @@ class ServiceParser:
         self.findings_dir = None
         self.service_scan_dir = None
         self.timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.metrics = ScanMetrics("service_parse")
+        self.logger = None
 
-    def print_success(self, message):
-        print(f"{Fore.GREEN}[+] {message}{Style.RESET_ALL}")
-        if hasattr(self, 'logger'):
-            self.logger.info(message)
+    def print_success(self, message, **fields):
+        log_message(self.logger, '+', message, **fields)
 
-    def print_error(self, message):
-        print(f"{Fore.RED}[-] {message}{Style.RESET_ALL}")
-        if hasattr(self, 'logger'):
-            self.logger.error(message)
+    def print_error(self, message, **fields):
+        log_message(self.logger, '-', message, **fields)
 
-    def print_info(self, message):
-        print(f"{Fore.BLUE}[*] {message}{Style.RESET_ALL}")
-        if hasattr(self, 'logger'):
-            self.logger.info(message)
+    def print_info(self, message, **fields):
+        log_message(self.logger, '*', message, **fields)
 
     def setup_logging(self):
         """Setup logging configuration"""
-        log_file = self.nmap_dir / "service_parser.log"
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler(log_file),
-                logging.StreamHandler(sys.stdout)
-            ]
-        )
-        self.logger = logging
+        self.logger = get_logger("service_parse", self.nmap_dir / "service_parser.log")
 
     def select_project(self):
         """List and select available projects"""
@@ -52,7 +43,7 @@ class ServiceParser:
             self.print_error(f"Project directory not found: {self.base_dir}")
             sys.exit(1)
 
-        projects = [d for d in self.base_dir.iterdir() if d.is_dir()]
+        projects = [d for d in self.base_dir.iterdir() if d.is_dir() and not d.name.startswith('.')]
         
         if not projects:
             self.print_error("No projects found!")
@@ -67,62 +58,30 @@ class ServiceParser:
                 choice = input(f"\n{Fore.GREEN}Enter project number:{Style.RESET_ALL} ")
                 project_idx = int(choice) - 1
                 if 0 <= project_idx < len(projects):
-                    self.project_dir = projects[project_idx]
-                    self.nmap_dir = self.project_dir / "nmap"
-                    self.findings_dir = self.project_dir / "findings"
-                    self.service_scan_dir = self.nmap_dir / "service_scan"
-                    self.setup_logging()
-                    self.print_success(f"Selected project: {self.project_dir.name}")
+                    self.set_project(projects[project_idx])
                     break
                 else:
                     self.print_error("Invalid project number!")
             except ValueError:
                 self.print_error("Please enter a valid number!")
 
+    def set_project(self, project_dir):
+        """Point the parser at a project directory"""
+        self.project_dir = Path(project_dir)
+        self.nmap_dir = self.project_dir / "nmap"
+        self.findings_dir = self.project_dir / "findings"
+        self.service_scan_dir = self.nmap_dir / "service_scan"
+        self.setup_logging()
+        self.print_success(f"Selected project: {self.project_dir.name}")
+
     def parse_gnmap_file(self, gnmap_file):
         """Parse .gnmap file for services"""
-        ssh_ips = set()
-        http_ips = set()
-        https_ips = set()
-        
         try:
-            with open(gnmap_file, 'r') as f:
-                for line in f:
-                    if 'Host:' not in line:
-                        continue
-                        
-                    # Extract IP address
-                    ip_match = re.search(r'Host: (\d+\.\d+\.\d+\.\d+)', line)
-                    if not ip_match:
-                        continue
-                        
-                    ip = ip_match.group(1)
-                    
-                    # Extract ports section
-                    ports_section = re.search(r'Ports: (.*?)\t', line)
-                    if not ports_section:
-                        continue
-                        
-                    ports_info = ports_section.group(1)
-                    
-                    # Process each port
-                    for port_info in ports_info.split(','):
-                        if 'open' not in port_info:
-                            continue
-                            
-                        service_info = port_info.lower()
-                        
-                        # Check for SSH
-                        if 'ssh' in service_info:
-                            ssh_ips.add(ip)
-                            
-                        # Check for HTTP/HTTPS
-                        if any(s in service_info for s in ['http', 'apache', 'nginx', 'web']):
-                            if 'ssl' in service_info or 'https' in service_info:
-                                https_ips.add(ip)
-                            else:
-                                http_ips.add(ip)
+            self.metrics.inc('bytes_parsed_total', gnmap_file.stat().st_size)
+            # Memory-mapped bytes matching; see gnmap_parser for the service rules
+            ssh_ips, http_ips, https_ips = service_hosts(gnmap_file)
             
+            self.metrics.inc('files_parsed_total')
             self.print_info(f"Found in {gnmap_file}:")
             self.print_info(f"SSH IPs: {len(ssh_ips)}")
             self.print_info(f"HTTP IPs: {len(http_ips)}")
@@ -132,6 +91,7 @@ class ServiceParser:
 
         except Exception as e:
             self.print_error(f"Error processing {gnmap_file}: {str(e)}")
+            self.metrics.inc('parse_errors_total')
             return set(), set(), set()
 
     def write_service_file(self, ips, filename, directory):
@@ -150,16 +110,17 @@ class ServiceParser:
         except Exception as e:
             self.print_error(f"Error writing to {filepath}: {str(e)}")
 
-    def process_directory(self, scan_dir, output_dir):
-        """Process all gnmap files in a directory"""
+    def process_directory(self, scan_dir, output_dir, gnmap_files=None):
+        """Process the latest scan of every host in a directory, or only the given files"""
         all_ssh_ips = set()
         all_http_ips = set()
         all_https_ips = set()
 
-        gnmap_files = list(scan_dir.glob("*.gnmap"))
+        if gnmap_files is None:
+            return self.process_latest(scan_dir, output_dir)
         if not gnmap_files:
             self.print_error(f"No .gnmap files found in {scan_dir}")
-            return
+            return all_ssh_ips, all_http_ips, all_https_ips
 
         for gnmap_file in gnmap_files:
             self.print_info(f"Processing: {gnmap_file}")
@@ -172,23 +133,91 @@ class ServiceParser:
         self.write_service_file(all_ssh_ips, "ssh_hosts", output_dir)
         self.write_service_file(all_http_ips, "http_hosts", output_dir)
         self.write_service_file(all_https_ips, "https_hosts", output_dir)
+        return all_ssh_ips, all_http_ips, all_https_ips
 
-    def process_scans(self):
-        """Process all service scan results"""
-        if not self.service_scan_dir.exists():
-            self.print_error(f"Service scan directory not found: {self.service_scan_dir}")
-            return
+    def process_latest(self, scan_dir, output_dir):
+        """Write host lists from each host's newest scan, via the directory's latest-result index
+
+        Only outputs that became a host's latest since the last run are
+        parsed; older reruns are ignored instead of being merged in.
+        """
+        index = LatestIndex(scan_dir)
+        parsed = 0
+        try:
+            parsed = index.update(self.parse_gnmap_file)
+            index.save()
+        except OSError as e:
+            self.print_error(f"Could not update the index of {scan_dir}: {str(e)}")
+        if not index.entries:
+            self.print_error(f"No .gnmap files found in {scan_dir}")
+            return set(), set(), set()
+        self.print_info(f"{len(index.entries)} hosts in {scan_dir}, {parsed} outputs parsed, "
+                        f"{len(index.superseded)} superseded")
+
+        all_ssh_ips, all_http_ips, all_https_ips = index.hosts()
+        self.write_service_file(all_ssh_ips, "ssh_hosts", output_dir)
+        self.write_service_file(all_http_ips, "http_hosts", output_dir)
+        self.write_service_file(all_https_ips, "https_hosts", output_dir)
+        return all_ssh_ips, all_http_ips, all_https_ips
+
+    def process_scans(self, gnmap_files=None, service_scan_dir=None):
+        """Process service scan results into per-service host lists
+
+        Walks nmap/service_scan when no files are given. Returns the
+        (ssh, http, https) IP sets keyed by subnet name (None for the main
+        directory).
+        """
+        self.metrics.restart_clock()
+        service_scan_dir = Path(service_scan_dir or self.service_scan_dir)
+        results = {}
+
+        if gnmap_files is not None:
+            # Only parse the files we were handed, grouped by subnet directory
+            by_dir = {}
+            for gnmap_file in gnmap_files:
+                gnmap_file = as_artifact(gnmap_file)
+                by_dir.setdefault(gnmap_file.parent, []).append(gnmap_file)
+            for scan_dir, files in sorted(by_dir.items()):
+                if scan_dir == service_scan_dir:
+                    results[None] = self.process_directory(scan_dir, self.findings_dir, files)
+                else:
+                    self.print_info(f"Processing subnet: {scan_dir.name}")
+                    results[scan_dir.name] = self.process_directory(
+                        scan_dir, self.findings_dir / scan_dir.name, files)
+            self.write_metrics()
+            return results
+
+        if not service_scan_dir.exists():
+            self.print_error(f"Service scan directory not found: {service_scan_dir}")
+            return results
 
         # Process main directory
-        self.print_info(f"Processing main directory: {self.service_scan_dir}")
-        self.process_directory(self.service_scan_dir, self.findings_dir)
+        self.print_info(f"Processing main directory: {service_scan_dir}")
+        results[None] = self.process_directory(service_scan_dir, self.findings_dir)
 
         # Process subnet directories
-        for subnet_dir in self.service_scan_dir.iterdir():
-            if subnet_dir.is_dir():
+        for subnet_dir in service_scan_dir.iterdir():
+            if subnet_dir.is_dir() and not subnet_dir.name.startswith('.'):
                 self.print_info(f"Processing subnet: {subnet_dir.name}")
                 subnet_findings_dir = self.findings_dir / subnet_dir.name
-                self.process_directory(subnet_dir, subnet_findings_dir)
+                results[subnet_dir.name] = self.process_directory(subnet_dir, subnet_findings_dir)
+
+        self.write_metrics()
+        return results
+
+    def write_metrics(self):
+        """Write parse throughput as a Prometheus textfile and JSON summary"""
+        elapsed = time.time() - self.metrics.started
+        files = self.metrics.counters.get('files_parsed_total', 0)
+        self.metrics.set_gauge('files_per_second', round(files / elapsed, 3) if elapsed else 0)
+        metrics_dir = self.nmap_dir / "metrics"
+        try:
+            self.metrics.write_textfile(metrics_dir / "service_parse.prom")
+            self.metrics.write_summary(metrics_dir / f"service_parse_summary_{self.timestamp}.json")
+        except Exception as e:
+            self.print_error(f"Error writing metrics: {str(e)}")
+        # Last step of a run, so everything logged is on screen before the caller goes on
+        flush_logging()
 
 def main():
     parser = ServiceParser()
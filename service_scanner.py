@@ -3,13 +3,22 @@ import sys
 import subprocess
 import time
 from pathlib import Path
-import logging
 from colorama import init, Fore, Style
 from datetime import datetime
 import threading
 import queue
 import psutil
 import socket
+import argparse
+from scan_logging import get_logger, log_message, print_console, flush_logging
+from scan_metrics import ScanMetrics, LATENCY_BUCKETS
+from scan_eta import DurationStore, EtaEstimator, port_count, nmap_progress, format_duration
+from scan_status import StatusServer, service_results
+from scan_journal import ScanJournal, ScanHistory
+from scan_shard import parse_shard, in_shard, shard_name
+from scan_timing import TimingProfiles, timing_args
+from scan_scheduler import (ScanTimeout, RetryPolicy, RetryScheduler, ScanPriorityQueue, RateBudget,
+                            load_scope_priorities, priority_of, output_complete, kill_pane_processes)
 
 # Initialize colorama
 init(autoreset=True)
@@ -26,64 +35,95 @@ class ServiceScanner:
         self.completed_scans = 0
         self.total_scans = 0
         self.lock = threading.Lock()
-        self.failed_scans = set()
+        self.failed_scans = {}
         self.scan_queue = queue.Queue()
         self.scan_complete = threading.Event()
+        self.interrupted = False
         self.display_lock = threading.Lock()
-
-    def print_success(self, message):
-        with self.lock:
-            print(f"{Fore.GREEN}[+] {message}{Style.RESET_ALL}")
-            if hasattr(self, 'logger'):
-                self.logger.info(message)
-
-    def print_error(self, message):
-        with self.lock:
-            print(f"{Fore.RED}[-] {message}{Style.RESET_ALL}")
-            if hasattr(self, 'logger'):
-                self.logger.error(message)
-
-    def print_info(self, message):
-        with self.lock:
-            print(f"{Fore.BLUE}[*] {message}{Style.RESET_ALL}")
-            if hasattr(self, 'logger'):
-                self.logger.info(message)
+        self.show_progress = True
+        self.completed_outputs = []
+        self.metrics = ScanMetrics("service_scan")
+        self.logger = None
+        self.metrics_port = None
+        self.metrics_file = None
+        self.status_port = None
+        self.status = None
+        self.shard = None
+        self.journal = None
+        self.scan_timeout = 3600
+        self.stall_timeout = 600
+        self.retry_policy = RetryPolicy()
+        self.retry_scheduler = None
+        self.attempts = {}
+        self.failure_reasons = {}
+        self.scope_rules = []
+        self.history = ScanHistory()
+        self.max_rate = None
+        self.min_rate_fraction = 0
+        self.rate_budget = None
+        self.busy_workers = 0
+        self.adaptive_timing = False
+        self.timing = None
+        self.durations = None
+        self.eta = None
+
+    def print_success(self, message, **fields):
+        log_message(self.logger, '+', message, **fields)
+
+    def print_error(self, message, **fields):
+        log_message(self.logger, '-', message, **fields)
+
+    def print_info(self, message, **fields):
+        log_message(self.logger, '*', message, **fields)
 
     def update_progress(self):
         """Print current progress to console"""
+        if not self.show_progress:
+            return
         with self.display_lock:
-            print("\033[2J\033[H")  # Clear screen
-            print(f"{Fore.CYAN}Service Scan Progress ({self.completed_scans}/{self.total_scans}):{Style.RESET_ALL}")
-            print("="*50)
+            lines = ["\033[2J\033[H"]  # Clear screen
+            lines.append(f"{Fore.CYAN}Service Scan Progress ({self.completed_scans}/{self.total_scans}):{Style.RESET_ALL}")
+            if self.eta:
+                lines.append(f"ETA: {format_duration(self.estimate_eta())}")
+            lines.append("="*50)
             
             if self.active_scans:
-                print(f"\n{Fore.YELLOW}Active Scans:{Style.RESET_ALL}")
+                lines.append(f"\n{Fore.YELLOW}Active Scans:{Style.RESET_ALL}")
                 for ip, info in self.active_scans.items():
                     elapsed = time.time() - info['start_time']
-                    print(f"IP: {ip} | Progress: {info['progress']}% | Time: {int(elapsed)}s")
+                    rate = f" | Rate: {info['rate']} pps" if info.get('rate') else ""
+                    eta = f" | ETA: {format_duration(self.eta.remaining(info))}" if self.eta else ""
+                    lines.append(f"IP: {ip} | Progress: {info['progress']}% | Time: {int(elapsed)}s{eta}{rate}")
             
             if self.failed_scans:
-                print(f"\n{Fore.RED}Failed Scans:{Style.RESET_ALL}")
-                for ip in sorted(self.failed_scans):
-                    print(f"- {ip}")
+                lines.append(f"\n{Fore.RED}Failed Scans:{Style.RESET_ALL}")
+                for ip, reason in sorted(self.failed_scans.items()):
+                    lines.append(f"- {ip}: {reason}")
             
-            print(f"\n{Fore.BLUE}System Usage:{Style.RESET_ALL}")
-            print(f"CPU: {psutil.cpu_percent()}% | RAM: {psutil.virtual_memory().percent}%")
-            print("\n" + "="*50)
-            sys.stdout.flush()
+            lines.append(f"\n{Fore.BLUE}System Usage:{Style.RESET_ALL}")
+            lines.append(f"CPU: {psutil.cpu_percent()}% | RAM: {psutil.virtual_memory().percent}%")
+            lines.append("\n" + "="*50)
+            print_console("\n".join(lines))
+
+    def estimate_eta(self):
+        """Seconds until every target is scanned, from history, nmap's progress and the sessions"""
+        active = [dict(info) for info in list(self.active_scans.values())]
+        pending = max(self.total_scans - self.completed_scans - len(active), 0)
+        return self.eta.overall(active, pending)
+
+    def print_eta_summary(self):
+        """Compare the run time with the first estimate, or say what is left after an interrupt"""
+        if not self.eta:
+            return
+        self.print_info(f"Elapsed: {format_duration(time.time() - self.eta.started)}")
+        if self.completed_scans < self.total_scans:
+            self.print_info(f"Estimated time remaining: {format_duration(self.estimate_eta())}")
+        elif self.eta.first_estimate:
+            self.print_info(f"Estimated at start: {format_duration(self.eta.first_estimate)}")
 
     def setup_logging(self):
         """Setup logging configuration"""
-        log_file = self.nmap_dir / "service_scan.log"
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler(log_file),
-                logging.StreamHandler(sys.stdout)
-            ]
-        )
-        self.logger = logging
+        self.logger = get_logger("service_scan", self.nmap_dir / "service_scan.log")
 
     def select_project(self):
         """List and select available projects"""
@@ -91,7 +131,7 @@ class ServiceScanner:
             self.print_error(f"Project directory not found: {self.base_dir}")
             sys.exit(1)
 
-        projects = [d for d in self.base_dir.iterdir() if d.is_dir()]
+        projects = [d for d in self.base_dir.iterdir() if d.is_dir() and not d.name.startswith('.')]
         
         if not projects:
             self.print_error("No projects found!")
@@ -106,23 +146,36 @@ class ServiceScanner:
                 choice = input(f"\n{Fore.GREEN}Enter project number:{Style.RESET_ALL} ")
                 project_idx = int(choice) - 1
                 if 0 <= project_idx < len(projects):
-                    self.project_dir = projects[project_idx]
-                    self.nmap_dir = self.project_dir / "nmap"
-                    self.findings_dir = self.project_dir / "findings"
-                    self.service_scan_dir = self.nmap_dir / "service_scan"
-                    self.service_scan_dir.mkdir(exist_ok=True)
-                    self.setup_logging()
-                    self.print_success(f"Selected project: {self.project_dir.name}")
+                    self.set_project(projects[project_idx])
                     break
                 else:
                     self.print_error("Invalid project number!")
             except ValueError:
                 self.print_error("Please enter a valid number!")
 
+    def set_project(self, project_dir):
+        """Point the scanner at a project directory"""
+        self.project_dir = Path(project_dir)
+        self.nmap_dir = self.project_dir / "nmap"
+        self.findings_dir = self.project_dir / "findings"
+        if self.shard:
+            # Shards keep their outputs apart until scan_shard.py merges them
+            shard_dir = self.nmap_dir / "shards" / shard_name(self.shard)
+            self.service_scan_dir = shard_dir / "service_scan"
+            self.journal = ScanJournal(shard_dir / "service_scan_journal.jsonl")
+        else:
+            self.service_scan_dir = self.nmap_dir / "service_scan"
+            self.journal = ScanJournal(self.nmap_dir / "service_scan_journal.jsonl")
+        self.service_scan_dir.mkdir(parents=True, exist_ok=True)
+        self.setup_logging()
+        self.print_success(f"Selected project: {self.project_dir.name}")
+        if self.shard:
+            self.print_info(f"Running shard {self.shard[0]}/{self.shard[1]} into {self.service_scan_dir}")
+
     def kill_session(self, session_name):
         """Safely kill a tmux session"""
         try:
-            subprocess.run(['tmux', 'kill-session', '-t', session_name], 
+            subprocess.run(['tmux', 'kill-session', '-t', f"={session_name}"], 
                          stdout=subprocess.DEVNULL, 
                          stderr=subprocess.DEVNULL)
         except:
@@ -135,9 +188,11 @@ class ServiceScanner:
         
         try:
             self.kill_session(session_name)
+            spawn_start = time.time()
             result = subprocess.run(['tmux', 'new-session', '-d', '-s', session_name],
                                  stdout=subprocess.DEVNULL,
                                  stderr=subprocess.PIPE)
+            self.metrics.observe('session_spawn_seconds', time.time() - spawn_start, LATENCY_BUCKETS)
             
             if result.returncode != 0:
                 raise Exception(f"Failed to create session: {result.stderr.decode()}")
@@ -146,13 +201,11 @@ class ServiceScanner:
             return session_name
 
         except Exception as e:
-            self.print_error(f"Error creating session for {ip}: {str(e)}")
+            self.print_error(f"Error creating session for {ip}: {str(e)}", target=ip)
             return None
 
     def read_targets(self):
-        """Read targets from ip_port_list.txt files"""
-        targets = []
-        
+        """Yield this shard's targets from ip_port_list.txt files"""
         # Read main ip_port_list.txt
         main_list = self.findings_dir / "ip_port_list.txt"
         if main_list.exists():
@@ -160,7 +213,8 @@ class ServiceScanner:
                 for line in f:
                     if ':' in line:
                         ip, ports = line.strip().split(':')
-                        targets.append((ip, ports, None))  # None indicates no subnet
+                        if in_shard(ip, self.shard):
+                            yield (ip, ports, None)  # None indicates no subnet
 
         # Read subnet ip_port_list.txt files
         for subnet_dir in self.findings_dir.iterdir():
@@ -171,9 +225,56 @@ class ServiceScanner:
                         for line in f:
                             if ':' in line:
                                 ip, ports = line.strip().split(':')
-                                targets.append((ip, ports, subnet_dir.name))
+                                if in_shard(ip, self.shard):
+                                    yield (ip, ports, subnet_dir.name)
+
+    def feed_queue(self, targets):
+        """Stream targets into the bounded scan queue"""
+        try:
+            for target in targets:
+                if self.scan_complete.is_set():
+                    break
+                self.scan_queue.put(target)
+        except Exception as e:
+            self.print_error(f"Error reading targets: {str(e)}")
 
-        return targets
+    def acquire_rate(self, key):
+        """nmap rate options for a scan starting now, or '' without a budget"""
+        if not self.rate_budget:
+            return ""
+        rate = self.rate_budget.acquire(key, self.scan_queue.qsize(), self.busy_workers)
+        with self.lock:
+            if key in self.active_scans:
+                self.active_scans[key]['rate'] = rate
+        self.metrics.set_gauge('rate_allocated', self.rate_budget.allocated())
+        return self.rate_budget.nmap_args(rate) + " "
+
+    def release_rate(self, key):
+        if self.rate_budget:
+            self.rate_budget.release(key)
+            self.metrics.set_gauge('rate_allocated', self.rate_budget.allocated())
+
+    def choose_timing(self, ip, key):
+        """Adaptive nmap timing options for a scan, or '' when disabled"""
+        if not self.timing:
+            return ""
+        try:
+            timing = self.timing.choose(ip, self.scan_timeout)
+        except ValueError:
+            return ""
+        if timing:
+            with self.lock:
+                if key in self.active_scans:
+                    self.active_scans[key]['timing'] = timing
+            self.print_info(f"Timing for {key}: {timing_args(timing).strip()}", target=key, timing=timing)
+        return timing_args(timing)
+
+    def observe_timing(self, ip, xml_file):
+        """Fold a finished scan's RTT into its subnet profile without failing the scan"""
+        try:
+            self.timing.observe_xml(ip, xml_file)
+        except Exception as e:
+            self.print_error(f"Could not update timing profile for {ip}: {str(e)}", target=ip)
 
     def run_single_scan(self, ip, ports, subnet=None):
         """Execute a single service scan"""
@@ -181,13 +282,19 @@ class ServiceScanner:
         if not session_name:
             return False
 
+        output_base = None
         try:
+            start_time = time.time()
             with self.lock:
                 self.active_scans[ip] = {
                     'session': session_name,
-                    'start_time': time.time(),
+                    'start_time': start_time,
                     'progress': 0
                 }
+                if self.eta:
+                    self.active_scans[ip]['expected'] = self.eta.expected(
+                        ip, port_count(ports), self.history.seconds_per_port(60) * port_count(ports))
+                self.metrics.set_gauge('active_sessions', len(self.active_scans))
 
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             if subnet:
@@ -198,19 +305,28 @@ class ServiceScanner:
 
             output_base = output_dir / f"{ip}_{timestamp}"
             
-            cmd = f"nmap -v -p{ports} -sSCV -A {ip} -oN {output_base}.nmap -oG {output_base}.gnmap"
-            subprocess.run(['tmux', 'send-keys', '-t', session_name, cmd, 'C-m'],
+            # --stats-every keeps the pane changing so a hung scan can be told apart
+            rate_args = self.acquire_rate(ip)
+            rate_args += self.choose_timing(ip, ip)
+            cmd = f"nmap -v -p{ports} -sSCV -A {rate_args}--stats-every 30s {ip} -oN {output_base}.nmap -oG {output_base}.gnmap -oX {output_base}.xml"
+            subprocess.run(['tmux', 'send-keys', '-t', f"={session_name}:", cmd, 'C-m'],
                          stdout=subprocess.DEVNULL,
                          stderr=subprocess.DEVNULL)
 
+            last_output = None
+            last_change = start_time
             while True:
                 time.sleep(1)
-                result = subprocess.run(['tmux', 'capture-pane', '-pt', session_name],
+                result = subprocess.run(['tmux', 'capture-pane', '-pt', f"={session_name}:"],
                                      stdout=subprocess.PIPE,
                                      stderr=subprocess.PIPE,
                                      text=True)
                 
                 output = result.stdout
+                now = time.time()
+                if output != last_output:
+                    last_output = output
+                    last_change = now
 
                 if "Completed" in output:
                     try:
@@ -221,66 +337,216 @@ class ServiceScanner:
                                 self.update_progress()
                     except:
                         pass
+                percent, nmap_remaining = nmap_progress(output)
+                if percent is not None:
+                    with self.lock:
+                        if ip in self.active_scans:
+                            self.active_scans[ip]['percent'] = percent
+                            self.active_scans[ip]['progress'] = int(percent)
+                            self.active_scans[ip]['nmap_remaining'] = nmap_remaining
 
-                if "Nmap done" in output:
+                # The marker may have scrolled out of the pane, so also check the output file
+                if "Nmap done" in output or output_complete(f"{output_base}.gnmap", start_time):
                     with self.lock:
                         if ip in self.active_scans:
+                            duration = time.time() - self.active_scans[ip]['start_time']
+                            self.metrics.observe('scan_duration_seconds', duration)
+                            if self.eta:
+                                self.eta.observe(ip, port_count(ports), duration)
+                            self.journal.record(ip, 'done', duration, output=output_base, ports=ports,
+                                                rate=self.active_scans[ip].get('rate'),
+                                                timing=self.active_scans[ip].get('timing'))
                             del self.active_scans[ip]
                         self.completed_scans += 1
+                        self.metrics.inc('scans_completed_total')
                         self.update_progress()
+                    self.record_metrics()
                     self.kill_session(session_name)
-                    self.print_success(f"Service scan completed for {ip}")
+                    self.completed_outputs.append(Path(f"{output_base}.gnmap"))
+                    if self.timing:
+                        self.observe_timing(ip, f"{output_base}.xml")
+                    self.print_success(f"Service scan completed for {ip}", target=ip,
+                                       duration=round(time.time() - start_time, 3),
+                                       eta=round(self.estimate_eta()) if self.eta else None)
                     return True
 
+                if "QUITTING!" in output:
+                    raise Exception("nmap exited with an error")
+                if self.scan_timeout and now - start_time > self.scan_timeout:
+                    self.metrics.inc('scan_timeouts_total')
+                    raise ScanTimeout(f"deadline of {self.scan_timeout}s exceeded")
+                if self.stall_timeout and now - last_change > self.stall_timeout:
+                    self.metrics.inc('scan_stalls_total')
+                    raise ScanTimeout(f"no progress for {self.stall_timeout}s")
+
         except Exception as e:
-            self.print_error(f"Error scanning {ip}: {str(e)}")
+            self.print_error(f"Error scanning {ip}: {str(e)}", target=ip,
+                             duration=round(time.time() - start_time, 3))
+            kill_pane_processes(session_name)
             with self.lock:
-                self.failed_scans.add(ip)
+                self.failure_reasons[ip] = str(e)
                 if ip in self.active_scans:
                     del self.active_scans[ip]
-                self.completed_scans += 1
                 self.update_progress()
             self.kill_session(session_name)
+            # Partial outputs of a failed attempt would be parsed as results
+            if output_base:
+                for ext in ('nmap', 'gnmap'):
+                    Path(f"{output_base}.{ext}").unlink(missing_ok=True)
             return False
 
+        finally:
+            self.release_rate(ip)
+
+    def handle_failure(self, target):
+        """Schedule a failed target for retry, or record it as failed for good"""
+        ip, ports, _ = target
+        with self.lock:
+            reason = self.failure_reasons.pop(ip, "scan failed")
+            attempt = self.attempts.get(ip, 0) + 1
+            self.attempts[ip] = attempt
+
+        if self.retry_scheduler and self.retry_policy.allow_retry(attempt):
+            delay = self.retry_policy.delay(attempt)
+            self.metrics.inc('scan_retries_total')
+            self.journal.record(ip, 'retry', attempt=attempt, error=reason, ports=ports)
+            self.print_error(f"Retrying {ip} in {int(delay)}s ({reason}, attempt {attempt})",
+                             target=ip, attempt=attempt)
+            self.retry_scheduler.schedule(target, delay)
+            return
+
+        with self.lock:
+            self.failed_scans[ip] = reason
+            self.completed_scans += 1
+            self.metrics.inc('scans_failed_total')
+            self.journal.record(ip, 'failed', attempt=attempt, error=reason, ports=ports)
+            self.update_progress()
+        self.record_metrics()
+
+    def record_metrics(self):
+        """Refresh gauges and rewrite the Prometheus textfile"""
+        self.metrics.set_gauge('queue_depth', self.scan_queue.qsize())
+        self.metrics.set_gauge('active_sessions', len(self.active_scans))
+        if self.metrics_file is None and self.nmap_dir:
+            self.metrics_file = self.nmap_dir / "metrics" / "service_scan.prom"
+        try:
+            self.metrics.write_textfile(self.metrics_file)
+        except Exception as e:
+            self.print_error(f"Error writing metrics: {str(e)}")
+
+    def write_metrics_summary(self):
+        """Write the final metrics textfile and JSON run summary"""
+        self.record_metrics()
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        summary_file = self.nmap_dir / "metrics" / f"service_scan_summary_{timestamp}.json"
+        try:
+            self.metrics.write_summary(summary_file)
+            self.print_info(f"Metrics summary written to: {summary_file}")
+        except Exception as e:
+            self.print_error(f"Error writing metrics summary: {str(e)}")
+
+    def scan_priority(self, target):
+        """Operator priority and estimated scan seconds for a queued target"""
+        ip, ports, _ = target
+        cost = self.history.durations.get(ip)
+        if cost is None:
+            # Service detection time grows with the number of open ports
+            cost = self.history.seconds_per_port(60) * len(ports.split(','))
+        return priority_of(ip, self.scope_rules), cost
+
+    def scan_order(self, target):
+        """Sort key putting higher priority first, then cheaper scans"""
+        priority, cost = self.scan_priority(target)
+        return -priority, cost
+
     def scan_worker(self):
         """Worker function to process scan queue"""
         while not self.scan_complete.is_set() or not self.scan_queue.empty():
             try:
-                ip, ports, subnet = self.scan_queue.get(timeout=1)
-                self.run_single_scan(ip, ports, subnet)
-                self.scan_queue.task_done()
+                target = self.scan_queue.get(timeout=1)
             except queue.Empty:
                 continue
+
+            with self.lock:
+                self.busy_workers += 1
+            try:
+                self.metrics.set_gauge('queue_depth', self.scan_queue.qsize())
+                if not self.run_single_scan(*target):
+                    # Scheduled before task_done so the queue never looks finished early
+                    self.handle_failure(target)
             except Exception as e:
                 self.print_error(f"Worker error: {str(e)}")
-                continue
+            finally:
+                with self.lock:
+                    self.busy_workers -= 1
+                self.scan_queue.task_done()
 
-    def process_targets(self):
-        """Process and scan targets"""
-        while True:
+    def process_targets(self, max_sessions=None, targets=None):
+        """Process and scan targets, returning the .gnmap files written
+
+        Targets are (ip, ports, subnet) tuples; they are read from the
+        ip_port_list.txt files when not given.
+        """
+        while not max_sessions:
+            # The prompt is only shown once every queued line is on screen
+            flush_logging()
             try:
-                self.max_sessions = int(input(f"{Fore.GREEN}Enter number of concurrent sessions: {Style.RESET_ALL}"))
-                if self.max_sessions > 0:
+                max_sessions = int(input(f"{Fore.GREEN}Enter number of concurrent sessions: {Style.RESET_ALL}"))
+                if max_sessions > 0:
                     break
                 self.print_error("Please enter a positive number")
+                max_sessions = None
             except ValueError:
                 self.print_error("Please enter a valid number")
+        self.max_sessions = max_sessions
+        self.metrics.restart_clock()
 
-        # Read targets
-        targets = self.read_targets()
-        if not targets:
-            self.print_error("No targets found in ip_port_list.txt files")
-            return
+        self.scope_rules = load_scope_priorities(self.nmap_dir / "scope.txt")
+        self.history = ScanHistory([self.journal.path])
+        self.durations = DurationStore(self.nmap_dir / "durations.json")
 
+        # Port lists are small, so the whole run can be ordered up front
+        if targets is None:
+            targets = self.read_targets()
+        targets = sorted((t for t in targets if in_shard(t[0], self.shard)), key=self.scan_order)
         self.total_scans = len(targets)
-        self.print_info(f"Starting service scan of {self.total_scans} targets")
+        if not self.total_scans:
+            self.print_error("No targets found in ip_port_list.txt files")
+            return []
 
-        # Add targets to queue
-        for target in targets:
-            self.scan_queue.put(target)
+        self.print_info(f"Starting service scan of {self.total_scans} targets")
+        self.eta = EtaEstimator(self.durations, "service_scan", self.max_sessions,
+                                self.history.median_duration(self.scan_timeout / 4))
+        self.print_info(f"Estimated duration: {format_duration(self.estimate_eta())}")
+        if self.adaptive_timing:
+            self.timing = TimingProfiles(self.nmap_dir / "timing_profiles.json")
+        if self.max_rate:
+            self.rate_budget = RateBudget(self.max_rate, self.max_sessions, self.min_rate_fraction)
+            self.print_info(f"Sharing {self.max_rate} packets/sec across {self.max_sessions} sessions")
+
+        self.scan_queue = ScanPriorityQueue(self.max_sessions * 2, key=self.scan_priority)
+        self.retry_scheduler = RetryScheduler(self.scan_queue)
+        producer = threading.Thread(target=self.feed_queue, args=(targets,))
+        producer.daemon = True
+        producer.start()
 
         # Start worker threads
+        self.metrics.set_gauge('scans_scheduled', self.total_scans)
+        self.record_metrics()
+        if self.metrics_port:
+            try:
+                self.metrics.start_server(self.metrics_port)
+                self.print_info(f"Serving metrics on http://127.0.0.1:{self.metrics_port}/metrics")
+            except OSError as e:
+                self.print_error(f"Could not start metrics server: {str(e)}")
+        if self.status_port:
+            try:
+                self.status = StatusServer(self, service_results)
+                self.status.start(self.status_port)
+                self.print_info(f"Serving scan status on http://127.0.0.1:{self.status_port}/status")
+            except OSError as e:
+                self.print_error(f"Could not start status server: {str(e)}")
+
         workers = []
         for _ in range(self.max_sessions):
             worker = threading.Thread(target=self.scan_worker)
@@ -289,7 +555,13 @@ class ServiceScanner:
             workers.append(worker)
 
         try:
-            self.scan_queue.join()
+            while producer.is_alive():
+                producer.join(timeout=1)
+            while True:
+                self.scan_queue.join()
+                if not self.retry_scheduler.pending():
+                    break
+                time.sleep(1)
             self.scan_complete.set()
             
             for worker in workers:
@@ -297,23 +569,81 @@ class ServiceScanner:
 
         except KeyboardInterrupt:
             self.print_info("\nStopping scans gracefully...")
+            self.interrupted = True
             self.scan_complete.set()
             
             # Kill remaining tmux sessions
-            for ip, info in self.active_scans.items():
+            for ip, info in list(self.active_scans.items()):
+                kill_pane_processes(info['session'])
                 self.kill_session(info['session'])
         
         finally:
             self.print_info("\nScan Summary:")
             self.print_info(f"Total targets: {self.total_scans}")
             self.print_info(f"Completed: {self.completed_scans}")
+            self.print_eta_summary()
+            self.retry_scheduler.stop()
+            self.print_info(f"Retries: {self.retry_policy.retries_used}")
             if self.failed_scans:
                 self.print_error(f"Failed scans: {len(self.failed_scans)}")
-                for ip in sorted(self.failed_scans):
-                    self.print_error(f"- {ip}")
+                for ip, reason in sorted(self.failed_scans.items()):
+                    self.print_error(f"- {ip}: {reason}")
+            self.write_metrics_summary()
+            self.metrics.stop_server()
+            if self.status:
+                self.status.stop()
+            if self.timing:
+                self.timing.save()
+            try:
+                self.durations.save()
+            except OSError as e:
+                self.print_error(f"Could not save scan durations: {str(e)}")
+            flush_logging()
+
+        return self.completed_outputs
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Service scan of discovered open ports")
+    parser.add_argument('--metrics-port', type=int,
+                        help="Serve Prometheus metrics on this local port")
+    parser.add_argument('--status-port', type=int,
+                        help="Serve a read-only JSON status and results API on this local port")
+    parser.add_argument('--metrics-textfile', type=Path,
+                        help="Prometheus textfile path (default: nmap/metrics/service_scan.prom)")
+    parser.add_argument('--shard', type=parse_shard, metavar='i/N',
+                        help="Only scan shard i of N of the discovered hosts (merge with scan_shard.py)")
+    parser.add_argument('--scan-timeout', type=int, default=3600,
+                        help="Wall-clock limit per target in seconds, 0 to disable (default: 3600)")
+    parser.add_argument('--stall-timeout', type=int, default=600,
+                        help="Kill a scan whose output has not changed for this many seconds (default: 600)")
+    parser.add_argument('--max-retries', type=int, default=2,
+                        help="Retries per failed target (default: 2)")
+    parser.add_argument('--retry-delay', type=int, default=30,
+                        help="Initial retry backoff in seconds, doubled per attempt (default: 30)")
+    parser.add_argument('--retry-budget', type=int,
+                        help="Maximum retries across the whole run")
+    parser.add_argument('--adaptive-timing', action='store_true',
+                        help="Pick -T, retries and RTT timeouts per subnet from measured RTT and loss")
+    parser.add_argument('--max-rate', type=int,
+                        help="Packets per second for the whole run, split across sessions")
+    parser.add_argument('--min-rate-fraction', type=float, default=0,
+                        help="Also pass --min-rate at this fraction of each session's share")
+    return parser.parse_args()
 
 def main():
+    args = parse_args()
     scanner = ServiceScanner()
+    scanner.metrics_port = args.metrics_port
+    scanner.status_port = args.status_port
+    scanner.metrics_file = args.metrics_textfile
+    scanner.shard = args.shard
+    scanner.max_rate = args.max_rate
+    scanner.adaptive_timing = args.adaptive_timing
+    scanner.min_rate_fraction = args.min_rate_fraction
+    scanner.scan_timeout = args.scan_timeout
+    scanner.stall_timeout = args.stall_timeout
+    scanner.retry_policy = RetryPolicy(args.max_retries, args.retry_delay,
+                                       retry_budget=args.retry_budget)
     scanner.select_project()
     scanner.process_targets()
 
@@ -0,0 +1,116 @@
+import os
+import sys
+import json
+import time
+import shutil
+import socket
+import tempfile
+import unittest
+import subprocess
+import urllib.request
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+
+# Writes the three outputs run_single_scan waits for, after a short delay
+FAKE_NMAP = """#!/bin/sh
+ip=""; out=""
+while [ $# -gt 0 ]; do
+    case "$1" in
+        -oA) out=$2; shift ;;
+        -p*|-P*|-T*) ;;
+        --*) shift ;;
+        *) ip=$1 ;;
+    esac
+    shift
+done
+sleep 1
+printf "# Nmap scan initiated as: nmap $ip\\nHost: $ip ()\\tPorts: 22/open/tcp//ssh///\\n# Nmap done\\n" > $out.gnmap
+printf "Nmap scan report for $ip\\n22/tcp open ssh\\n" > $out.nmap
+printf '<?xml version="1.0"?>\\n<nmaprun></nmaprun>\\n' > $out.xml
+echo "Nmap done: 1 IP address (1 host up) scanned in 1.00 seconds"
+"""
+
+TARGETS = 5
+WORKERS = 2
+SESSIONS = 2
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+@unittest.skipUnless(shutil.which('tmux'), "tmux is required to run scans")
+class ClusterTest(unittest.TestCase):
+    """A coordinator and several multi-session workers on localhost, with a fake nmap"""
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        bin_dir = self.tmp / "bin"
+        bin_dir.mkdir()
+        (bin_dir / "nmap").write_text(FAKE_NMAP)
+        (bin_dir / "nmap").chmod(0o755)
+        tmux_dir = self.tmp / "tmux"
+        tmux_dir.mkdir()
+
+        self.env = dict(os.environ, HOME=str(self.tmp), TMUX_TMPDIR=str(tmux_dir),
+                        PATH=f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+        self.project = self.tmp / "Project" / "cluster"
+        (self.project / "nmap").mkdir(parents=True)
+        with open(self.project / "nmap" / "scope.txt", 'w') as f:
+            f.write("".join(f"10.9.0.{i}\n" for i in range(1, TARGETS + 1)))
+        self.port = free_port()
+        self.processes = []
+
+    def tearDown(self):
+        for process in self.processes:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+        subprocess.run(['tmux', 'kill-server'], env=self.env,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def start(self, *args):
+        process = subprocess.Popen([sys.executable, str(SCRIPT_DIR / "scan_cluster.py")] + list(args),
+                                   env=self.env, cwd=SCRIPT_DIR, stdout=subprocess.PIPE,
+                                   stderr=subprocess.STDOUT, text=True)
+        self.processes.append(process)
+        return process
+
+    def wait_for_coordinator(self):
+        deadline = time.time() + 15
+        while time.time() < deadline:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{self.port}/status", timeout=1) as resp:
+                    return json.loads(resp.read())
+            except OSError:
+                time.sleep(0.2)
+        self.fail("coordinator did not start")
+
+    def test_workers_scan_everything_and_exit(self):
+        coordinator = self.start('coordinator', '--project', 'cluster', '--port', str(self.port))
+        self.wait_for_coordinator()
+        workers = [self.start('worker', '--coordinator', f"http://127.0.0.1:{self.port}",
+                              '--workdir', str(self.tmp / f"worker{i}"), '--sessions', str(SESSIONS),
+                              '--worker-id', f"worker{i}")
+                   for i in range(WORKERS)]
+
+        start = time.time()
+        outputs = [process.communicate(timeout=90)[0] for process in workers + [coordinator]]
+        # Every session is told the run is done, so nobody backs off waiting for a coordinator
+        self.assertLess(time.time() - start, 45)
+        for process, output in zip(workers + [coordinator], outputs):
+            self.assertEqual(process.returncode, 0, output)
+        for output in outputs[:-1]:
+            self.assertNotIn("Coordinator unreachable", output)
+
+        gnmap_files = sorted(p.name for p in (self.project / "nmap" / "output").glob("*.gnmap"))
+        self.assertEqual(gnmap_files, sorted(f"10.9.0.{i}.gnmap" for i in range(1, TARGETS + 1)))
+        self.assertIn(f"Completed: {TARGETS}", outputs[-1])
+
+
+if __name__ == "__main__":
+    unittest.main()
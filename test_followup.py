@@ -0,0 +1,148 @@
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import unittest
+import subprocess
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+
+# Logs when it starts and stops, so the test can count runs in flight per tool
+FAKE_TOOL = """#!/bin/sh
+echo "+ {tool}" >> "$FAKE_EVENTS"
+sleep 1
+echo "- {tool}" >> "$FAKE_EVENTS"
+"""
+
+# Leaves a child behind and waits on it, so only a process group kill ends both
+FAKE_HANGING_TOOL = """#!/bin/sh
+sleep 300 &
+echo $! >> "$FAKE_CHILDREN"
+wait
+"""
+
+HOSTS = 5
+
+
+def alive(pid):
+    """Whether a process is still running; zombies waiting to be reaped count as dead"""
+    try:
+        with open(f"/proc/{pid}/stat", 'r') as f:
+            return f.read().rsplit(')', 1)[1].split()[0] != 'Z'
+    except FileNotFoundError:
+        return False
+
+
+def max_in_flight(events, tool):
+    """Highest number of runs of a tool that were running at once"""
+    running = highest = 0
+    for line in events:
+        sign, name = line.split()
+        if name == tool:
+            running += 1 if sign == '+' else -1
+            highest = max(highest, running)
+    return highest
+
+
+@unittest.skipUnless(os.path.isdir("/proc"), "/proc is needed to check for leftover processes")
+class FollowupTest(unittest.TestCase):
+    """The follow-up dispatcher against fake sslyze, testssl.sh and gobuster binaries"""
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        bin_dir = self.tmp / "bin"
+        bin_dir.mkdir()
+        for binary, tool in (('sslyze', 'sslyze'), ('testssl.sh', 'testssl')):
+            (bin_dir / binary).write_text(FAKE_TOOL.format(tool=tool))
+            (bin_dir / binary).chmod(0o755)
+        (bin_dir / "gobuster").write_text(FAKE_HANGING_TOOL)
+        (bin_dir / "gobuster").chmod(0o755)
+
+        self.events = self.tmp / "events"
+        self.children = self.tmp / "children"
+        self.env = dict(os.environ, HOME=str(self.tmp), FAKE_EVENTS=str(self.events),
+                        FAKE_CHILDREN=str(self.children),
+                        PATH=f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+        self.project = self.tmp / "Project" / "followup"
+        (self.project / "nmap").mkdir(parents=True)
+        (self.project / "findings").mkdir()
+        with open(self.project / "findings" / "https_hosts_20260101_000000.txt", 'w') as f:
+            f.write("".join(f"10.9.0.{i}\n" for i in range(1, HOSTS + 1)))
+        with open(self.project / "findings" / "http_hosts_20260101_000000.txt", 'w') as f:
+            f.write("10.9.1.1\n")
+
+        self.config = self.tmp / "tools.json"
+        with open(self.config, 'w') as f:
+            json.dump({'sslyze': {'limit': 2, 'timeout': 60},
+                       'testssl': {'limit': 1, 'timeout': 60},
+                       'dirbruteforce': {'services': ['http'], 'limit': 1, 'timeout': 1}}, f)
+
+    def tearDown(self):
+        if self.children.exists():
+            for pid in self.children.read_text().split():
+                try:
+                    os.kill(int(pid), 9)
+                except ProcessLookupError:
+                    pass
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def run_followup(self, tools):
+        return subprocess.run([sys.executable, str(SCRIPT_DIR / "scan_followup.py"), '--project', 'followup',
+                               '--config', str(self.config), '--tools', tools, '--workers', '4'],
+                              env=self.env, cwd=SCRIPT_DIR, stdout=subprocess.PIPE,
+                              stderr=subprocess.STDOUT, text=True, timeout=120)
+
+    def read_events(self):
+        if not self.events.exists():
+            return []
+        return self.events.read_text().splitlines()
+
+    def test_limits_per_tool_and_journal_skips_finished_runs(self):
+        result = self.run_followup('sslyze,testssl')
+        self.assertEqual(result.returncode, 0, result.stdout)
+        events = self.read_events()
+        self.assertEqual(events.count("+ sslyze"), HOSTS)
+        self.assertEqual(events.count("+ testssl"), HOSTS)
+        # Four workers are free, but each tool stays within its own limit
+        self.assertEqual(max_in_flight(events, 'sslyze'), 2)
+        self.assertEqual(max_in_flight(events, 'testssl'), 1)
+
+        # Every run is journaled in its tool's directory, so nothing is run twice
+        self.events.unlink()
+        result = self.run_followup('sslyze,testssl')
+        self.assertEqual(result.returncode, 0, result.stdout)
+        self.assertEqual(self.read_events(), [])
+        self.assertIn(f"sslyze: {HOSTS} hosts already done", result.stdout)
+
+        # Journals are per tool: losing one only reruns that tool
+        (self.project / "testssl" / "followup_journal.jsonl").unlink()
+        result = self.run_followup('sslyze,testssl')
+        self.assertEqual(result.returncode, 0, result.stdout)
+        events = self.read_events()
+        self.assertEqual(events.count("+ sslyze"), 0)
+        self.assertEqual(events.count("+ testssl"), HOSTS)
+
+    def test_timeout_kills_the_whole_process_group(self):
+        start = time.time()
+        result = self.run_followup('dirbruteforce')
+        self.assertLess(time.time() - start, 30)
+        self.assertEqual(result.returncode, 1, result.stdout)
+        self.assertIn("dirbruteforce timeout for http://10.9.1.1", result.stdout)
+
+        children = [int(pid) for pid in self.children.read_text().split()]
+        self.assertEqual(len(children), 1)
+        deadline = time.time() + 5
+        while time.time() < deadline and alive(children[0]):
+            time.sleep(0.1)
+        self.assertFalse(alive(children[0]), "the tool's child survived the timeout")
+
+        with open(self.project / "dirbruteforce" / "followup_journal.jsonl", 'r') as f:
+            statuses = [json.loads(line)['status'] for line in f if line.strip()]
+        self.assertEqual(statuses, ['timeout'])
+
+
+if __name__ == "__main__":
+    unittest.main()